@@ -1,20 +1,632 @@
 import boto3
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
 import uuid
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 
 
 class DynamoDBOperationError(Exception):
     pass
 
 
+class ScanStats:
+    """
+    Running counters for a paginated read: pages requested, items DynamoDB
+    evaluated (`ScannedCount`) and items that matched the filter (`Count`).
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.scanned_count = 0
+        self.returned_count = 0
+        self.operation = None
+        self.index_name = None
+
+    def __repr__(self):
+        return (
+            f"ScanStats(pages={self.pages}, scanned={self.scanned_count}, "
+            f"returned={self.returned_count}, operation={self.operation}, "
+            f"index={self.index_name})"
+        )
+
+
+# Primary key and global secondary indexes of every table, keyed by model name
+# (the table name without the `-<apiId>-<env>` suffix). Each index maps its
+# name to a `(partition_key, sort_key)` tuple; the names must match the
+# `@index(name: ...)` directives of the Amplify schema.
+TABLE_INDEXES: Dict[str, Dict[str, Any]] = {
+    "User": {
+        "key": ("id", None),
+        "indexes": {
+            "byEmail": ("email", None),
+            "byAuthUser": ("authUserID", None),
+        },
+    },
+    "Employee": {
+        "key": ("id", None),
+        "indexes": {
+            "byUser": ("userID", None),
+            "byStore": ("storeID", None),
+            "byRole": ("role", None),
+        },
+    },
+    "StoreInfo": {"key": ("id", None), "indexes": {}},
+    "Address": {"key": ("id", None), "indexes": {}},
+    "OpenTime": {"key": ("id", None), "indexes": {}},
+    "DeviceInfo": {
+        "key": ("id", None),
+        "indexes": {
+            "byDeviceToken": ("deviceToken", None),
+            "byEmail": ("email", None),
+            "byUser": ("userID", None),
+        },
+    },
+    "ReferCode": {
+        "key": ("id", None),
+        "indexes": {
+            "byEmail": ("email", None),
+        },
+    },
+    "ExtraEvent": {
+        "key": ("id", None),
+        "indexes": {
+            "byEmployee": ("employeeID", None),
+        },
+    },
+    "ICalendar": {
+        "key": ("id", None),
+        "indexes": {
+            "byExtraEvent": ("extraEventID", None),
+        },
+    },
+    "ICalendarEvent": {
+        "key": ("id", None),
+        "indexes": {
+            "byICalendar": ("iCalendarID", "startDateTime"),
+            "byUid": ("uid", None),
+        },
+    },
+    # one row per (calendar, day) an ICalendarEvent touches, see DayBucketIndex;
+    # dayBucket is "<iCalendarID>#YYYYMMDD" and startKey "<startDateTime>#<event id>"
+    "ICalendarEventDay": {
+        "key": ("id", None),
+        "indexes": {
+            "byDayBucket": ("dayBucket", "startKey"),
+        },
+    },
+    "ICalFreqency": {
+        "key": ("id", None),
+        "indexes": {
+            "byUid": ("uid", None),
+        },
+    },
+    # subscribed owner/manager emails per store, see recipient_index.py
+    "NotificationRecipient": {"key": ("id", None), "indexes": {}},
+    # push notifications waiting to be sent, see notification_outbox.py;
+    # availableAt is the epoch millisecond a PENDING row is due
+    "NotificationOutbox": {
+        "key": ("id", None),
+        "indexes": {
+            "byState": ("state", "availableAt"),
+        },
+    },
+    "ICalendarEventStatus": {
+        "key": ("id", None),
+        "indexes": {
+            "byUid": ("uid", "startAt"),
+        },
+    },
+}
+
+# (table_name, index_name) pairs that DynamoDB rejected, so the planner stops
+# choosing them for the lifetime of the container.
+_unavailable_indexes = set()
+
+
+def table_model_name(table_name: str) -> str:
+    """`Employee-2iph2dahajadpnro5xkxcbveoq-staging` -> `Employee`"""
+    return table_name.split("-", 1)[0]
+
+
+def register_table_indexes(
+    model_name: str,
+    partition_key: str = "id",
+    sort_key: Optional[str] = None,
+    indexes: Optional[Dict[str, tuple]] = None,
+):
+    """
+    Register (or replace) the key schema of a table so `iter_items` can
+    turn equality lookups into `Query` requests.
+
+    ```
+    # Example usage:
+    register_table_indexes("Booking", indexes={"byStore": ("storeID", "startAt")})
+    ```
+    """
+    TABLE_INDEXES[model_name] = {
+        "key": (partition_key, sort_key),
+        "indexes": dict(indexes or {}),
+    }
+
+
+class QueryPlan:
+    """The index (None for the base table) and key attributes a lookup will query."""
+
+    def __init__(self, index_name: Optional[str], partition_key: str, sort_key: Optional[str]):
+        self.index_name = index_name
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+
+    def __repr__(self):
+        return (
+            f"QueryPlan(index={self.index_name}, partition_key={self.partition_key}, "
+            f"sort_key={self.sort_key})"
+        )
+
+
+# batch_get_item accepts at most 100 keys and batch_write_item 25 requests
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+BATCH_MAX_ATTEMPTS = 6
+BATCH_BACKOFF_BASE_SECONDS = 0.05
+BATCH_BACKOFF_MAX_SECONDS = 2.0
+
+
+# Namespace of the deterministic ids `upsert` derives from natural keys
+UPSERT_ID_NAMESPACE = uuid.UUID("6f1c2b9e-4d3a-5e8f-9a7b-0c1d2e3f4a5b")
+
+# Rows written before `upsert` carry random uuid4 ids. Set this while they
+# are being migrated (e.g. DYNAMODB_UPSERT_LEGACY_LOOKUP=true for the
+# backfill window only): an upsert then first looks such a row up through an
+# index, never a scan, and writes to it instead of creating a second row
+# under the deterministic id. Off, every upsert is a single write.
+UPSERT_LEGACY_LOOKUP = (
+    os.environ.get("DYNAMODB_UPSERT_LEGACY_LOOKUP", "false").lower() == "true"
+)
+
+
+def _backoff_sleep(attempt: int):
+    """Full-jitter exponential backoff between retries of unprocessed batch entries."""
+    ceiling = min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_BASE_SECONDS * (2**attempt))
+    time.sleep(random.uniform(0, ceiling))
+
+
+def _projection_key(attributes: Optional[List[str]]) -> Optional[tuple]:
+    """Key a read is remembered under for its projection; None is the whole item."""
+    return tuple(sorted(set(attributes))) if attributes else None
+
+
+def _covering_read(variants: Optional[Dict[Optional[tuple], Any]], attributes: Optional[List[str]]):
+    """
+    `(found, item)` from the reads already made of one key, by projection:
+    the whole item, or a projection holding every requested attribute,
+    serves the request projected to `attributes`.
+    """
+    if not variants:
+        return False, None
+    if None in variants:
+        return True, _project(variants[None], attributes)
+    if attributes:
+        wanted = set(attributes)
+        for projection, item in variants.items():
+            if wanted.issubset(projection):
+                return True, _project(item, attributes)
+    return False, None
+
+
+class IdentityMap:
+    """
+    Items read by primary key during one Lambda invocation, keyed by
+    `(table_name, key)` and the projection they were read with. While
+    active, `get_item`/`get_items` return the already-loaded item (or the
+    already-known absence of one) when it was read whole or with every
+    requested attribute, instead of reading it again; writes through the
+    handler evict the key. Use the `request_scope` decorator to activate
+    it for one handler call.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.hits = 0
+        self.misses = 0
+        self._items: Dict[tuple, Dict[Optional[tuple], Optional[Dict[str, Any]]]] = {}
+
+    @staticmethod
+    def _map_key(table_name: str, key: Dict[str, Any]) -> tuple:
+        return (table_name, tuple(sorted(key.items())))
+
+    def begin(self):
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+        self.active = True
+
+    def end(self) -> Dict[str, int]:
+        stats = self.stats()
+        self._items.clear()
+        self.active = False
+        return stats
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
+
+    def lookup(
+        self, table_name: str, key: Dict[str, Any], attributes: Optional[List[str]] = None
+    ):
+        """Returns `(found, item)`; `item` is None for a key known not to exist."""
+        if not self.active:
+            return False, None
+        found, item = _covering_read(self._items.get(self._map_key(table_name, key)), attributes)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found, item
+
+    def remember(
+        self,
+        table_name: str,
+        key: Dict[str, Any],
+        item: Optional[Dict[str, Any]],
+        attributes: Optional[List[str]] = None,
+    ):
+        if self.active:
+            variants = self._items.setdefault(self._map_key(table_name, key), {})
+            variants[_projection_key(attributes)] = item
+
+    def evict(self, table_name: str, key: Dict[str, Any]):
+        if self.active:
+            self._items.pop(self._map_key(table_name, key), None)
+
+
+identity_map = IdentityMap()
+
+
+class ReadCache:
+    """
+    Bounded TTL/LRU cache of items read by primary key, kept across warm
+    invocations of the same container. Only models listed in `ttls` are
+    cached, each for its own number of seconds; the least recently used
+    items are dropped once the estimated size exceeds `max_bytes`.
+    Projected reads are cached under their projection and serve any read
+    of a subset of it. Writes made by this process through
+    `DynamoDBHandler` invalidate the key, writes made elsewhere become
+    visible when the entry expires.
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_bytes: int):
+        self.ttls = dict(ttls)
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (map_key, projection) -> (expires_at, size, item)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # map_key -> projections cached for it
+        self._projections: Dict[tuple, set] = {}
+        self._lock = threading.Lock()
+
+    def ttl_for(self, table_name: str) -> Optional[float]:
+        return self.ttls.get(table_model_name(table_name))
+
+    @staticmethod
+    def _sizeof(item: Dict[str, Any]) -> int:
+        return len(json.dumps(item, default=str))
+
+    def lookup(
+        self, table_name: str, key: Dict[str, Any], attributes: Optional[List[str]] = None
+    ):
+        """Returns `(found, item)` for a fresh entry of a cached model."""
+        if self.ttl_for(table_name) is None:
+            return False, None
+        map_key = IdentityMap._map_key(table_name, key)
+        now = time.monotonic()
+        with self._lock:
+            variants = {}
+            for projection in list(self._projections.get(map_key, ())):
+                entry = self._entries[(map_key, projection)]
+                if entry[0] > now:
+                    variants[projection] = entry[2]
+                else:
+                    self._drop((map_key, projection))
+            found, item = _covering_read(variants, attributes)
+            if found:
+                for projection in variants:
+                    self._entries.move_to_end((map_key, projection))
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, item
+
+    def remember(
+        self,
+        table_name: str,
+        key: Dict[str, Any],
+        item: Optional[Dict[str, Any]],
+        attributes: Optional[List[str]] = None,
+    ):
+        ttl = self.ttl_for(table_name)
+        if ttl is None or item is None:
+            return
+        size = self._sizeof(item)
+        if size > self.max_bytes:
+            return
+        map_key = IdentityMap._map_key(table_name, key)
+        entry_key = (map_key, _projection_key(attributes))
+        with self._lock:
+            self._drop(entry_key)
+            self._entries[entry_key] = (time.monotonic() + ttl, size, item)
+            self._projections.setdefault(map_key, set()).add(entry_key[1])
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, table_name: str, key: Dict[str, Any]):
+        if self.ttl_for(table_name) is None:
+            return
+        map_key = IdentityMap._map_key(table_name, key)
+        with self._lock:
+            for projection in list(self._projections.get(map_key, ())):
+                self._drop((map_key, projection))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._projections.clear()
+            self.size_bytes = 0
+
+    def _drop(self, entry_key: tuple):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+            map_key, projection = entry_key
+            projections = self._projections.get(map_key)
+            projections.discard(projection)
+            if not projections:
+                del self._projections[map_key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "evictions": self.evictions,
+        }
+
+
+# Seconds an item of these slowly changing models may be served from the
+# warm-container read cache; models not listed are always read from DynamoDB.
+READ_CACHE_TTLS: Dict[str, float] = {
+    "StoreInfo": 300,
+    "Address": 300,
+    "OpenTime": 300,
+    "User": 60,
+    # only changes on Employee/User/DeviceInfo writes
+    "NotificationRecipient": 60,
+}
+
+read_cache = ReadCache(
+    READ_CACHE_TTLS,
+    int(os.environ.get("DYNAMODB_READ_CACHE_MAX_BYTES", 4 * 1024 * 1024)),
+)
+
+
+def _invalidate_key(table_name: str, key: Dict[str, Any]):
+    identity_map.evict(table_name, key)
+    read_cache.invalidate(table_name, key)
+
+
+def request_scope(handler_func):
+    """
+    Decorator for Lambda handlers: activates the identity map for the
+    invocation, logs its hit/miss counts and clears it when the handler
+    returns or raises.
+
+    ```
+    # Example usage:
+    @request_scope
+    def lambda_handler(event, context):
+        ...
+    ```
+    """
+
+    @functools.wraps(handler_func)
+    def wrapper(*args, **kwargs):
+        identity_map.begin()
+        try:
+            return handler_func(*args, **kwargs)
+        finally:
+            stats = identity_map.end()
+            if stats["hits"] or stats["misses"]:
+                print(f"identity map ::: {stats}")
+                print(f"read cache ::: {read_cache.stats()}")
+
+    return wrapper
+
+
+def _project(item: Optional[Dict[str, Any]], attributes: Optional[List[str]]):
+    """Apply a top-level attribute projection to an item already in memory."""
+    if item is None or not attributes:
+        return item
+    return {attr: item[attr] for attr in attributes if attr in item}
+
+
+def _env_number(name: str, cast=int):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+
+# botocore settings of the shared DynamoDB resource. Every function can tune
+# them through environment variables; unset values keep botocore's defaults.
+DYNAMODB_CONFIG: Dict[str, Any] = {
+    key: value
+    for key, value in {
+        "max_pool_connections": _env_number("DYNAMODB_MAX_POOL_CONNECTIONS"),
+        "connect_timeout": _env_number("DYNAMODB_CONNECT_TIMEOUT", float),
+        "read_timeout": _env_number("DYNAMODB_READ_TIMEOUT", float),
+        "retries": (
+            {"max_attempts": _env_number("DYNAMODB_MAX_ATTEMPTS"), "mode": "standard"}
+            if _env_number("DYNAMODB_MAX_ATTEMPTS")
+            else None
+        ),
+    }.items()
+    if value is not None
+}
+
+# The session, resource, Table objects and handlers below are built once per
+# container and reused by every warm invocation.
+_shared_lock = threading.Lock()
+_shared_resource = None
+_shared_tables: Dict[str, Any] = {}
+_shared_handlers: Dict[str, "DynamoDBHandler"] = {}
+
+# resource and handlers of each thread inside `thread_handlers()`
+_thread_local = threading.local()
+
+
+def configure_dynamodb(**config):
+    """
+    Override botocore settings (e.g. `max_pool_connections=25`) of the shared
+    resource. Cached resources, tables and handlers are dropped so the next
+    handler picks up the new configuration.
+    """
+    global _shared_resource
+    with _shared_lock:
+        DYNAMODB_CONFIG.update(config)
+        _shared_resource = None
+        _shared_tables.clear()
+        _shared_handlers.clear()
+
+
+def _new_resource():
+    return boto3.session.Session().resource("dynamodb", config=Config(**DYNAMODB_CONFIG))
+
+
+def shared_resource():
+    """The container-wide DynamoDB service resource, created on first use."""
+    global _shared_resource
+    resource = _shared_resource
+    if resource is None:
+        with _shared_lock:
+            if _shared_resource is None:
+                _shared_resource = _new_resource()
+            resource = _shared_resource
+    return resource
+
+
+@contextmanager
+def thread_handlers():
+    """
+    boto3 resources are not thread-safe, so within this block
+    `DynamoDBHandler.for_table` returns handlers of the calling thread, built
+    on a resource of its own, instead of the container-wide ones. Meant for
+    worker threads; a thread keeps its handlers for its next block.
+
+    ```
+    # Example usage:
+    def refresh(item):
+        with thread_handlers():
+            DynamoDBHandler.for_table("YourTableName").save_item(item)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(refresh, items))
+    ```
+    """
+    depth = getattr(_thread_local, "depth", 0)
+    _thread_local.depth = depth + 1
+    try:
+        yield
+    finally:
+        _thread_local.depth = depth
+
+
+def shared_table(table_name: str):
+    """The container-wide `Table` object of `table_name`, created on first use."""
+    table = _shared_tables.get(table_name)
+    if table is None:
+        resource = shared_resource()
+        with _shared_lock:
+            table = _shared_tables.get(table_name)
+            if table is None:
+                table = resource.Table(table_name)
+                _shared_tables[table_name] = table
+    return table
+
+
 class DynamoDBHandler:
 
-    def __init__(self, table_name):
-        self.dynamodb = boto3.resource("dynamodb")
-        self.table = self.dynamodb.Table(table_name)
+    def __init__(self, table_name, resource=None):
+        """
+        Args:
+        - table_name (str): full DynamoDB table name.
+        - resource: optional DynamoDB service resource (or a local stand-in
+          with the same `Table`/`batch_*` interface); the container-wide
+          shared resource and Table are used when omitted.
+        """
+        self.table_name = table_name
+        self._owns_resource = resource is None
+        if resource is None:
+            self.dynamodb = shared_resource()
+            self.table = shared_table(table_name)
+        else:
+            self.dynamodb = resource
+            self.table = resource.Table(table_name)
+        self.last_scan_stats = None
+
+    @classmethod
+    def for_table(cls, table_name: str) -> "DynamoDBHandler":
+        """
+        Thread-safe factory returning the container-wide handler of
+        `table_name`, so helpers called many times per request (and warm
+        invocations) skip building a resource, client and Table again.
+        Inside `thread_handlers()` the calling thread's own handler is
+        returned instead.
+
+        ```
+        # Example usage:
+        handler = DynamoDBHandler.for_table("YourTableName")
+        item = handler.get_item({"id": "..."})
+        ```
+        """
+        if getattr(_thread_local, "depth", 0):
+            return cls._thread_handler(table_name)
+        handler = _shared_handlers.get(table_name)
+        if handler is None:
+            candidate = cls(table_name)
+            with _shared_lock:
+                handler = _shared_handlers.setdefault(table_name, candidate)
+        return handler
+
+    @classmethod
+    def _thread_handler(cls, table_name: str) -> "DynamoDBHandler":
+        handlers = getattr(_thread_local, "handlers", None)
+        if handlers is None:
+            _thread_local.resource = _new_resource()
+            handlers = _thread_local.handlers = {}
+        handler = handlers.get(table_name)
+        if handler is None:
+            handler = handlers[table_name] = cls(table_name, resource=_thread_local.resource)
+            # built here, so parallel scans still give each segment its own
+            handler._owns_resource = True
+        return handler
 
     @staticmethod
     def generate_AWSDateTime(date: Optional[datetime] = None) -> str:
@@ -27,14 +639,19 @@ class DynamoDBHandler:
 
         try:
             self.table.put_item(Item=item)
+            _invalidate_key(self.table_name, {"id": item["id"]})
             return item["id"]
         except ClientError as e:
             raise DynamoDBOperationError(f"Error saving item: {e}")
         except Exception as e:
             raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
 
-    def get_item(self, key):
+    def get_item(self, key, attributes: Optional[List[str]] = None):
         """
+        Args:
+        - key (dict): primary key of the item.
+        - attributes (list): optional attribute names to read instead of the whole item.
+
         # Example usage:
         table_name = 'YourTableName'
         handler = DynamoDBHandler(table_name)
@@ -53,28 +670,449 @@ class DynamoDBHandler:
         except DynamoDBOperationError as e:
             print("DynamoDB Operation Error:", e)
         """
+        found, item = identity_map.lookup(self.table_name, key, attributes)
+        if not found:
+            found, item = read_cache.lookup(self.table_name, key, attributes)
+            if found:
+                identity_map.remember(self.table_name, key, item, attributes)
+        if found:
+            return item
+
         try:
-            response = self.table.get_item(Key=key)
+            get_kwargs = {"Key": key}
+            if attributes:
+                projection_expression, expression_attribute_names = self._build_projection_expression(attributes)
+                get_kwargs["ProjectionExpression"] = projection_expression
+                get_kwargs["ExpressionAttributeNames"] = expression_attribute_names
+            response = self.table.get_item(**get_kwargs)
             item = response.get("Item")
+            identity_map.remember(self.table_name, key, item, attributes)
+            read_cache.remember(self.table_name, key, item, attributes)
             return item
         except ClientError as e:
             raise DynamoDBOperationError(f"Error getting item: {e}")
         except Exception as e:
             raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
 
-    def search_items(self, search_conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
-        filter_expression, expression_attribute_names, expression_attribute_values = self._build_filter_expression(search_conditions)
+    def get_items(
+        self, keys: List[Any], attributes: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch many items by partition key with `batch_get_item`, 100 keys per
+        request, retrying `UnprocessedKeys` with jittered exponential backoff.
+
+        Args:
+        - keys (list): key values (e.g. ids) or key dicts such as `{"id": "..."}`.
+          Duplicates and None values are ignored.
+        - attributes (list): optional attribute names to read; the key
+          attribute is always included.
+
+        Returns:
+        - dict: found items keyed by their key value, in the order the keys
+          were given. Keys that do not exist are left out.
+        ```
+        # Example usage:
+        handler = DynamoDBHandler("User-...")
+        users = handler.get_items(["id1", "id2", "id3"], attributes=["email"])
+        email = users.get("id2", {}).get("email")
+        ```
+        """
+        key_name = self._partition_key_name()
+        ids = []
+        for key in keys:
+            value = key.get(key_name) if isinstance(key, dict) else key
+            if value is not None:
+                ids.append(value)
+        ids = list(dict.fromkeys(ids))
+
+        projection = attributes and [key_name] + [attr for attr in attributes if attr != key_name]
+        found = {}
+        missing_ids = []
+        for value in ids:
+            known, item = identity_map.lookup(self.table_name, {key_name: value}, projection)
+            if not known:
+                known, item = read_cache.lookup(self.table_name, {key_name: value}, projection)
+                if known:
+                    identity_map.remember(self.table_name, {key_name: value}, item, projection)
+            if not known:
+                missing_ids.append(value)
+            elif item is not None:
+                found[value] = item
+
+        for start in range(0, len(missing_ids), BATCH_GET_LIMIT):
+            table_request = {
+                "Keys": [{key_name: value} for value in missing_ids[start : start + BATCH_GET_LIMIT]]
+            }
+            if projection:
+                projection_expression, expression_attribute_names = self._build_projection_expression(
+                    projection
+                )
+                table_request["ProjectionExpression"] = projection_expression
+                table_request["ExpressionAttributeNames"] = expression_attribute_names
+
+            request_items = {self.table_name: table_request}
+            attempt = 0
+            while request_items:
+                try:
+                    response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                except ClientError as e:
+                    raise DynamoDBOperationError(f"Error getting items: {e}")
+                except Exception as e:
+                    raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    found[item[key_name]] = item
+
+                request_items = response.get("UnprocessedKeys") or {}
+                if request_items:
+                    attempt += 1
+                    if attempt >= BATCH_MAX_ATTEMPTS:
+                        raise DynamoDBOperationError(
+                            f"Error getting items: keys still unprocessed after {attempt} attempts"
+                        )
+                    _backoff_sleep(attempt)
+
+        for value in missing_ids:
+            identity_map.remember(self.table_name, {key_name: value}, found.get(value), projection)
+            read_cache.remember(self.table_name, {key_name: value}, found.get(value), projection)
+
+        return {value: found[value] for value in ids if value in found}
+
+    def search_items(
+        self, search_conditions: Dict[str, Any], attributes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        return list(self.iter_items(search_conditions, attributes=attributes))
+
+    def iter_items(
+        self,
+        search_conditions: Dict[str, Any],
+        page_size: Optional[int] = None,
+        stats: Optional["ScanStats"] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield every item matching `search_conditions`, following
+        `LastEvaluatedKey` one page at a time. Pages are only requested when
+        the caller asks for more items, so stopping early stops the read.
+
+        The lookup is a `Query` whenever `plan_query` finds a key or index for
+        the conditions, and a `Scan` with a filter otherwise.
+
+        Args:
+        - search_conditions (dict): attribute names and the values they must equal.
+        - page_size (int): optional `Limit` for each request.
+        - stats (ScanStats): optional counters to update; `last_scan_stats` is
+          always set to the counters of the most recent call.
+        - attributes (list): optional attribute names to read instead of whole items.
+        ```
+        # Example usage:
+        handler = DynamoDBHandler("YourTableName")
+
+        # only the first match is read, later pages are never requested
+        first = next(handler.iter_items({"uid": uid}), None)
+
+        for item in handler.iter_items({"storeID": store_id}, page_size=100):
+            print(item)
+        print(handler.last_scan_stats)
+        ```
+        """
+        stats = stats if stats is not None else ScanStats()
+        self.last_scan_stats = stats
+
+        plan = self.plan_query(search_conditions)
+        request_kwargs = self._build_read_request(search_conditions, plan, attributes)
+        if page_size:
+            request_kwargs["Limit"] = page_size
+
+        while True:
+            stats.operation = "Query" if plan else "Scan"
+            stats.index_name = plan.index_name if plan else None
+            try:
+                if plan:
+                    response = self.table.query(**request_kwargs)
+                else:
+                    response = self.table.scan(**request_kwargs)
+            except ClientError as e:
+                if plan and plan.index_name and stats.pages == 0 and self._is_missing_index_error(e):
+                    # The index is not deployed on this table: remember it and
+                    # answer this lookup with a scan instead.
+                    print(f"Index {plan.index_name} unavailable on {self.table_name}, falling back to scan")
+                    _unavailable_indexes.add((self.table_name, plan.index_name))
+                    plan = None
+                    request_kwargs = self._build_read_request(search_conditions, plan, attributes)
+                    if page_size:
+                        request_kwargs["Limit"] = page_size
+                    continue
+                raise DynamoDBOperationError(f"Error searching items: {e}")
+            except Exception as e:
+                raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+            items = response.get("Items", [])
+            stats.pages += 1
+            stats.scanned_count += response.get("ScannedCount", len(items))
+            stats.returned_count += response.get("Count", len(items))
+
+            yield from items
+
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                return
+            request_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    def iter_range(
+        self,
+        index_name: Optional[str],
+        partition_value: Any,
+        start: Any,
+        end: Any,
+        attributes: Optional[List[str]] = None,
+        stats: Optional["ScanStats"] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the items of one partition of the table or of
+        `index_name` whose sort key lies between `start` and `end`
+        (inclusive), in sort key order, following `LastEvaluatedKey`.
+
+        ```
+        # Example usage:
+        handler = DynamoDBHandler("ICalendarEventStatus-...")
+        for item in handler.iter_range(
+            "byUid", uid, "20240501T000000", "20240515T000000"
+        ):
+            print(item["startAt"], item["status"])
+        ```
+        """
+        schema = TABLE_INDEXES.get(table_model_name(self.table_name))
+        if schema is None:
+            raise DynamoDBOperationError(f"No key schema registered for {self.table_name}")
+        partition_key, sort_key = (
+            schema["indexes"][index_name] if index_name else schema["key"]
+        )
+        if sort_key is None:
+            raise DynamoDBOperationError(f"{index_name or 'table key'} has no sort key")
+
+        stats = stats if stats is not None else ScanStats()
+        self.last_scan_stats = stats
+        stats.operation = "Query"
+        stats.index_name = index_name
+
+        request_kwargs = {
+            "KeyConditionExpression": "#pk = :pk AND #sk BETWEEN :start AND :end",
+            "ExpressionAttributeNames": {"#pk": partition_key, "#sk": sort_key},
+            "ExpressionAttributeValues": {
+                ":pk": partition_value,
+                ":start": start,
+                ":end": end,
+            },
+        }
+        if index_name:
+            request_kwargs["IndexName"] = index_name
+        if attributes:
+            projection_expression, names = self._build_projection_expression(attributes)
+            request_kwargs["ProjectionExpression"] = projection_expression
+            request_kwargs["ExpressionAttributeNames"].update(names)
+
+        while True:
+            try:
+                response = self.table.query(**request_kwargs)
+            except ClientError as e:
+                raise DynamoDBOperationError(f"Error querying range: {e}")
+            except Exception as e:
+                raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+            items = response.get("Items", [])
+            stats.pages += 1
+            stats.scanned_count += response.get("ScannedCount", len(items))
+            stats.returned_count += response.get("Count", len(items))
+
+            yield from items
+
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                return
+            request_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    def parallel_scan(
+        self,
+        search_conditions: Optional[Dict[str, Any]] = None,
+        segments: int = 4,
+        max_workers: Optional[int] = None,
+        page_size: Optional[int] = None,
+        stats: Optional[ScanStats] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Scan the whole table as `segments` parallel DynamoDB segments
+        (`Segment`/`TotalSegments`) on a thread pool, yielding items as soon
+        as any segment returns a page. Meant for maintenance and batch jobs
+        that really need every row; lookups should use `iter_items`.
+
+        Items arrive in no particular order. At most a couple of pages per
+        segment are buffered, and stopping iteration early stops the workers
+        after their in-flight request.
+
+        Args:
+        - search_conditions (dict): optional equality filter applied to every segment.
+        - segments (int): number of DynamoDB scan segments.
+        - max_workers (int): thread pool size, defaults to `segments`.
+        - page_size (int): optional `Limit` for each scan request.
+        - stats (ScanStats): optional counters to update, summed over all segments.
+        - attributes (list): optional attribute names to read instead of whole items.
+        ```
+        # Example usage:
+        handler = DynamoDBHandler("YourTableName")
+        for item in handler.parallel_scan({"extraDataType": "ICS"}, segments=8):
+            print(item)
+        print(handler.last_scan_stats)
+        ```
+        """
+        stats = stats if stats is not None else ScanStats()
+        stats.operation = "ParallelScan"
+        self.last_scan_stats = stats
+
+        request_kwargs = self._build_read_request(search_conditions or {}, None, attributes)
+        if page_size:
+            request_kwargs["Limit"] = page_size
+
+        pages = queue.Queue(maxsize=segments * 2)
+        stop = threading.Event()
+
+        def put(entry) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_segment(segment: int):
+            try:
+                table = self._thread_table()
+                segment_kwargs = dict(request_kwargs, Segment=segment, TotalSegments=segments)
+                while not stop.is_set():
+                    response = table.scan(**segment_kwargs)
+                    if not put(("page", response)):
+                        return
+                    last_evaluated_key = response.get("LastEvaluatedKey")
+                    if not last_evaluated_key:
+                        break
+                    segment_kwargs["ExclusiveStartKey"] = last_evaluated_key
+            except Exception as e:
+                put(("error", e))
+            finally:
+                put(("done", None))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers or segments)
         try:
-            response = self.table.scan(
-                FilterExpression=filter_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values,
+            for segment in range(segments):
+                executor.submit(scan_segment, segment)
+
+            finished = 0
+            while finished < segments:
+                kind, payload = pages.get()
+                if kind == "done":
+                    finished += 1
+                elif kind == "error":
+                    if isinstance(payload, ClientError):
+                        raise DynamoDBOperationError(f"Error scanning segment: {payload}")
+                    raise DynamoDBOperationError(f"An unexpected error occurred: {payload}")
+                else:
+                    items = payload.get("Items", [])
+                    stats.pages += 1
+                    stats.scanned_count += payload.get("ScannedCount", len(items))
+                    stats.returned_count += payload.get("Count", len(items))
+                    yield from items
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _thread_table(self):
+        """
+        boto3 resources are not thread-safe, so worker threads build their own
+        session and Table unless a resource was injected by the caller.
+        """
+        if not self._owns_resource:
+            return self.table
+        return _new_resource().Table(self.table_name)
+
+    def plan_query(self, search_conditions: Dict[str, Any]) -> Optional[QueryPlan]:
+        """
+        Pick the best key schema for an equality lookup from `TABLE_INDEXES`.
+
+        The base table or a GSI qualifies when its partition key is one of the
+        conditions; one whose sort key is also constrained wins over one that
+        only matches the partition key, and the base table wins ties. Returns
+        None when no key fits and the lookup has to scan.
+        """
+        if not search_conditions:
+            return None
+
+        schema = TABLE_INDEXES.get(table_model_name(self.table_name))
+        if schema is None:
+            return None
+
+        candidates = [(None, schema["key"])] + list(schema["indexes"].items())
+
+        best_plan, best_score = None, 0
+        for index_name, (partition_key, sort_key) in candidates:
+            if partition_key not in search_conditions:
+                continue
+            if index_name and (self.table_name, index_name) in _unavailable_indexes:
+                continue
+            score = 2 if sort_key and sort_key in search_conditions else 1
+            if score > best_score:
+                best_score = score
+                best_plan = QueryPlan(
+                    index_name,
+                    partition_key,
+                    sort_key if score == 2 else None,
+                )
+        return best_plan
+
+    def _build_read_request(
+        self,
+        search_conditions: Dict[str, Any],
+        plan: Optional[QueryPlan],
+        attributes: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        request_kwargs = {}
+        if attributes:
+            projection_expression, expression_attribute_names = self._build_projection_expression(attributes)
+            request_kwargs["ProjectionExpression"] = projection_expression
+            request_kwargs["ExpressionAttributeNames"] = expression_attribute_names
+        if not search_conditions:
+            return request_kwargs
+
+        _, expression_attribute_names, expression_attribute_values = self._build_filter_expression(search_conditions)
+        request_kwargs.setdefault("ExpressionAttributeNames", {}).update(expression_attribute_names)
+        request_kwargs["ExpressionAttributeValues"] = expression_attribute_values
+
+        filter_conditions = dict(search_conditions)
+        if plan:
+            key_attributes = [plan.partition_key]
+            if plan.sort_key:
+                key_attributes.append(plan.sort_key)
+            request_kwargs["KeyConditionExpression"] = " AND ".join(
+                [f"#{attr} = :{attr}" for attr in key_attributes]
             )
-            return response.get("Items", [])
-        except ClientError as e:
-            raise DynamoDBOperationError(f"Error searching items: {e}")
-        except Exception as e:
-            raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+            if plan.index_name:
+                request_kwargs["IndexName"] = plan.index_name
+            for attr in key_attributes:
+                del filter_conditions[attr]
+
+        if filter_conditions:
+            filter_expression, _, _ = self._build_filter_expression(filter_conditions)
+            request_kwargs["FilterExpression"] = filter_expression
+        return request_kwargs
+
+    @staticmethod
+    def _is_missing_index_error(error: ClientError) -> bool:
+        error_info = error.response.get("Error", {})
+        return (
+            error_info.get("Code") == "ValidationException"
+            and "index" in error_info.get("Message", "").lower()
+        )
 
     def delete_item(self, key):
         """
@@ -95,6 +1133,7 @@ class DynamoDBHandler:
         """
         try:
             response = self.table.delete_item(Key=key)
+            _invalidate_key(self.table_name, key)
             return response
         except ClientError as e:
             raise DynamoDBOperationError(f"Error deleting item: {e}")
@@ -123,6 +1162,7 @@ class DynamoDBHandler:
                 ExpressionAttributeValues=expression_attribute_values,
                 ReturnValues="UPDATED_NEW",
             )
+            _invalidate_key(self.table_name, key)
             return response.get("Attributes", {})
         except ClientError as e:
             raise DynamoDBOperationError(f"Error updating item: {e}")
@@ -131,14 +1171,205 @@ class DynamoDBHandler:
 
     def get_item_id(self, search_conditions: dict) -> str:
         try:
-            items = self.search_items(search_conditions)
-            if items:
-                return items[0]["id"]
+            item = next(self.iter_items(search_conditions, attributes=["id"]), None)
+            if item:
+                return item["id"]
             else:
                 return None
         except DynamoDBOperationError as e:
             return None
 
+    def natural_id(self, natural_key: Dict[str, Any]) -> str:
+        """
+        Deterministic id of the item identified by `natural_key`: the same
+        table and key values always give the same uuid5, so concurrent or
+        retried writers of one logical item address the same row.
+        """
+        name = "|".join(
+            [table_model_name(self.table_name)]
+            + [f"{attr}={natural_key[attr]}" for attr in sorted(natural_key)]
+        )
+        return str(uuid.uuid5(UPSERT_ID_NAMESPACE, name))
+
+    def resolve_id(
+        self, natural_key: Dict[str, Any], legacy_lookup: Optional[bool] = None
+    ) -> str:
+        """
+        Id to write the item identified by `natural_key` under: the id of a
+        legacy row when `legacy_lookup` is on (defaults to
+        `UPSERT_LEGACY_LOOKUP`) and one exists, else `natural_id`.
+
+        The legacy row is only ever looked up with a `Query` on the table key
+        or an index; when none fits the key, or the index isn't deployed,
+        this raises rather than scanning or reading "no legacy row", which
+        would write a duplicate next to it.
+        """
+        if legacy_lookup is None:
+            legacy_lookup = UPSERT_LEGACY_LOOKUP
+        if not legacy_lookup:
+            return self.natural_id(natural_key)
+
+        plan = self.plan_query(natural_key)
+        if plan is None:
+            raise DynamoDBOperationError(
+                f"No index for {sorted(natural_key)} on {self.table_name} to look up a legacy row"
+            )
+        request_kwargs = self._build_read_request(natural_key, plan, ["id"])
+        try:
+            while True:
+                response = self.table.query(**request_kwargs)
+                items = response.get("Items", [])
+                if items:
+                    return items[0]["id"]
+                last_evaluated_key = response.get("LastEvaluatedKey")
+                if not last_evaluated_key:
+                    return self.natural_id(natural_key)
+                request_kwargs["ExclusiveStartKey"] = last_evaluated_key
+        except ClientError as e:
+            if plan.index_name and self._is_missing_index_error(e):
+                _unavailable_indexes.add((self.table_name, plan.index_name))
+            raise DynamoDBOperationError(f"Error looking up legacy row: {e}")
+        except Exception as e:
+            raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+    def upsert(
+        self,
+        natural_key: Dict[str, Any],
+        item: Dict[str, Any],
+        overwrite: bool = True,
+        legacy_lookup: Optional[bool] = None,
+    ) -> str:
+        """
+        Create or update the item identified by `natural_key` with a single
+        write, without scanning for an existing id first.
+
+        Args:
+        - natural_key (dict): attributes that identify the item, e.g. {"uid": ..., "startAt": ...}.
+        - item (dict): attributes to write; the natural key attributes are added to it.
+        - overwrite (bool): update an existing item (True) or leave it untouched (False).
+        - legacy_lookup (bool): see `resolve_id`.
+
+        Returns:
+        - str: id of the created or existing item.
+
+        ```
+        # Example usage:
+        handler = DynamoDBHandler.for_table("DeviceInfo-...")
+        id = handler.upsert(
+            {"deviceToken": token, "email": email}, {"isOn": True}
+        )
+        ```
+        """
+        id = self.resolve_id(natural_key, legacy_lookup)
+        aws_date = self.generate_AWSDateTime()
+        attributes = {**item, **natural_key}
+        attributes.pop("id", None)
+
+        try:
+            if overwrite:
+                attributes["updatedAt"] = aws_date
+                names = {"#createdAt": "createdAt"}
+                values = {":createdAt": aws_date}
+                assignments = ["#createdAt = if_not_exists(#createdAt, :createdAt)"]
+                for idx, (attr, value) in enumerate(attributes.items()):
+                    names[f"#upd{idx}"] = attr
+                    values[f":upd{idx}"] = value
+                    assignments.append(f"#upd{idx} = :upd{idx}")
+                self.table.update_item(
+                    Key={"id": id},
+                    UpdateExpression="SET " + ", ".join(assignments),
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values,
+                )
+            else:
+                attributes["id"] = id
+                attributes["updatedAt"] = attributes["createdAt"] = aws_date
+                self.table.put_item(
+                    Item=attributes,
+                    ConditionExpression="attribute_not_exists(#id)",
+                    ExpressionAttributeNames={"#id": "id"},
+                )
+            _invalidate_key(self.table_name, {"id": id})
+            return id
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return id
+            raise DynamoDBOperationError(f"Error upserting item: {e}")
+        except Exception as e:
+            raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+    def update_if_newer(
+        self,
+        key: Dict[str, Any],
+        attributes: Dict[str, Any],
+        version_attribute: str,
+        version: int,
+    ) -> bool:
+        """
+        Set `attributes` and `version_attribute` on the item unless it already
+        holds a version greater or equal to `version`, so concurrent writers
+        finishing out of order can't replace newer data with older.
+
+        Args:
+        - key (dict): key of the item, e.g. {"id": ...}.
+        - attributes (dict): attributes to set.
+        - version_attribute (str): numeric attribute compared with `version`.
+        - version (int): version of `attributes`, e.g. a timestamp in milliseconds.
+
+        Returns:
+        - bool: True when written, False when a newer version was already stored.
+
+        ```
+        # Example usage:
+        handler = DynamoDBHandler.for_table("ExtraEvent-...")
+        handler.update_if_newer(
+            {"id": id}, {"scheduleSnapshot": payload}, "scheduleVersion", version
+        )
+        ```
+        """
+        names = {"#version": version_attribute}
+        values = {":version": version}
+        assignments = ["#version = :version"]
+        for idx, (attr, value) in enumerate(attributes.items()):
+            names[f"#upd{idx}"] = attr
+            values[f":upd{idx}"] = value
+            assignments.append(f"#upd{idx} = :upd{idx}")
+
+        try:
+            self.table.update_item(
+                Key=key,
+                UpdateExpression="SET " + ", ".join(assignments),
+                ConditionExpression="attribute_not_exists(#version) OR #version < :version",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+            _invalidate_key(self.table_name, key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise DynamoDBOperationError(f"Error updating item: {e}")
+        except Exception as e:
+            raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+    def batch_writer(self) -> "BatchWriter":
+        """
+        Buffer puts and deletes and send them through `batch_write_item`,
+        25 requests at a time. Remaining requests are flushed when the
+        `with` block exits.
+
+        ```
+        # Example usage:
+        handler = DynamoDBHandler("YourTableName")
+        with handler.batch_writer() as writer:
+            for event in events:
+                writer.put_item({"uid": event["uid"]})
+            writer.delete_item({"id": stale_id})
+        print(writer.stats)
+        ```
+        """
+        return BatchWriter(self)
+
     def _build_key_condition_expression(self, key_conditions):
         """
         Build a key condition expression string from a list of key conditions.
@@ -183,6 +1414,36 @@ class DynamoDBHandler:
             expression_attribute_values,
         )
 
+    def _build_projection_expression(self, attributes: List[str]):
+        """
+        Build a projection expression with placeholders, so reserved words
+        such as `status` or `name` can be projected.
+
+        ```
+        # Example usage:
+        attributes = ["id", "status"]
+
+        # output:
+        Projection Expression: "#proj0, #proj1"
+        Expression Attribute Names: {'#proj0': 'id', '#proj1': 'status'}
+        ```
+        """
+        expression_attribute_names = {
+            f"#proj{idx}": attr for idx, attr in enumerate(attributes)
+        }
+        projection_expression = ", ".join(expression_attribute_names.keys())
+        return projection_expression, expression_attribute_names
+
+    def _partition_key_name(self) -> str:
+        return self._key_attribute_names()[0]
+
+    def _key_attribute_names(self) -> List[str]:
+        schema = TABLE_INDEXES.get(table_model_name(self.table_name))
+        if schema is None:
+            return ["id"]
+        partition_key, sort_key = schema["key"]
+        return [partition_key, sort_key] if sort_key else [partition_key]
+
     def _build_filter_expression(self, attributes):
         """
         Build a filter expression string from a dictionary of attribute names and values.
@@ -219,14 +1480,34 @@ class DynamoDBHandler:
         )
 
     def search_item_betweens(
-        self, start_date: str, end_date: str, key: str, value: str
+        self,
+        start_date: str,
+        end_date: str,
+        key: str,
+        value: str,
+        attributes: Optional[List[str]] = None,
     ):
         """
+        Items with `key` equal to `value` whose [startDateTime, endDateTime]
+        overlaps the range. Tables with a day bucket index on `key` (see
+        `DAY_BUCKET_INDEXES`) are read through it, and an empty answer is a
+        quiet window; every item of `value` is only read when the index
+        isn't deployed. Others are scanned.
 
         Args:
             start_date (str): date str formatted like `20240523T100000`
             end_date (str): date str formatted like `20240523T100000`
+            attributes (list): optional attribute names to read instead of whole items.
         """
+        index = DayBucketIndex.for_table(self.table_name)
+        if index is not None and index.partition_key == key:
+            items = index.query(value, start_date, end_date)
+            if not index.available:
+                # read the partition by `key` as before the index existed
+                items = self._search_overlapping(start_date, end_date, key, value)
+            if attributes:
+                items = [{attr: item[attr] for attr in attributes if attr in item} for item in items]
+            return items
 
         input_format = "%Y%m%dT%H%M%S"
         db_format = "%Y-%m-%dT%H:%M:%S.000Z"
@@ -238,12 +1519,18 @@ class DynamoDBHandler:
         start_date_str = start_datetime.strftime(db_format)
         end_date_str = end_datetime.strftime(db_format)
 
+        scan_kwargs = {
+            "FilterExpression": Attr("startDateTime").lte(end_date_str)
+            & Attr("endDateTime").gte(start_date_str)
+            & Attr(key).eq(value)
+        }
+        if attributes:
+            projection_expression, expression_attribute_names = self._build_projection_expression(attributes)
+            scan_kwargs["ProjectionExpression"] = projection_expression
+            scan_kwargs["ExpressionAttributeNames"] = expression_attribute_names
+
         try:
-            response = self.table.scan(
-                FilterExpression=Attr("startDateTime").lte(end_date_str)
-                & Attr("endDateTime").gte(start_date_str)
-                & Attr(key).eq(value)
-            )
+            response = self.table.scan(**scan_kwargs)
             items = response.get("Items", [])
             return items
         except ClientError as e:
@@ -252,3 +1539,265 @@ class DynamoDBHandler:
             raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
 
         return response["Items"]
+
+    def _search_overlapping(
+        self, start_date: str, end_date: str, key: str, value: str
+    ) -> List[Dict[str, Any]]:
+        start = datetime.strptime(start_date, "%Y%m%dT%H%M%S").strftime(_AWS_DATETIME_FORMAT)
+        end = datetime.strptime(end_date, "%Y%m%dT%H%M%S").strftime(_AWS_DATETIME_FORMAT)
+        return [
+            item
+            for item in self.iter_items({key: value})
+            if item.get("startDateTime")
+            and item["startDateTime"] <= end
+            and (item.get("endDateTime") or item["startDateTime"]) >= start
+        ]
+
+
+class BatchWriteStats:
+    """Counters of a `BatchWriter`: requests written, retries of unprocessed items and time spent."""
+
+    def __init__(self):
+        self.items_written = 0
+        self.flushes = 0
+        self.retries = 0
+        self.elapsed_seconds = 0.0
+
+    def __repr__(self):
+        return (
+            f"BatchWriteStats(items_written={self.items_written}, flushes={self.flushes}, "
+            f"retries={self.retries}, elapsed={self.elapsed_seconds:.3f}s)"
+        )
+
+
+class BatchWriter:
+    """
+    Buffers `put_item`/`delete_item` requests for one table and writes them
+    with `batch_write_item` in groups of 25. A later request for the same key
+    replaces an earlier buffered one, because DynamoDB rejects batches that
+    touch a key twice. Use it through `DynamoDBHandler.batch_writer()`.
+    """
+
+    def __init__(self, handler: DynamoDBHandler, flush_size: int = BATCH_WRITE_LIMIT):
+        self.handler = handler
+        self.flush_size = min(flush_size, BATCH_WRITE_LIMIT)
+        self.stats = BatchWriteStats()
+        self._key_names = handler._key_attribute_names()
+        self._buffer: Dict[tuple, Dict[str, Any]] = {}
+        self._started = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+    def put_item(self, item: Dict[str, Any], id: Optional[str] = None) -> str:
+        """Buffer a put; the item is stamped like `DynamoDBHandler.save_item` and its id returned."""
+        aws_date = self.handler.generate_AWSDateTime()
+        item["id"] = id or item.get("id") or str(uuid.uuid4())
+        item["updatedAt"] = item["createdAt"] = aws_date
+        self._add(item, {"PutRequest": {"Item": item}})
+        return item["id"]
+
+    def delete_item(self, key: Dict[str, Any]):
+        self._add(key, {"DeleteRequest": {"Key": key}})
+
+    def _add(self, item: Dict[str, Any], request: Dict[str, Any]):
+        buffer_key = tuple(item.get(name) for name in self._key_names)
+        _invalidate_key(
+            self.handler.table_name, {name: item.get(name) for name in self._key_names}
+        )
+        self._buffer.pop(buffer_key, None)
+        self._buffer[buffer_key] = request
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        requests = list(self._buffer.values())
+        self._buffer = {}
+
+        table_name = self.handler.table_name
+        request_items = {table_name: requests}
+        attempt = 0
+        try:
+            while request_items:
+                try:
+                    response = self.handler.dynamodb.batch_write_item(RequestItems=request_items)
+                except ClientError as e:
+                    raise DynamoDBOperationError(f"Error writing items: {e}")
+                except Exception as e:
+                    raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+                unprocessed = response.get("UnprocessedItems") or {}
+                self.stats.items_written += len(request_items[table_name]) - len(
+                    unprocessed.get(table_name, [])
+                )
+                request_items = unprocessed
+                if request_items:
+                    attempt += 1
+                    self.stats.retries += 1
+                    if attempt >= BATCH_MAX_ATTEMPTS:
+                        raise DynamoDBOperationError(
+                            f"Error writing items: requests still unprocessed after {attempt} attempts"
+                        )
+                    _backoff_sleep(attempt)
+        finally:
+            self.stats.flushes += 1
+            self.stats.elapsed_seconds = time.perf_counter() - self._started
+
+
+# Tables whose rows are also written to a day bucket index:
+# model name -> (index model name, attribute the buckets are partitioned by)
+DAY_BUCKET_INDEXES = {
+    "ICalendarEvent": ("ICalendarEventDay", "iCalendarID"),
+}
+
+# Events spanning more days than this go to one per-partition bucket that
+# every window read queries, instead of one row per day.
+DAY_BUCKET_MAX_SPAN_DAYS = 31
+SPANNING_BUCKET = "*"
+
+# Bucket rows carry every attribute of their indexed row, so window reads
+# return the same items as the table; these are the bucket's own.
+DAY_BUCKET_KEYS = ("id", "eventID", "dayBucket", "startKey", "createdAt", "updatedAt")
+
+_AWS_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+
+class DayBucketIndex:
+    """
+    Window index of the rows of a table with `startDateTime`/`endDateTime`:
+    each row is copied to one bucket per day it touches, partitioned by
+    `<partition value>#YYYYMMDD` and sorted by its start. A window read is
+    then one `Query` per day of the window, whatever the size of the table,
+    and rows spanning several days are found from any of them.
+
+    ```
+    # Example usage:
+    index = DayBucketIndex.for_table("ICalendarEvent-...")
+    with index.handler.batch_writer() as writer:
+        index.put(event, writer)
+    events = index.query(calendar_id, "20240523T000000", "20240530T000000")
+    ```
+    """
+
+    def __init__(
+        self,
+        handler: DynamoDBHandler,
+        partition_key: str,
+        max_span_days: int = DAY_BUCKET_MAX_SPAN_DAYS,
+    ):
+        self.handler = handler
+        self.partition_key = partition_key
+        self.max_span_days = max_span_days
+
+    @classmethod
+    def for_table(cls, table_name: str) -> Optional["DayBucketIndex"]:
+        """Index of `table_name` registered in `DAY_BUCKET_INDEXES`, if any."""
+        model_name = table_model_name(table_name)
+        if model_name not in DAY_BUCKET_INDEXES:
+            return None
+        index_model, partition_key = DAY_BUCKET_INDEXES[model_name]
+        index_table = index_model + table_name[len(model_name) :]
+        return cls(DynamoDBHandler.for_table(index_table), partition_key)
+
+    @property
+    def available(self) -> bool:
+        """False once the index table or its `byDayBucket` index turned out not to be deployed."""
+        return (self.handler.table_name, "byDayBucket") not in _unavailable_indexes
+
+    @staticmethod
+    def _day(aws_datetime: str) -> datetime:
+        return datetime.strptime(aws_datetime[:10], "%Y-%m-%d")
+
+    def days(self, item: Dict[str, Any]) -> List[str]:
+        """Buckets (YYYYMMDD, or `SPANNING_BUCKET`) the item is written to."""
+        start = item.get("startDateTime")
+        if not start:
+            return []
+        first = self._day(start)
+        last = self._day(item.get("endDateTime") or start)
+        if last < first:
+            last = first
+        if (last - first).days >= self.max_span_days:
+            return [SPANNING_BUCKET]
+        return [
+            (first + timedelta(days=offset)).strftime("%Y%m%d")
+            for offset in range((last - first).days + 1)
+        ]
+
+    def put(self, item: Dict[str, Any], writer: "BatchWriter"):
+        """Buffer the bucket rows of `item` (which must have its `id`) on `writer`."""
+        partition_value = item[self.partition_key]
+        for day in self.days(item):
+            row = {attr: value for attr, value in item.items() if attr not in DAY_BUCKET_KEYS}
+            row.update(
+                {
+                    self.partition_key: partition_value,
+                    "eventID": item["id"],
+                    "dayBucket": f"{partition_value}#{day}",
+                    "startKey": f"{item['startDateTime']}#{item['id']}",
+                }
+            )
+            writer.put_item(row, f"{item['id']}#{day}")
+
+    def delete(self, item: Dict[str, Any], writer: "BatchWriter"):
+        """
+        Buffer deletes of the bucket rows written for `item` as stored, so it
+        needs the stored `id`, `startDateTime` and `endDateTime`.
+        """
+        for day in self.days(item):
+            writer.delete_item({"id": f"{item['id']}#{day}"})
+
+    def query(self, partition_value: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """
+        Indexed rows of `partition_value` overlapping [start_date, end_date]
+        (formatted like `20240523T100000`), each once, in start order. An
+        index table or `byDayBucket` index that isn't deployed reads as
+        empty, and is not queried again by this container.
+        """
+        if not self.available:
+            return []
+        start = datetime.strptime(start_date, "%Y%m%dT%H%M%S").strftime(_AWS_DATETIME_FORMAT)
+        end = datetime.strptime(end_date, "%Y%m%dT%H%M%S").strftime(_AWS_DATETIME_FORMAT)
+
+        first = self._day(start)
+        days = [
+            (first + timedelta(days=offset)).strftime("%Y%m%d")
+            for offset in range((self._day(end) - first).days + 1)
+        ]
+        days.append(SPANNING_BUCKET)
+
+        found = {}
+        try:
+            for day in days:
+                # rows of a day bucket may have started on an earlier day, so
+                # only the upper bound of the sort key is known
+                for row in self.handler.iter_range(
+                    "byDayBucket", f"{partition_value}#{day}", "0", f"{end}#~"
+                ):
+                    if (row.get("endDateTime") or row["startDateTime"]) < start:
+                        continue
+                    if row["eventID"] not in found:
+                        item = {
+                            attr: value
+                            for attr, value in row.items()
+                            if attr not in DAY_BUCKET_KEYS
+                        }
+                        item["id"] = row["eventID"]
+                        found[row["eventID"]] = item
+        except DynamoDBOperationError as e:
+            cause = e.__context__
+            if not isinstance(cause, ClientError) or not (
+                cause.response.get("Error", {}).get("Code") == "ResourceNotFoundException"
+                or DynamoDBHandler._is_missing_index_error(cause)
+            ):
+                raise
+            print(f"Day bucket index of {self.handler.table_name} unavailable: {cause}")
+            _unavailable_indexes.add((self.handler.table_name, "byDayBucket"))
+            return []
+        return sorted(found.values(), key=lambda item: item["startDateTime"])
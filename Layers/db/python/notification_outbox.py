@@ -0,0 +1,276 @@
+import copy
+import itertools
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from botocore.exceptions import ClientError
+from db import DynamoDBHandler, DynamoDBOperationError
+
+PENDING = "PENDING"
+SENT = "SENT"
+FAILED = "FAILED"
+
+# large enough for a bulk update to be coalesced within one batch
+DRAIN_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# a claimed row is sent again if its drain didn't finish within the lease
+LEASE_MILLIS = 60 * 1000
+RETRY_BASE_MILLIS = 5 * 1000
+RETRY_MAX_MILLIS = 10 * 60 * 1000
+# SENT rows are kept (as dedupe markers) until DynamoDB's TTL removes them
+SENT_RETENTION_SECONDS = 24 * 3600
+
+
+def now_millis() -> int:
+    return int(time.time() * 1000)
+
+
+def retry_delay_millis(attempts: int) -> int:
+    """Backoff before the next attempt, with full jitter."""
+    return random.randint(
+        RETRY_BASE_MILLIS, min(RETRY_MAX_MILLIS, RETRY_BASE_MILLIS * 2 ** attempts)
+    )
+
+
+class NotificationOutbox:
+    """
+    Durable queue of push notifications in the NotificationOutbox table, so
+    request handlers enqueue a notification and respond without waiting on
+    the push provider. `drain` sends the due rows in batches: every row is
+    claimed with a lease before it is sent and marked SENT afterwards, so a
+    drain that dies in between leaves it to be sent again (at-least-once).
+    Enqueueing the same `dedupe_key` twice stores a single row.
+
+    ```
+    # Example usage:
+    outbox = NotificationOutbox("-2iph2dahajadpnro5xkxcbveoq-staging")
+    outbox.enqueue({"message": "..."}, dedupe_key=f"{uid}#{startAt}#{status}")
+
+    # in the drain Lambda
+    counts = outbox.drain(send_batch)
+    ```
+    """
+
+    def __init__(self, table_name_suffix: str):
+        self.handler = DynamoDBHandler.for_table("NotificationOutbox" + table_name_suffix)
+
+    def enqueue(
+        self, notification: Dict[str, Any], dedupe_key: str, delay_millis: int = 0
+    ) -> str:
+        """
+        Store `notification` (any JSON-like dict, handed as is to the drain's
+        `send_batch`) to be sent once `delay_millis` have passed. Delaying
+        lets the drain send notifications queued close together as one.
+
+        Returns:
+        - str: id of the outbox row.
+        """
+        row = {
+            "dedupeKey": dedupe_key,
+            "notification": notification,
+            "state": PENDING,
+            "availableAt": now_millis() + delay_millis,
+            "attempts": 0,
+        }
+        return self._insert(row)
+
+    def _insert(self, row: Dict[str, Any]) -> str:
+        # the id derives from the dedupe key and an existing row is left untouched
+        return self.handler.upsert(
+            {"dedupeKey": row.pop("dedupeKey")}, row, overwrite=False, legacy_lookup=False
+        )
+
+    def _due(self, now: int, limit: int) -> List[Dict[str, Any]]:
+        return list(
+            itertools.islice(self.handler.iter_range("byState", PENDING, 0, now), limit)
+        )
+
+    def _update(
+        self,
+        row_id: str,
+        attributes: Dict[str, Any],
+        condition: Optional[Dict[str, Any]] = None,
+        increment: Optional[str] = None,
+    ) -> bool:
+        names = {}
+        values = {}
+        assignments = []
+        for idx, (attr, value) in enumerate(attributes.items()):
+            names[f"#upd{idx}"] = attr
+            values[f":upd{idx}"] = value
+            assignments.append(f"#upd{idx} = :upd{idx}")
+        if increment:
+            names["#inc"] = increment
+            values[":zero"] = 0
+            values[":one"] = 1
+            assignments.append("#inc = if_not_exists(#inc, :zero) + :one")
+
+        request_kwargs = {}
+        if condition:
+            checks = []
+            for idx, (attr, value) in enumerate(condition.items()):
+                names[f"#cond{idx}"] = attr
+                values[f":cond{idx}"] = value
+                checks.append(f"#cond{idx} = :cond{idx}")
+            request_kwargs["ConditionExpression"] = " AND ".join(checks)
+
+        try:
+            self.handler.table.update_item(
+                Key={"id": row_id},
+                UpdateExpression="SET " + ", ".join(assignments),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+                **request_kwargs,
+            )
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise DynamoDBOperationError(f"Error updating outbox row: {e}")
+        except Exception as e:
+            raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+
+    def claim_due(
+        self, limit: int = DRAIN_BATCH_SIZE, horizon_millis: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` PENDING rows for `LEASE_MILLIS` once the earliest
+        one is due, along with the rows due within `horizon_millis` of now.
+        Nothing is claimed while every row is still delayed, so a row is
+        held back by its `availableAt` rather than by the drain waiting. A
+        row another drain claimed in the meantime is skipped.
+        """
+        now = now_millis()
+        due = self._due(now + horizon_millis, limit)
+        if due and int(due[0]["availableAt"]) > now:
+            return []
+        claimed = []
+        for row in due:
+            if self._update(
+                row["id"],
+                {"availableAt": now + LEASE_MILLIS},
+                condition={"state": PENDING, "availableAt": row["availableAt"]},
+                increment="attempts",
+            ):
+                row["attempts"] = int(row.get("attempts") or 0) + 1
+                claimed.append(row)
+        return claimed
+
+    def mark_sent(self, row: Dict[str, Any]):
+        self._update(
+            row["id"],
+            {"state": SENT, "expiresAt": int(time.time()) + SENT_RETENTION_SECONDS},
+        )
+
+    def mark_failed(self, row: Dict[str, Any], error: Exception, permanent: bool = False):
+        """Schedule the next attempt of `row`, or give up after `MAX_ATTEMPTS`."""
+        if permanent or row["attempts"] >= MAX_ATTEMPTS:
+            self._update(row["id"], {"state": FAILED, "lastError": str(error)})
+        else:
+            self._update(
+                row["id"],
+                {
+                    "availableAt": now_millis() + retry_delay_millis(row["attempts"]),
+                    "lastError": str(error),
+                },
+            )
+
+    def drain(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]]], List[Any]],
+        is_permanent: Callable[[Exception], bool] = lambda error: False,
+        batch_size: int = DRAIN_BATCH_SIZE,
+        deadline: Optional[float] = None,
+        horizon_millis: int = 0,
+    ) -> Dict[str, int]:
+        """
+        Send the due notifications until none is left or `deadline` (a
+        `time.monotonic()` value) passes.
+
+        Args:
+        - send_batch (callable): sends a list of notifications and returns, per
+          notification, its result or the exception it failed with.
+        - is_permanent (callable): whether a failure is worth no retry.
+        - batch_size (int): rows claimed and sent at a time.
+        - deadline (float): stop claiming new batches after this time.
+        - horizon_millis (int): also send the rows due within this delay once
+          one is due, so notifications queued moments apart go in the same
+          batch.
+
+        Returns:
+        - dict: counts of rows "sent", "retried" and "failed".
+        """
+        counts = {"sent": 0, "retried": 0, "failed": 0}
+        while deadline is None or time.monotonic() < deadline:
+            rows = self.claim_due(batch_size, horizon_millis)
+            if not rows:
+                break
+            try:
+                results = send_batch([row["notification"] for row in rows])
+            except Exception as e:
+                results = [e] * len(rows)
+
+            for row, result in zip(rows, results):
+                if isinstance(result, Exception):
+                    permanent = is_permanent(result)
+                    self.mark_failed(row, result, permanent)
+                    if permanent or row["attempts"] >= MAX_ATTEMPTS:
+                        counts["failed"] += 1
+                    else:
+                        counts["retried"] += 1
+                else:
+                    self.mark_sent(row)
+                    counts["sent"] += 1
+        return counts
+
+
+class InMemoryOutbox(NotificationOutbox):
+    """
+    `NotificationOutbox` kept in a dict, with the same claiming and retry
+    behaviour, for local runs and tests without a NotificationOutbox table.
+
+    ```
+    # Example usage:
+    lambda_function.outbox = InMemoryOutbox()
+    ```
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _insert(self, row: Dict[str, Any]) -> str:
+        row_id = row.pop("dedupeKey")
+        with self._lock:
+            if row_id not in self.rows:
+                self.rows[row_id] = {**copy.deepcopy(row), "id": row_id}
+        return row_id
+
+    def _due(self, now: int, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            due = sorted(
+                (
+                    row
+                    for row in self.rows.values()
+                    if row["state"] == PENDING and row["availableAt"] <= now
+                ),
+                key=lambda row: row["availableAt"],
+            )
+            return [copy.deepcopy(row) for row in due[:limit]]
+
+    def _update(
+        self,
+        row_id: str,
+        attributes: Dict[str, Any],
+        condition: Optional[Dict[str, Any]] = None,
+        increment: Optional[str] = None,
+    ) -> bool:
+        with self._lock:
+            row = self.rows[row_id]
+            if condition and any(row.get(attr) != value for attr, value in condition.items()):
+                return False
+            row.update(attributes)
+            if increment:
+                row[increment] = row.get(increment, 0) + 1
+            return True
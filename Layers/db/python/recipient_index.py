@@ -0,0 +1,240 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from db import DynamoDBHandler, DynamoDBOperationError, table_model_name
+
+# Employees of these roles are notified of status changes in their store
+RECIPIENT_ROLES = ("OWNER", "MANAGER")
+
+# id of the row holding the recipients of every store
+ALL_STORES = "ALL"
+
+# Store id of the owners and managers without a storeID, who are notified
+# of every status change like the others
+UNASSIGNED_STORE = "UNASSIGNED"
+
+# Batches rebuilding a row at once write it conditionally on this
+# attribute, and read its sources again when another one won.
+VERSION_ATTRIBUTE = "version"
+UPDATE_ATTEMPTS = 5
+
+_deserializer = TypeDeserializer()
+
+
+def _store_row_id(store_id: str) -> str:
+    return f"store#{store_id}"
+
+
+class RecipientIndex:
+    """
+    Materialized emails of the owners and managers with a device that has
+    notifications on, one NotificationRecipient row per store (and one for
+    those without a store) plus an `ALL_STORES` row with the union. Reading the recipients is a single
+    `get_item`; rows are rebuilt per affected store when Employee, User or
+    DeviceInfo items change (see `apply_stream_records`), and all at once
+    by `rebuild_all` (see backfill_notification_recipients.py).
+
+    ```
+    # Example usage:
+    index = RecipientIndex("-2iph2dahajadpnro5xkxcbveoq-staging")
+    emails = index.recipients()
+    store_emails = index.recipients(store_id)
+    ```
+    """
+
+    def __init__(self, table_name_suffix: str):
+        self.table_name_suffix = table_name_suffix
+        self.index = DynamoDBHandler.for_table("NotificationRecipient" + table_name_suffix)
+        self.employees = DynamoDBHandler.for_table("Employee" + table_name_suffix)
+        self.users = DynamoDBHandler.for_table("User" + table_name_suffix)
+        self.devices = DynamoDBHandler.for_table("DeviceInfo" + table_name_suffix)
+
+    def recipients(self, store_id: Optional[str] = None) -> List[str]:
+        """
+        Subscribed owner/manager emails of `store_id`, or of every store.
+        Empty until the index is built by `rebuild_all`.
+        """
+        row_id = _store_row_id(store_id) if store_id else ALL_STORES
+        # whole-item reads are served from the warm read cache
+        row = self.index.get_item({"id": row_id})
+        if row is None:
+            print(f"No NotificationRecipient row {row_id}, is the index backfilled?")
+            return []
+        return list(row.get("emails") or [])
+
+    def _subscribed_emails(self, user_ids: Iterable[str]) -> List[str]:
+        users = self.users.get_items(list(user_ids), attributes=["email"])
+        emails = set()
+        for user in users.values():
+            email = user.get("email")
+            if not email or email in emails:
+                continue
+            # devices registered by SetupDevice carry the email, older ones the userID
+            for conditions in ({"email": email}, {"userID": user["id"]}):
+                devices = self.devices.iter_items(conditions, attributes=["isOn"])
+                if any(device.get("isOn", False) for device in devices):
+                    emails.add(email)
+                    break
+        return sorted(emails)
+
+    def _version(self, row_id: str) -> int:
+        try:
+            response = self.index.table.get_item(
+                Key={"id": row_id},
+                ConsistentRead=True,
+                ProjectionExpression="#version",
+                ExpressionAttributeNames={"#version": VERSION_ATTRIBUTE},
+            )
+        except ClientError as e:
+            raise DynamoDBOperationError(f"Error reading recipients: {e}")
+        return int(response.get("Item", {}).get(VERSION_ATTRIBUTE) or 0)
+
+    def _write_versioned(
+        self, row_id: str, build: Callable[[], Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Write the attributes `build` reads from the tables to row `row_id`.
+        The write only succeeds if no other batch wrote the row since its
+        version was read (before `build`), otherwise it starts over; so
+        the last write always read the tables after every earlier batch
+        wrote the row, and an older list never replaces a newer one.
+        """
+        for _ in range(UPDATE_ATTEMPTS):
+            version = self._version(row_id)
+            attributes = build()
+            if self.index.update_if_newer(
+                {"id": row_id}, attributes, VERSION_ATTRIBUTE, version + 1
+            ):
+                return attributes["emails"]
+        raise DynamoDBOperationError(
+            f"{row_id} recipients still contended after {UPDATE_ATTEMPTS} attempts"
+        )
+
+    def _recipient_user_ids(self, store_id: str) -> Set[str]:
+        if store_id == UNASSIGNED_STORE:
+            employees = (
+                employee
+                for role in RECIPIENT_ROLES
+                for employee in self.employees.iter_items(
+                    {"role": role}, attributes=["userID", "role", "storeID"]
+                )
+                if not employee.get("storeID")
+            )
+        else:
+            employees = self.employees.iter_items(
+                {"storeID": store_id}, attributes=["userID", "role"]
+            )
+        return {
+            employee["userID"]
+            for employee in employees
+            if employee.get("role") in RECIPIENT_ROLES and employee.get("userID")
+        }
+
+    def rebuild_store(self, store_id: str, update_all: bool = True) -> List[str]:
+        """
+        Recompute the row of `store_id` (`UNASSIGNED_STORE` for owners and
+        managers without a store), and the `ALL_STORES` row, from the tables.
+        """
+        emails = self._write_versioned(
+            _store_row_id(store_id),
+            lambda: {
+                "emails": self._subscribed_emails(self._recipient_user_ids(store_id)),
+                "storeID": store_id,
+            },
+        )
+        if update_all:
+            self._update_all()
+        return emails
+
+    def _store_emails(self) -> Set[str]:
+        emails = set()
+        scan_kwargs = {
+            "ConsistentRead": True,
+            "ProjectionExpression": "#id, #emails",
+            "ExpressionAttributeNames": {"#id": "id", "#emails": "emails"},
+        }
+        try:
+            while True:
+                response = self.index.table.scan(**scan_kwargs)
+                for row in response.get("Items", []):
+                    if row["id"] != ALL_STORES:
+                        emails.update(row.get("emails") or [])
+                if not response.get("LastEvaluatedKey"):
+                    return emails
+                scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            raise DynamoDBOperationError(f"Error scanning recipients: {e}")
+
+    def _update_all(self) -> List[str]:
+        """Write the union of the store rows to the `ALL_STORES` row."""
+        return self._write_versioned(ALL_STORES, lambda: {"emails": sorted(self._store_emails())})
+
+    def rebuild_all(self) -> List[str]:
+        """
+        Rebuild the row of every store that has an owner or manager, and
+        the `UNASSIGNED_STORE` row of those without a store.
+        """
+        store_ids = {UNASSIGNED_STORE}
+        for role in RECIPIENT_ROLES:
+            for employee in self.employees.iter_items({"role": role}, attributes=["storeID"]):
+                if employee.get("storeID"):
+                    store_ids.add(employee["storeID"])
+        for store_id in store_ids:
+            self.rebuild_store(store_id, update_all=False)
+        return self._update_all()
+
+    @staticmethod
+    def _store_of(employee: Dict[str, Any]) -> Optional[str]:
+        if employee.get("storeID"):
+            return employee["storeID"]
+        if employee.get("role") in RECIPIENT_ROLES:
+            return UNASSIGNED_STORE
+        return None
+
+    def _stores_of_users(self, user_ids: Iterable[str]) -> Set[str]:
+        store_ids = set()
+        for user_id in user_ids:
+            for employee in self.employees.iter_items(
+                {"userID": user_id}, attributes=["storeID", "role"]
+            ):
+                store_ids.add(self._store_of(employee))
+        store_ids.discard(None)
+        return store_ids
+
+    def affected_stores(self, model_name: str, images: Iterable[Dict[str, Any]]) -> Set[str]:
+        """Stores whose recipients may change with a write of these old/new items."""
+        images = [image for image in images if image]
+        if model_name == "Employee":
+            return {self._store_of(image) for image in images} - {None}
+
+        user_ids = set()
+        if model_name == "User":
+            user_ids = {image["id"] for image in images if image.get("id")}
+        elif model_name == "DeviceInfo":
+            user_ids = {image["userID"] for image in images if image.get("userID")}
+            for email in {image["email"] for image in images if image.get("email")}:
+                for user in self.users.iter_items({"email": email}, attributes=["id"]):
+                    user_ids.add(user["id"])
+        return self._stores_of_users(user_ids)
+
+    def apply_stream_records(self, records: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Rebuild the stores touched by a batch of DynamoDB stream records of
+        the Employee, User and DeviceInfo tables, each once.
+        """
+        store_ids = set()
+        for record in records:
+            table_name = record.get("eventSourceARN", "").split(":table/")[-1].split("/")[0]
+            change = record.get("dynamodb", {})
+            images = [
+                {key: _deserializer.deserialize(value) for key, value in image.items()}
+                for image in (change.get("OldImage"), change.get("NewImage"))
+                if image
+            ]
+            store_ids |= self.affected_stores(table_model_name(table_name), images)
+
+        for store_id in store_ids:
+            self.rebuild_store(store_id, update_all=False)
+        if store_ids:
+            self._update_all()
+        return store_ids
@@ -1,24 +1,124 @@
+import asyncio
+import importlib.util
 import os
-from onesignal_sdk.client import Client
+import threading
+from typing import Any, Dict, List, Optional
+import httpx
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.constants import API_ROOT
 from onesignal_sdk.error import OneSignalHTTPError
+from onesignal_sdk.request import _build_request_kwargs, _handle_response
+
+# Overridable to point the sender at a local mock of the REST API
+ONESIGNAL_API_ROOT = os.environ.get("ONESIGNAL_API_ROOT", API_ROOT)
+
+# Upper bounds of the request timeouts; they shrink to fit the Lambda's
+# remaining time minus a margin to answer the request.
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get("ONESIGNAL_CONNECT_TIMEOUT_SECONDS", 2.0))
+READ_TIMEOUT_SECONDS = float(os.environ.get("ONESIGNAL_READ_TIMEOUT_SECONDS", 5.0))
+DEADLINE_MARGIN_SECONDS = 1.0
+
+MAX_CONNECTIONS = 10
+
+# HTTP/2 multiplexes concurrent sends on one connection, but needs the h2
+# package in the layer; without it the pool stays on HTTP/1.1 keep-alive.
+HTTP2_ENABLED = (
+    os.environ.get("ONESIGNAL_HTTP2", "true").lower() == "true"
+    and importlib.util.find_spec("h2") is not None
+)
+
+
+def request_timeout(context: Any = None) -> httpx.Timeout:
+    """Timeout of one OneSignal request, fitted to the Lambda's remaining time."""
+    read = READ_TIMEOUT_SECONDS
+    connect = CONNECT_TIMEOUT_SECONDS
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        remaining = context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+        remaining = max(remaining, 0.5)
+        read = min(read, remaining)
+        connect = min(connect, remaining)
+    return httpx.Timeout(read, connect=connect, pool=connect)
 
 
 class OneSignalNotificationSender:
-    def __init__(self):
-        # Initialize the OneSignal client with environment variables for app ID and API key
-        try:
-            app_id = "885d0c68-ea20-4654-a5f8-e43f0ec52a15"
-            api_key = "NGIwYWM2NGYtMmQwMy00MWRkLWE2MTktZTg1MjhjYjZmNmM3"
-
-            # Initialize the OneSignal Client
-            self.client = Client(app_id=app_id, rest_api_key=api_key)
-        except NameError:
-            print(
-                "OneSignal Client couldn't be initialized. Make sure the SDK is installed."
-            )
-            self.client = None
+    """
+    Sends notifications through connection pools kept for the life of the
+    container, so only the first send pays the TLS handshake to OneSignal.
+    Use `OneSignalNotificationSender.shared()` rather than one instance per
+    call; `send_many` sends several notifications concurrently.
+
+    ```
+    # Example usage:
+    sender = OneSignalNotificationSender.shared()
+    sender.send_notification_by_external_ids(emails, message, fr_message, context=context)
+    ```
+    """
+
+    _shared: Optional["OneSignalNotificationSender"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, app_id: str = None, api_key: str = None, api_root: str = None):
+        app_id = app_id or os.environ.get(
+            "ONESIGNAL_APP_ID", "885d0c68-ea20-4654-a5f8-e43f0ec52a15"
+        )
+        api_key = api_key or os.environ.get(
+            "ONESIGNAL_REST_API_KEY", "NGIwYWM2NGYtMmQwMy00MWRkLWE2MTktZTg1MjhjYjZmNmM3"
+        )
+        options = {"API_ROOT": api_root or ONESIGNAL_API_ROOT}
+
+        # the SDK clients only build the requests; they are sent on the pools below
+        self.client = Client(app_id=app_id, rest_api_key=api_key, options=options)
+        self.async_client = AsyncClient(app_id=app_id, rest_api_key=api_key, options=options)
+
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS
+        )
+        self.http = httpx.Client(
+            http2=HTTP2_ENABLED, limits=limits, timeout=request_timeout()
+        )
+        # an AsyncClient is bound to the loop it first ran on, so the sender
+        # keeps its own loop instead of a new one per asyncio.run
+        self._loop = asyncio.new_event_loop()
+        self.async_http = httpx.AsyncClient(
+            http2=HTTP2_ENABLED, limits=limits, timeout=request_timeout()
+        )
+
+    @classmethod
+    def shared(cls) -> "OneSignalNotificationSender":
+        """The container-wide sender, created on first use."""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _request(self, method, url, token=None, payload=None, params=None, context=None):
+        request_kwargs = _build_request_kwargs(token, payload, params)
+        response = self.http.request(
+            method, url, timeout=request_timeout(context), **request_kwargs
+        )
+        return _handle_response(response)
+
+    async def _async_request(
+        self, method, url, token=None, payload=None, params=None, context=None
+    ):
+        request_kwargs = _build_request_kwargs(token, payload, params)
+        response = await self.async_http.request(
+            method, url, timeout=request_timeout(context), **request_kwargs
+        )
+        return _handle_response(response)
+
+    @staticmethod
+    def external_ids_notification(external_ids, message, fr_message=None) -> Dict[str, Any]:
+        if fr_message is None:
+            fr_message = message
+        return {
+            "contents": {"en": message, "fr": fr_message},
+            "included_segments": ["Subscribed Users"],
+            "include_external_user_ids": external_ids,
+        }
 
-    def send_notification(self, message, fr_message=None, segments=["All"]):
+    def send_notification(self, message, fr_message=None, segments=["All"], context=None):
         # Prepare the notification payload
         fr_message = message if fr_message is None else fr_message
         notification = {
@@ -28,29 +128,24 @@ class OneSignalNotificationSender:
 
         try:
             # Send the notification
-            response = self.client.send_notification(notification)
+            response = self._request(
+                **self.client._kwargs_send_notification(notification), context=context
+            )
             print("Notification sent successfully:", response)
             return True
         except Exception as e:
             print("Error sending notification:", str(e))
             raise e
 
-    def send_notification_by_external_ids(self, external_ids, message, fr_message=None):
-        if self.client is None:
-            print("OneSignal client is not initialized. Cannot send notification.")
-            return None
-
-        if fr_message is None:
-            fr_message = message
-
-        notification = {
-            "contents": {"en": message, "fr": fr_message},
-            "included_segments": ["Subscribed Users"],
-            "include_external_user_ids": external_ids,
-        }
+    def send_notification_by_external_ids(
+        self, external_ids, message, fr_message=None, context=None
+    ):
+        notification = self.external_ids_notification(external_ids, message, fr_message)
 
         try:
-            response = self.client.send_notification(notification)
+            response = self._request(
+                **self.client._kwargs_send_notification(notification), context=context
+            )
             print(f"Full API Response: {response.body}")
             return response
         except OneSignalHTTPError as e:
@@ -62,9 +157,33 @@ class OneSignalNotificationSender:
             print(f"Unexpected error: {str(e)}")
             raise e
 
+    async def _send_many(self, notifications, context=None):
+        return await asyncio.gather(
+            *[
+                self._async_request(
+                    **self.async_client._kwargs_send_notification(notification),
+                    context=context,
+                )
+                for notification in notifications
+            ],
+            return_exceptions=True,
+        )
+
+    def send_many(self, notifications: List[Dict[str, Any]], context=None) -> List[Any]:
+        """
+        Send `notifications` (notification bodies, e.g. from
+        `external_ids_notification`) concurrently on the shared async pool.
+
+        Returns:
+        - list: per notification, its OneSignalResponse or the exception raised.
+        """
+        if not notifications:
+            return []
+        return self._loop.run_until_complete(self._send_many(notifications, context))
+
 
 if __name__ == "__main__":
-    sender = OneSignalNotificationSender()
+    sender = OneSignalNotificationSender.shared()
     response = sender.send_notification_by_external_ids(
         ["Employee2@coremeta.tech"],
         "Test message in English",
@@ -1,50 +1,195 @@
 import boto3
 import json
+import os
+import re
+import threading
+from botocore.exceptions import ClientError
+from db import DynamoDBHandler, DynamoDBOperationError
 
 # Initialize the SNS client
 sns_client = boto3.client("sns")
 
+# DeviceInfo rows carry the EndpointArn of their deviceToken
+DEVICE_INFO_TABLE = os.environ.get(
+    "DEVICE_INFO_TABLE", "DeviceInfo-2iph2dahajadpnro5xkxcbveoq-staging"
+)
+ENDPOINT_ARN_ATTRIBUTE = "endpointArn"
+
+# (platform_application_arn, token) -> EndpointArn, kept by warm containers
+_endpoint_arns = {}
+_endpoint_lock = threading.Lock()
+
+# InvalidParameter message of create_platform_endpoint for a known token
+_EXISTING_ENDPOINT = re.compile(r"Endpoint (arn:\S+) already exists")
+
+
+def _belongs_to(platform_application_arn, endpoint_arn):
+    """`arn:...:app/APNS/name` owns `arn:...:endpoint/APNS/name/<uuid>`."""
+    application = platform_application_arn.replace(":app/", ":endpoint/", 1)
+    return endpoint_arn.startswith(application + "/")
+
+
+def _device_handler():
+    return DynamoDBHandler.for_table(DEVICE_INFO_TABLE)
+
+
+def _remember_endpoint(platform_application_arn, token, endpoint_arn, devices=None):
+    """
+    Cache `endpoint_arn` and store it on the DeviceInfo rows of `token`
+    (`devices`, when already read) that don't hold it yet.
+    """
+    with _endpoint_lock:
+        _endpoint_arns[(platform_application_arn, token)] = endpoint_arn
+    try:
+        handler = _device_handler()
+        if devices is None:
+            devices = handler.iter_items(
+                {"deviceToken": token}, attributes=["id", ENDPOINT_ARN_ATTRIBUTE]
+            )
+        for device in devices:
+            if device.get(ENDPOINT_ARN_ATTRIBUTE) != endpoint_arn:
+                handler.update_item({"id": device["id"]}, {ENDPOINT_ARN_ATTRIBUTE: endpoint_arn})
+    except DynamoDBOperationError as e:
+        # the warm cache still has it; the next container re-resolves it
+        print(f"Error saving endpoint ARN: {e}")
+
 
 def get_endpoint_arn(platform_application_arn, token):
     """
-    Check if an endpoint exists by listing all endpoints and matching the token.
-    This function assumes you have a mechanism to keep track of existing endpoints.
+    EndpointArn of `token`, from the warm cache or the DeviceInfo rows of
+    the token, without listing the platform endpoints. None when neither
+    knows it; see `sync_endpoint_arns` to fill them from SNS.
     """
+    endpoint_arn = _endpoint_arns.get((platform_application_arn, token))
+    if endpoint_arn:
+        return endpoint_arn
+
     try:
-        response = sns_client.list_endpoints_by_platform_application(
-            PlatformApplicationArn=platform_application_arn
+        devices = _device_handler().iter_items(
+            {"deviceToken": token}, attributes=[ENDPOINT_ARN_ATTRIBUTE]
         )
-        for endpoint in response["Endpoints"]:
-            if endpoint["Attributes"]["Token"] == token:
-                return endpoint["EndpointArn"]
+        for device in devices:
+            endpoint_arn = device.get(ENDPOINT_ARN_ATTRIBUTE)
+            if endpoint_arn and _belongs_to(platform_application_arn, endpoint_arn):
+                with _endpoint_lock:
+                    _endpoint_arns[(platform_application_arn, token)] = endpoint_arn
+                return endpoint_arn
+    except DynamoDBOperationError as e:
+        print(f"Error reading endpoint ARN: {e}")
+    return None
+
+
+def _forget_endpoint(endpoint_arn):
+    with _endpoint_lock:
+        for key in [key for key, arn in _endpoint_arns.items() if arn == endpoint_arn]:
+            del _endpoint_arns[key]
+
+
+def _check_endpoint(endpoint_arn, token):
+    """
+    Whether a known `endpoint_arn` can still be used for `token`: a disabled
+    endpoint of the token (e.g. after APNS rejected an old token) is enabled
+    again, one deleted or now holding another token must be recreated.
+    """
+    try:
+        attributes = sns_client.get_endpoint_attributes(EndpointArn=endpoint_arn)["Attributes"]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "NotFound":
+            return False
+        # can't tell; keep the ARN rather than recreating on every error
+        print(f"Error checking endpoint: {e}")
+        return True
+
+    if attributes.get("Token") != token:
+        return False
+    if attributes.get("Enabled") != "true":
+        try:
+            sns_client.set_endpoint_attributes(
+                EndpointArn=endpoint_arn, Attributes={"Token": token, "Enabled": "true"}
+            )
+        except ClientError as e:
+            print(f"Error enabling endpoint: {e}")
+            return False
+    return True
+
+
+def sync_endpoint_arns(platform_application_arn):
+    """
+    List every endpoint of the platform application, following the
+    pagination, into the warm cache and onto the DeviceInfo rows of their
+    tokens. Meant to run once (or on a schedule), not per device.
+
+    Returns:
+    - int: number of endpoints listed.
+
+    ```
+    # Example usage:
+    sync_endpoint_arns("arn:aws:sns:eu-west-3:123456789012:app/APNS/lollipop")
+    ```
+    """
+    endpoint_arns = {}
+    paginator = sns_client.get_paginator("list_endpoints_by_platform_application")
+    try:
+        for page in paginator.paginate(PlatformApplicationArn=platform_application_arn):
+            for endpoint in page["Endpoints"]:
+                token = endpoint.get("Attributes", {}).get("Token")
+                if token:
+                    endpoint_arns[token] = endpoint["EndpointArn"]
     except ClientError as e:
         print(f"Error listing endpoints: {e}")
-    return None
+        return 0
+
+    with _endpoint_lock:
+        for token, endpoint_arn in endpoint_arns.items():
+            _endpoint_arns[(platform_application_arn, token)] = endpoint_arn
+
+    devices_by_token = {}
+    try:
+        for device in _device_handler().iter_items(
+            {}, attributes=["id", "deviceToken", ENDPOINT_ARN_ATTRIBUTE]
+        ):
+            if device.get("deviceToken") in endpoint_arns:
+                devices_by_token.setdefault(device["deviceToken"], []).append(device)
+    except DynamoDBOperationError as e:
+        print(f"Error reading devices: {e}")
+    for token, devices in devices_by_token.items():
+        _remember_endpoint(platform_application_arn, token, endpoint_arns[token], devices)
+    return len(endpoint_arns)
 
 
 def create_endpoint(platform_application_arn, token):
     """
     Create a new endpoint if it doesn't exist or update the existing endpoint.
+    The ARN of a known token comes from the cache or DeviceInfo and is only
+    checked with `get_endpoint_attributes`, instead of listing the endpoints.
     """
     existing_endpoint_arn = get_endpoint_arn(platform_application_arn, token)
 
     if existing_endpoint_arn:
-        print(f"Endpoint already exists: {existing_endpoint_arn}")
-        return existing_endpoint_arn
+        if _check_endpoint(existing_endpoint_arn, token):
+            print(f"Endpoint already exists: {existing_endpoint_arn}")
+            return existing_endpoint_arn
+        print(f"Endpoint {existing_endpoint_arn} is stale, creating a new one")
+        _forget_endpoint(existing_endpoint_arn)
 
     try:
+        # returns the existing endpoint when the token is registered with the same attributes
         response = sns_client.create_platform_endpoint(
             PlatformApplicationArn=platform_application_arn,
             Token=token,
         )
-        return response["EndpointArn"]
-    except sns_client.exceptions.EndpointAlreadyExistsException:
-        # Handle case where endpoint already exists
-        print("Endpoint already exists. Retrieving existing endpoint ARN.")
-        return get_endpoint_arn(platform_application_arn, token)
+        endpoint_arn = response["EndpointArn"]
     except ClientError as e:
-        print(f"Error creating endpoint: {e}")
-        return None
+        # registered with other attributes: SNS names the endpoint in the error
+        match = _EXISTING_ENDPOINT.search(e.response.get("Error", {}).get("Message", ""))
+        if e.response.get("Error", {}).get("Code") != "InvalidParameter" or not match:
+            print(f"Error creating endpoint: {e}")
+            return None
+        print("Endpoint already exists. Retrieving existing endpoint ARN.")
+        endpoint_arn = match.group(1)
+
+    _remember_endpoint(platform_application_arn, token, endpoint_arn)
+    return endpoint_arn
 
 
 def send_push_notification(endpoint_arn, message, title):
@@ -64,8 +209,12 @@ def send_push_notification(endpoint_arn, message, title):
         )
         return response
     except sns_client.exceptions.EndpointDisabledException:
+        # the next create_endpoint of its token checks it again
         print("Endpoint is disabled. Consider recreating the endpoint.")
+        _forget_endpoint(endpoint_arn)
         return None
     except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "NotFound":
+            _forget_endpoint(endpoint_arn)
         print(f"Error sending notification: {e}")
         return None
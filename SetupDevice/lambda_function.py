@@ -32,7 +32,7 @@ def _handle_get(event: Dict[str, Any]) -> Dict[str, Any]:
         if not email or not deviceToken:
             return responseJson(400, message="missing_required_fields")
 
-        handler = DynamoDBHandler(TABLE_NAME)
+        handler = DynamoDBHandler.for_table(TABLE_NAME)
         items = handler.search_items({"email": email, "deviceToken": deviceToken})
         if not items or len(items) == 0:
             return responseJson(404, message="device_not_found")
@@ -115,24 +115,18 @@ def responseJson(
 
 def _check_email_valid(email: str) -> bool:
     try:
-        handler = DynamoDBHandler(USER_TABLE_NAME)
-        items = handler.search_items({"email": email})
-        return items is not None
+        handler = DynamoDBHandler.for_table(USER_TABLE_NAME)
+        item = next(handler.iter_items({"email": email}, attributes=["id"]), None)
+        return item is not None
     except DynamoDBOperationError as e:
         logger.error(f"DynamoDB Get Error on _check_email_valid: {e}")
         return False
 
 
 def _save_token(token: str, email: str, isOn: bool) -> Optional[str]:
-    handler = DynamoDBHandler(TABLE_NAME)
-    device_info = {"deviceToken": token, "email": email, "isOn": isOn}
-
-    existing_items = handler.search_items({"deviceToken": token, "email": email})
-    id = None
-    if existing_items:
-        id = existing_items[0]["id"]
+    handler = DynamoDBHandler.for_table(TABLE_NAME)
     try:
-        return handler.save_item(device_info, id)
+        return handler.upsert({"deviceToken": token, "email": email}, {"isOn": isOn})
     except DynamoDBOperationError as e:
         logger.error(f"DynamoDB Save Error on _save_token: {e}")
         return None
@@ -0,0 +1,30 @@
+"""
+One-off backfill of the ICalendarEventDay index from the ICalendarEvent rows
+written before it existed. Window reads trust the index once it is deployed
+(an empty day is a quiet day, not a reason to read the whole calendar), so
+run this right after creating the table and before deploying extraEvents.
+
+    PYTHONPATH=Layers/db/python python backfill_event_day_index.py
+"""
+from db import DayBucketIndex, DynamoDBHandler
+
+ICALENDAR_EVENT_TABLE = "ICalendarEvent-2iph2dahajadpnro5xkxcbveoq-staging"
+
+
+def backfill(segments: int = 4) -> int:
+    handler = DynamoDBHandler(ICALENDAR_EVENT_TABLE)
+    index = DayBucketIndex.for_table(ICALENDAR_EVENT_TABLE)
+    indexed = 0
+    with index.handler.batch_writer() as writer:
+        # whole rows: bucket rows carry every attribute of their event
+        for item in handler.parallel_scan(segments=segments):
+            if not item.get("iCalendarID") or not item.get("startDateTime"):
+                continue
+            index.put(item, writer)
+            indexed += 1
+    print(f"indexed {indexed} events ::: {handler.last_scan_stats} {writer.stats}")
+    return indexed
+
+
+if __name__ == "__main__":
+    backfill()
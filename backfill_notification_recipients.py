@@ -0,0 +1,23 @@
+"""
+Builds the NotificationRecipient index from the Employee, User and
+DeviceInfo tables: one row per store with an owner or manager, one for the
+owners and managers without a store, plus the ALL row. Status notifications
+read that row and go to nobody until the index is built, so run this once
+before deploying the stream consumer (invoking the notificationRecipients
+Lambda without records does the same). Safe to re-run.
+
+    PYTHONPATH=Layers/db/python python backfill_notification_recipients.py
+"""
+from recipient_index import RecipientIndex
+
+TABLE_NAME_SUFFIX = "-2iph2dahajadpnro5xkxcbveoq-staging"
+
+
+def backfill() -> int:
+    emails = RecipientIndex(TABLE_NAME_SUFFIX).rebuild_all()
+    print(f"indexed {len(emails)} recipient emails")
+    return len(emails)
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,43 @@
+"""
+Moves ICalendarEventStatus rows written with a random id (before statuses
+were upserted by their natural key) to the natural id of their
+(uid, startAt). extraEvents joins statuses onto a schedule by those ids,
+so a legacy row reads as SCHEDULED until it is moved. Leave
+DYNAMODB_UPSERT_LEGACY_LOOKUP off (the default) while it runs: a status
+posted meanwhile then lands on the natural id, which the move never
+overwrites. Safe to re-run.
+
+    PYTHONPATH=Layers/db/python python backfill_status_natural_ids.py
+"""
+from db import DynamoDBHandler
+
+ICAL_EVENT_STATUS_TABLE = "ICalendarEventStatus-2iph2dahajadpnro5xkxcbveoq-staging"
+
+
+def backfill(segments: int = 4) -> int:
+    handler = DynamoDBHandler(ICAL_EVENT_STATUS_TABLE)
+    moved = 0
+    for item in handler.parallel_scan(
+        segments=segments, attributes=["id", "uid", "startAt", "status"]
+    ):
+        uid = item.get("uid")
+        start_at = item.get("startAt")
+        if not uid or not start_at:
+            continue
+        natural_key = {"uid": uid, "startAt": start_at}
+        if item["id"] == handler.natural_id(natural_key):
+            continue
+        handler.upsert(
+            natural_key,
+            {"status": item.get("status")},
+            overwrite=False,
+            legacy_lookup=False,
+        )
+        handler.delete_item({"id": item["id"]})
+        moved += 1
+    print(f"moved {moved} rows to their natural id ::: {handler.last_scan_stats}")
+    return moved
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,78 @@
+"""
+Benchmark extraEvents._download_calendar against a local HTTP stand-in for
+the Planity feed, so it runs without network access or AWS credentials.
+
+    PYTHONPATH=Layers/db/python:Layers/icalendar/python:extraEvents python benchmark_feed_cache.py
+
+Three servers are compared: one honouring If-None-Match (304 path), one
+without validators (parsed while streaming, counted as a hash hit) and one
+whose body changes on every request.
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import lambda_function
+
+FEED_PATH = "getCalendarIcalEvents (16).ics"
+ROUNDS = 20
+
+
+def make_handler(body: bytes, use_etag: bool, changing: bool):
+    etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+    counter = {"requests": 0}
+
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            counter["requests"] += 1
+            payload = body
+            if changing:
+                payload = body.replace(
+                    b"END:VCALENDAR", f"X-REV:{counter['requests']}\r\nEND:VCALENDAR".encode()
+                )
+            if use_etag and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/calendar")
+            self.send_header("Content-Length", str(len(payload)))
+            if use_etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FeedHandler
+
+
+def run(name: str, body: bytes, use_etag: bool, changing: bool):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(body, use_etag, changing))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/feed.ics"
+
+    lambda_function.feed_cache = lambda_function.FeedCache()
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        lambda_function._download_calendar(url)
+        timings.append(time.perf_counter() - started)
+    server.shutdown()
+
+    stats = lambda_function.feed_cache.stats()
+    warm = sorted(timings[1:])[len(timings[1:]) // 2]
+    print(
+        f"{name:<12} first {timings[0] * 1000:7.1f}ms  warm median {warm * 1000:7.1f}ms  "
+        f"parses {stats['parses']:>2}  304s {stats['not_modified']:>2}  hash hits {stats['hash_hits']:>2}"
+    )
+
+
+if __name__ == "__main__":
+    with open(FEED_PATH, "rb") as feed:
+        body = feed.read()
+    run("etag", body, use_etag=True, changing=False)
+    run("hash", body, use_etag=False, changing=False)
+    run("changing", body, use_etag=False, changing=True)
@@ -0,0 +1,81 @@
+"""
+Count the OneSignal requests a bulk status update makes when every POST
+notifies on its own against the coalescing outbox, on a local mock of the
+OneSignal REST API (see benchmark_onesignal_sender.py) and in-memory tables.
+
+    AWS_DEFAULT_REGION=eu-west-3 PYTHONPATH=Layers/db/python:Layers/one_signal/python:extraEventStatus:. \
+        python benchmark_notification_coalescing.py
+
+A manager completes a day of appointments, cancels a few and taps one of
+them twice. The outbox must send one push per status, counting each event
+once.
+"""
+import json
+import time
+import db
+import lambda_function
+from benchmark_notification_outbox import OWNERS, load_drain, start_mock
+from fake_dynamodb import FakeResource
+from notification_outbox import InMemoryOutbox
+
+COMPLETED = 40
+CANCELLED = 5
+
+
+def bulk_update():
+    updates = [(f"event-{index}", "COMPLETE") for index in range(COMPLETED)]
+    updates += [(f"event-{COMPLETED + index}", "CANCEL") for index in range(CANCELLED)]
+    # a double tap queues a second notification for the same event
+    updates.append(("event-0", "COMPLETE"))
+    for uid, status in updates:
+        event = {
+            "httpMethod": "POST",
+            "body": json.dumps({"uid": uid, "startAt": "20240501T090000", "status": status}),
+        }
+        response = lambda_function.lambda_handler(event, None)
+        assert response["statusCode"] == 200, response
+    return len(updates)
+
+
+if __name__ == "__main__":
+    table_name = lambda_function.ICAL_EVENT_STATUS_TABLE
+    db._shared_handlers[table_name] = db.DynamoDBHandler(table_name, resource=FakeResource())
+    drain = load_drain()
+    for module in (lambda_function, drain):
+        module.recipient_index.recipients = lambda store_id=None: list(OWNERS)
+
+    # previous behaviour: one request per POST
+    server = start_mock()
+    enqueue = lambda_function._enqueue_push_notification
+    lambda_function._enqueue_push_notification = lambda *args, **kwargs: False
+    posts = bulk_update()
+    server.shutdown()
+    print(f"direct     {posts} POSTs  requests {len(server.notifications)}")
+    lambda_function._enqueue_push_notification = enqueue
+
+    # outbox: the drain runs once the window closed and sends one request per status
+    server = start_mock()
+    lambda_function.outbox = drain.outbox = InMemoryOutbox()
+    started = time.perf_counter()
+    bulk_update()
+    time.sleep(lambda_function.NOTIFICATION_COALESCE_WINDOW_MILLIS / 1000)
+    counts = drain.lambda_handler({}, None)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    messages = sorted(notification["contents"]["en"] for notification in server.notifications)
+    print(
+        f"coalesced  {posts} POSTs  requests {len(server.notifications)}  {counts}  "
+        f"{elapsed:.1f}s (window {lambda_function.NOTIFICATION_COALESCE_WINDOW_MILLIS}ms)"
+    )
+    for message in messages:
+        print(f"  {message}")
+    assert counts == {"sent": posts, "retried": 0, "failed": 0}, counts
+    assert messages == [
+        f"{COMPLETED} events updated to: COMPLETE",
+        f"{CANCELLED} events updated to: CANCEL",
+    ], messages
+    assert all(
+        notification["include_external_user_ids"] == OWNERS
+        for notification in server.notifications
+    )
@@ -0,0 +1,135 @@
+"""
+Benchmark status POSTs of extraEventStatus that queue their push
+notification in the outbox against POSTs that send it to OneSignal before
+responding, on a local mock of the OneSignal REST API (see
+benchmark_onesignal_sender.py) and in-memory tables.
+
+    AWS_DEFAULT_REGION=eu-west-3 PYTHONPATH=Layers/db/python:Layers/one_signal/python:extraEventStatus:. \
+        python benchmark_notification_outbox.py
+
+Then drains the outbox through the notificationOutbox handler while the
+mock rejects the first sends with 500s, and checks every queued
+notification is delivered.
+"""
+import importlib.util
+import json
+import statistics
+import threading
+import time
+import db
+import lambda_function
+import notification_outbox
+from benchmark_onesignal_sender import MockHandler, MockOneSignal
+from fake_dynamodb import FakeResource
+from notification_outbox import InMemoryOutbox
+from notification_sender.send_notification import OneSignalNotificationSender
+
+POSTS = 20
+OWNERS = ["owner@coremeta.tech", "manager@coremeta.tech"]
+FAILED_SENDS = 5
+
+
+class FlakyHandler(MockHandler):
+    def do_POST(self):
+        with self.server.lock:
+            self.server.failures_left -= 1
+            fail = self.server.failures_left >= 0
+        if not fail:
+            return super().do_POST()
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"errors": ["internal error"]}'
+        self.send_response(500)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def load_drain():
+    spec = importlib.util.spec_from_file_location(
+        "outbox_drain", "notificationOutbox/lambda_function.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_mock(failures: int = 0):
+    server = MockOneSignal()
+    server.RequestHandlerClass = FlakyHandler
+    server.failures_left = failures
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    OneSignalNotificationSender._shared = OneSignalNotificationSender(
+        "app", "key", f"http://127.0.0.1:{server.server_port}/api/v1"
+    )
+    return server
+
+
+def post(index: int):
+    event = {
+        "httpMethod": "POST",
+        "body": json.dumps(
+            {
+                "uid": f"event-{index}",
+                "startAt": "20240501T090000",
+                "status": "COMPLETE",
+                # a recipient of its own keeps it from being coalesced
+                "external_id": f"tester-{index}@coremeta.tech",
+            }
+        ),
+    }
+    started = time.perf_counter()
+    response = lambda_function.lambda_handler(event, None)
+    assert response["statusCode"] == 200, response
+    return time.perf_counter() - started
+
+
+def timed_posts(name: str):
+    timings = [post(index) for index in range(POSTS)]
+    print(
+        f"{name:<8} POST median {statistics.median(timings) * 1000:6.1f}ms  "
+        f"max {max(timings) * 1000:6.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    table_name = lambda_function.ICAL_EVENT_STATUS_TABLE
+    db._shared_handlers[table_name] = db.DynamoDBHandler(table_name, resource=FakeResource())
+    drain = load_drain()
+    for module in (lambda_function, drain):
+        module.recipient_index.recipients = lambda store_id=None: list(OWNERS)
+
+    # previous behaviour: the POST sends the notification itself
+    server = start_mock()
+    enqueue = lambda_function._enqueue_push_notification
+    lambda_function._enqueue_push_notification = lambda *args, **kwargs: False
+    timed_posts("direct")
+    server.shutdown()
+    assert len(server.notifications) == POSTS
+    lambda_function._enqueue_push_notification = enqueue
+
+    # outbox: the POST only queues, the drain sends
+    server = start_mock(failures=FAILED_SENDS)
+    notification_outbox.RETRY_BASE_MILLIS = notification_outbox.RETRY_MAX_MILLIS = 10
+    lambda_function.NOTIFICATION_COALESCE_WINDOW_MILLIS = 0
+    outbox = lambda_function.outbox = drain.outbox = InMemoryOutbox()
+    timed_posts("outbox")
+    assert not server.notifications and len(outbox.rows) == POSTS
+
+    started = time.perf_counter()
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    while totals["sent"] < POSTS:
+        counts = drain.lambda_handler({}, None)
+        totals = {key: totals[key] + counts[key] for key in totals}
+        time.sleep(0.02)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    delivered = [notification["include_external_user_ids"] for notification in server.notifications]
+    print(
+        f"drain    {elapsed * 1000:6.1f}ms  {totals}  requests {len(server.notifications) + FAILED_SENDS}"
+    )
+    assert totals == {"sent": POSTS, "retried": FAILED_SENDS, "failed": 0}, totals
+    assert sorted(map(tuple, delivered)) == sorted(
+        tuple(OWNERS + [f"tester-{index}@coremeta.tech"]) for index in range(POSTS)
+    )
+    print("every queued notification delivered")
@@ -0,0 +1,103 @@
+"""
+Benchmark the pooled OneSignalNotificationSender against the previous
+per-call SDK client on a local mock of the OneSignal REST API, so it runs
+without network access or credentials.
+
+    PYTHONPATH=Layers/one_signal/python python benchmark_onesignal_sender.py
+
+The mock answers every POST /notifications after a fixed delay and counts
+the TCP connections it accepted: the SDK client opens one per send, the
+pooled sender reuses one, and `send_many` overlaps the delays.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from onesignal_sdk.client import Client
+from notification_sender.send_notification import OneSignalNotificationSender
+
+NOTIFICATIONS = 20
+API_LATENCY_SECONDS = 0.05
+
+
+class MockOneSignal(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.connections = 0
+        self.notifications = []
+        self.lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body in one segment, or delayed ACKs stall kept-alive connections
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.notifications.append(payload)
+        time.sleep(API_LATENCY_SECONDS)
+        body = json.dumps({"id": f"notification-{len(self.server.notifications)}", "recipients": 1})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(name, send):
+    server = MockOneSignal()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_root = f"http://127.0.0.1:{server.server_port}/api/v1"
+
+    notifications = [
+        OneSignalNotificationSender.external_ids_notification(
+            [f"owner-{index}@coremeta.tech"], f"Event {index} has updated to: COMPLETE"
+        )
+        for index in range(NOTIFICATIONS)
+    ]
+    started = time.perf_counter()
+    send(api_root, notifications)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    print(
+        f"{name:<10} {elapsed * 1000:7.1f}ms  connections {server.connections:>2}  "
+        f"notifications {len(server.notifications)}"
+    )
+    assert len(server.notifications) == NOTIFICATIONS
+
+
+def send_sdk_client(api_root, notifications):
+    for notification in notifications:
+        client = Client(app_id="app", rest_api_key="key", options={"API_ROOT": api_root})
+        client.send_notification(notification)
+
+
+def send_pooled(api_root, notifications):
+    sender = OneSignalNotificationSender("app", "key", api_root)
+    for notification in notifications:
+        sender._request(**sender.client._kwargs_send_notification(notification))
+
+
+def send_concurrent(api_root, notifications):
+    sender = OneSignalNotificationSender("app", "key", api_root)
+    results = sender.send_many(notifications)
+    assert not [result for result in results if isinstance(result, Exception)], results
+
+
+if __name__ == "__main__":
+    run("sdk", send_sdk_client)
+    run("pooled", send_pooled)
+    run("send_many", send_concurrent)
@@ -0,0 +1,89 @@
+"""
+Benchmark rrule_engine.expand against the previous per-request expansion
+(rrulestr on every call, EXDATEs parsed one by one into a list) on
+thousands of old recurring events with long EXDATE lists.
+
+    PYTHONPATH=Layers/icalendar/python:extraEvents python benchmark_rrule_engine.py
+
+Both implementations must return the same occurrences for every rule.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from dateutil.parser import parse as date_parse
+from dateutil.rrule import rrulestr
+from rrule_engine import compile_rule, exdate_set, expand
+
+RULE_COUNT = 2000
+EXDATES_PER_RULE = 200
+WINDOW_DAYS = 30
+REQUESTS = 2
+
+RULES = [
+    "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,SU",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,WE,TH,FR,SA",
+    "FREQ=DAILY;INTERVAL=1",
+    "FREQ=DAILY;INTERVAL=3",
+    "FREQ=MONTHLY;INTERVAL=1;BYMONTHDAY=15",
+    "FREQ=WEEKLY;COUNT=400;INTERVAL=1;BYDAY=TU",
+]
+
+
+def legacy_occurrences(rrule_string, start_date, window_start, window_end, exdate_str):
+    rule = rrulestr(rrule_string, dtstart=start_date)
+    exdates = []
+    if exdate_str:
+        exdates = [date_parse(date_str) for date_str in exdate_str.split(",")]
+    until_date = rule._until if rule._until else window_end
+    return [
+        dt
+        for dt in rule.between(window_start, min(window_end, until_date), inc=True)
+        if dt not in exdates
+    ]
+
+
+def make_events(now: datetime):
+    rng = random.Random(7)
+    events = []
+    for _ in range(RULE_COUNT):
+        dtstart = (now - timedelta(days=rng.randint(365, 6 * 365))).replace(
+            hour=rng.randint(8, 18), minute=rng.choice((0, 15, 30, 45)), second=0, microsecond=0
+        )
+        # half the exdates hit occurrence-looking times inside the window
+        exdates = [
+            (now + timedelta(days=rng.randint(-3 * 365, WINDOW_DAYS)))
+            .replace(hour=dtstart.hour, minute=dtstart.minute, second=0, microsecond=0)
+            .strftime("%Y%m%dT%H%M%S")
+            for _ in range(EXDATES_PER_RULE)
+        ]
+        events.append((rng.choice(RULES), dtstart, ",".join(exdates)))
+    return events
+
+
+def run(name, expand_func, events, window_start, window_end):
+    results = None
+    timings = []
+    for _ in range(REQUESTS):
+        started = time.perf_counter()
+        results = [
+            expand_func(rule, dtstart, window_start, window_end, exdates)
+            for rule, dtstart, exdates in events
+        ]
+        timings.append(time.perf_counter() - started)
+    occurrences = sum(len(result) for result in results)
+    print(
+        f"{name:<8} first {timings[0] * 1000:8.1f}ms  warm {min(timings[1:]) * 1000:8.1f}ms  "
+        f"occurrences {occurrences}"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    now = datetime.now().replace(microsecond=0)
+    window_end = now + timedelta(days=WINDOW_DAYS)
+    events = make_events(now)
+
+    legacy = run("legacy", legacy_occurrences, events, now, window_end)
+    engine = run("engine", expand, events, now, window_end)
+    assert legacy == engine, "engine and legacy expansion differ"
+    print("identical occurrences;", compile_rule.cache_info(), exdate_set.cache_info())
@@ -0,0 +1,136 @@
+"""
+Benchmark the compact Occurrence records of extraEvents._handle_ics against
+the previous pipeline (one dict per occurrence, rule occurrences collected
+by list concatenation) on a synthetic feed expanding to ~10k occurrences.
+
+    PYTHONPATH=Layers/db/python:Layers/icalendar/python:extraEvents python benchmark_schedule_records.py
+
+Reports the time to build the schedule, the memory the schedule retains
+(what the feed cache keeps per feed) and the time to serialize it; both
+pipelines must serialize to the same events.
+"""
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from feed_cache import copy_schedule
+from ics_parser import ICSStreamParser
+import lambda_function
+
+RULE_EVENTS = 100
+DAYS = 100
+PLAIN_EVENTS = 200
+ROUNDS = 3
+
+
+def make_feed(now: datetime) -> bytes:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Benchmark//EN", "TIMEZONE-ID:Europe/Paris"]
+    for index in range(RULE_EVENTS):
+        start = (now - timedelta(days=30)).replace(hour=8 + index % 10, minute=0, second=0, microsecond=0)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:rule-{index}@planity.com",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}",
+            f"DTEND:{start + timedelta(minutes=45):%Y%m%dT%H%M%S}",
+            f"SUMMARY:Coupe brushing client {index}",
+            "RRULE:FREQ=DAILY;INTERVAL=1",
+            "END:VEVENT",
+        ]
+    for index in range(PLAIN_EVENTS):
+        # the latest plain event bounds how far rules are expanded
+        start = (now + timedelta(days=index * DAYS // PLAIN_EVENTS)).replace(microsecond=0)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:plain-{index}@planity.com",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}",
+            f"DTEND:{start + timedelta(hours=1):%Y%m%dT%H%M%S}",
+            f"SUMMARY:Rendez-vous {index}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines).encode()
+
+
+def legacy_handle_ics(chunks):
+    schedule = {"type": "ICS", "calendar": None, "events": []}
+    parser = ICSStreamParser()
+    plain_events = []
+    rule_events = []
+    latest_date = datetime.now()
+    for cal_event in parser.events(chunks):
+        if cal_event.status and "CANCELLED" in cal_event.status:
+            continue
+        if cal_event.rrule is None:
+            latest_date = lambda_function.latest_event_date(cal_event.end_at, latest_date)
+            plain_events.append(cal_event)
+        else:
+            rule_events.append(cal_event)
+
+    schedule["calendar"] = parser.calendar
+    timezone = schedule["calendar"].get("timeZone")
+
+    def schedule_event(event, startAt, endAt):
+        return {
+            "uid": event.uid,
+            "startAt": startAt,
+            "endAt": endAt,
+            "summary": event.summary,
+            "timeZone": timezone,
+        }
+
+    schedule["events"] = [
+        schedule_event(event, event.start_at, event.end_at) for event in plain_events
+    ]
+    schedule_rule_events = []
+    for event in rule_events:
+        start = datetime.strptime(event.start_at, "%Y%m%dT%H%M%S")
+        gap = datetime.strptime(event.end_at, "%Y%m%dT%H%M%S") - start
+        events = [
+            schedule_event(
+                event,
+                ruleDate.strftime("%Y%m%dT%H%M%S"),
+                (ruleDate + gap).strftime("%Y%m%dT%H%M%S"),
+            )
+            for ruleDate in lambda_function.list_occurrences_next_one_months(
+                event.rrule, start, latest_date, None, timezone
+            )
+        ]
+        if events:
+            schedule_rule_events = schedule_rule_events + events
+    schedule["events"] = schedule["events"] + schedule_rule_events
+    return schedule
+
+
+def run(name, handle_ics, body):
+    build_timings = []
+    serialize_timings = []
+    for _ in range(ROUNDS):
+        gc.collect()
+        started = time.perf_counter()
+        schedule = handle_ics([body])
+        build_timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        events = copy_schedule(schedule)["events"]
+        serialize_timings.append(time.perf_counter() - started)
+    # memory measured on its own run, tracing slows everything down
+    del schedule
+    gc.collect()
+    tracemalloc.start()
+    schedule = handle_ics([body])
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:<8} build {min(build_timings) * 1000:7.1f}ms  serialize {min(serialize_timings) * 1000:6.1f}ms  "
+        f"retained {retained / 1024:7.0f}KiB  peak {peak / 1024:7.0f}KiB  occurrences {len(events)}"
+    )
+    return events
+
+
+if __name__ == "__main__":
+    body = make_feed(datetime.now())
+    legacy = run("legacy", legacy_handle_ics, body)
+    records = run("records", lambda_function._handle_ics, body)
+    assert legacy == records, "record and legacy schedules differ"
+    print("identical events")
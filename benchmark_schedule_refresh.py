@@ -0,0 +1,142 @@
+"""
+Benchmark the background schedule refresh of extraEvents against a local
+fake DynamoDB resource and a local HTTP stand-in for the Planity feeds, so
+it runs without network access or AWS credentials.
+
+    PYTHONPATH=Layers/db/python:Layers/icalendar/python:extraEvents:. python benchmark_schedule_refresh.py
+
+`refresh_handler` rebuilds the snapshot of every employee, first one feed
+at a time and then SCHEDULE_REFRESH_CONCURRENCY at a time. GET requests are
+then timed on the live path (`is_forced_update=true`) and on the snapshot,
+which must return the same schedule. Last, a stale snapshot is served while
+a refresh is requested in the background.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import db
+import lambda_function
+from fake_dynamodb import FakeResource
+
+FEED_PATH = "getCalendarIcalEvents (16).ics"
+EMPLOYEES = 24
+FEED_LATENCY_SECONDS = 0.15
+REQUESTS = 10
+
+class FakeLambdaClient:
+    def __init__(self):
+        self.invocations = []
+
+    def invoke(self, **kwargs):
+        self.invocations.append(kwargs)
+
+
+def make_handler(body: bytes):
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(FEED_LATENCY_SECONDS)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/calendar")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FeedHandler
+
+
+def use_fake_tables(resource: FakeResource):
+    # refresh workers build their own resource through thread_handlers()
+    db._new_resource = lambda: resource
+    for table_name in (
+        lambda_function.extra_event_table,
+        lambda_function.icalendar_table,
+        lambda_function.icalendar_event_table,
+        lambda_function.icalendar_event_day_table,
+        lambda_function.ical_freqency_table,
+        lambda_function.ical_event_status_table,
+    ):
+        db._shared_handlers[table_name] = db.DynamoDBHandler(table_name, resource=resource)
+
+
+def get(employee_id: str, forced: bool = False):
+    parameters = {"employee_id": employee_id}
+    if forced:
+        parameters["is_forced_update"] = "true"
+    response = lambda_function.lambda_handler({"queryStringParameters": parameters}, None)
+    assert response["statusCode"] == 200, response
+    return json.loads(response["body"])["schedule"]
+
+
+def timed_gets(name: str, employee_ids, forced: bool):
+    timings = []
+    for employee_id in employee_ids:
+        started = time.perf_counter()
+        get(employee_id, forced)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(
+        f"GET {name:<9} median {timings[len(timings) // 2] * 1000:7.1f}ms  "
+        f"max {timings[-1] * 1000:7.1f}ms"
+    )
+
+
+def refresh(concurrency: int):
+    lambda_function.feed_cache = lambda_function.FeedCache()
+    lambda_function.SCHEDULE_REFRESH_CONCURRENCY = concurrency
+    started = time.perf_counter()
+    summary = lambda_function.refresh_handler({}, None)
+    print(
+        f"refresh concurrency {concurrency}: {(time.perf_counter() - started) * 1000:7.1f}ms  {summary}"
+    )
+    assert summary == {"refreshed": EMPLOYEES, "failed": 0}, summary
+
+
+if __name__ == "__main__":
+    with open(FEED_PATH, "rb") as feed:
+        body = feed.read()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(body))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    resource = FakeResource()
+    use_fake_tables(resource)
+    extra_events = resource.Table(lambda_function.extra_event_table)
+    employee_ids = [f"employee-{index}" for index in range(EMPLOYEES)]
+    for index, employee_id in enumerate(employee_ids):
+        extra_events.rows[f"extra-{index}"] = {
+            "id": f"extra-{index}",
+            "employeeID": employee_id,
+            "extraDataType": "ICS",
+            "downloadableURL": f"http://127.0.0.1:{server.server_port}/{employee_id}.ics",
+        }
+
+    concurrency = lambda_function.SCHEDULE_REFRESH_CONCURRENCY
+    refresh(1)
+    refresh(concurrency)
+
+    lambda_function.feed_cache = lambda_function.FeedCache(max_entries=0)
+    sample = employee_ids[:REQUESTS]
+    timed_gets("live", sample, forced=True)
+    timed_gets("snapshot", sample, forced=False)
+
+    live = get(employee_ids[0], forced=True)
+    served = get(employee_ids[0])
+    assert served.pop("load_from_db") and not live.pop("load_from_db")
+    assert served == live, "snapshot and live schedules differ"
+    print("snapshot schedule identical to live;", len(served["events"]), "events")
+
+    # a stale snapshot is still served, and a refresh is requested once
+    row = extra_events.rows["extra-0"]
+    stale = int((time.time() - lambda_function.SNAPSHOT_FRESH_SECONDS - 60) * 1000)
+    row[lambda_function.SNAPSHOT_ATTRIBUTE] = lambda_function.encode_snapshot(served, stale)
+    row[lambda_function.VERSION_ATTRIBUTE] = stale
+    lambda_function.os.environ["SCHEDULE_REFRESH_FUNCTION"] = "extraEventsRefresh"
+    lambda_function.lambda_client = FakeLambdaClient()
+    assert get(employee_ids[0])["load_from_db"]
+    assert get(employee_ids[0])["load_from_db"]
+    print("stale snapshot served; refreshes requested:", lambda_function.lambda_client.invocations)
+    assert len(lambda_function.lambda_client.invocations) == 1
+    server.shutdown()
@@ -0,0 +1,172 @@
+"""
+Benchmark sns_push.create_endpoint for devices that already have an SNS
+endpoint: the previous lookup listed the first page of the platform
+endpoints on every call, the cached one reads the warm cache or the
+DeviceInfo row after a single paginated sync and only checks the endpoint
+with get_endpoint_attributes. Runs against a fake SNS client (100 endpoints
+per page, a fixed latency per call) and an in-memory DeviceInfo table.
+
+    AWS_DEFAULT_REGION=eu-west-3 PYTHONPATH=Layers/db/python:Layers/sns_push/python:. python benchmark_sns_endpoints.py
+"""
+import time
+import uuid
+from botocore.exceptions import ClientError
+import db
+import sns_push
+from fake_dynamodb import FakeResource, FakeTable
+
+DEVICES = 1000
+PAGE_SIZE = 100
+SNS_LATENCY_SECONDS = 0.005
+PLATFORM_APPLICATION_ARN = "arn:aws:sns:eu-west-3:123456789012:app/APNS/lollipop"
+
+
+class FakeSNS:
+    def __init__(self, tokens):
+        endpoint_prefix = PLATFORM_APPLICATION_ARN.replace(":app/", ":endpoint/")
+        self.endpoints = {token: f"{endpoint_prefix}/{uuid.uuid4()}" for token in tokens}
+        self.disabled = set()
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        time.sleep(SNS_LATENCY_SECONDS)
+
+    def list_endpoints_by_platform_application(self, PlatformApplicationArn, NextToken=None):
+        self._call()
+        tokens = list(self.endpoints)
+        start = int(NextToken or 0)
+        page = {
+            "Endpoints": [
+                {"EndpointArn": self.endpoints[token], "Attributes": {"Token": token}}
+                for token in tokens[start:start + PAGE_SIZE]
+            ]
+        }
+        if start + PAGE_SIZE < len(tokens):
+            page["NextToken"] = str(start + PAGE_SIZE)
+        return page
+
+    def get_paginator(self, operation):
+        sns = self
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                next_token = None
+                while True:
+                    page = sns.list_endpoints_by_platform_application(**kwargs, NextToken=next_token)
+                    yield page
+                    next_token = page.get("NextToken")
+                    if not next_token:
+                        return
+
+        return Paginator()
+
+    def get_endpoint_attributes(self, EndpointArn):
+        self._call()
+        for token, endpoint_arn in self.endpoints.items():
+            if endpoint_arn == EndpointArn:
+                enabled = "false" if EndpointArn in self.disabled else "true"
+                return {"Attributes": {"Token": token, "Enabled": enabled}}
+        raise ClientError(
+            {"Error": {"Code": "NotFound", "Message": "Endpoint does not exist"}},
+            "GetEndpointAttributes",
+        )
+
+    def set_endpoint_attributes(self, EndpointArn, Attributes):
+        self._call()
+        if Attributes.get("Enabled") == "true":
+            self.disabled.discard(EndpointArn)
+
+    def create_platform_endpoint(self, PlatformApplicationArn, Token, CustomUserData=None):
+        self._call()
+        if CustomUserData is not None and Token in self.endpoints:
+            raise ClientError(
+                {
+                    "Error": {
+                        "Code": "InvalidParameter",
+                        "Message": f"Invalid parameter: Token Reason: Endpoint {self.endpoints[Token]} "
+                        "already exists with the same Token, but different attributes.",
+                    }
+                },
+                "CreatePlatformEndpoint",
+            )
+        endpoint_prefix = PlatformApplicationArn.replace(":app/", ":endpoint/")
+        return {"EndpointArn": self.endpoints.setdefault(Token, f"{endpoint_prefix}/{uuid.uuid4()}")}
+
+
+def legacy_create_endpoint(platform_application_arn, token):
+    response = sns_push.sns_client.list_endpoints_by_platform_application(
+        PlatformApplicationArn=platform_application_arn
+    )
+    for endpoint in response["Endpoints"]:
+        if endpoint["Attributes"]["Token"] == token:
+            return endpoint["EndpointArn"]
+    response = sns_push.sns_client.create_platform_endpoint(
+        PlatformApplicationArn=platform_application_arn, Token=token
+    )
+    return response["EndpointArn"]
+
+
+def run(name, create_endpoint, sns, tokens):
+    sns.calls = 0
+    started = time.perf_counter()
+    arns = [create_endpoint(PLATFORM_APPLICATION_ARN, token) for token in tokens]
+    elapsed = time.perf_counter() - started
+    correct = sum(arn == sns.endpoints[token] for arn, token in zip(arns, tokens))
+    print(
+        f"{name:<8} {elapsed * 1000:7.0f}ms  SNS calls {sns.calls:>5}  "
+        f"correct {correct}/{len(tokens)}"
+    )
+    return correct
+
+
+if __name__ == "__main__":
+    tokens = [f"token-{index:04d}" for index in range(DEVICES)]
+    sns = sns_push.sns_client = FakeSNS(tokens)
+    table = FakeTable(items=[{"id": str(uuid.uuid4()), "deviceToken": token} for token in tokens])
+    resource = FakeResource({sns_push.DEVICE_INFO_TABLE: table})
+    handler = db.DynamoDBHandler(sns_push.DEVICE_INFO_TABLE, resource=resource)
+    db._shared_handlers[sns_push.DEVICE_INFO_TABLE] = handler
+
+    # each device registers again, e.g. on every app launch
+    run("legacy", legacy_create_endpoint, sns, tokens)
+
+    sns.calls = 0
+    started = time.perf_counter()
+    synced = sns_push.sync_endpoint_arns(PLATFORM_APPLICATION_ARN)
+    print(
+        f"sync     {(time.perf_counter() - started) * 1000:7.0f}ms  SNS calls {sns.calls:>5}  "
+        f"endpoints {synced}"
+    )
+    # one get_endpoint_attributes per device checks the known ARN
+    assert run("cached", sns_push.create_endpoint, sns, tokens) == DEVICES
+    assert sns.calls == DEVICES
+
+    # a cold container reads the ARN back from DeviceInfo
+    sns_push._endpoint_arns.clear()
+    assert run("devices", sns_push.create_endpoint, sns, tokens) == DEVICES
+    assert sns.calls == DEVICES
+
+    # a disabled endpoint is enabled again, a deleted one recreated
+    disabled, deleted = tokens[0], tokens[1]
+    sns.disabled.add(sns.endpoints[disabled])
+    stale = sns.endpoints.pop(deleted)
+    assert sns_push.create_endpoint(PLATFORM_APPLICATION_ARN, disabled) == sns.endpoints[disabled]
+    assert not sns.disabled
+    recreated = sns_push.create_endpoint(PLATFORM_APPLICATION_ARN, deleted)
+    assert recreated == sns.endpoints[deleted] != stale
+    assert all(
+        row[sns_push.ENDPOINT_ARN_ATTRIBUTE] == recreated
+        for row in table.rows.values()
+        if row["deviceToken"] == deleted
+    )
+    print("disabled endpoint enabled again, deleted endpoint recreated")
+
+    # a token registered with other attributes: the ARN comes from the error
+    token = tokens[-1]
+    sns_push._endpoint_arns.clear()
+    table.rows = {}
+    original = sns.create_platform_endpoint
+    sns.create_platform_endpoint = lambda **kwargs: original(**kwargs, CustomUserData="other")
+    assert sns_push.create_endpoint(PLATFORM_APPLICATION_ARN, token) == sns.endpoints[token]
+    print("existing endpoint resolved from the InvalidParameter error")
@@ -1,8 +1,9 @@
 import io
 import json
-from db import DynamoDBHandler, DynamoDBOperationError
+from db import DynamoDBHandler, DynamoDBOperationError, request_scope
 
 
+@request_scope
 def lambda_handler(event, context):
 
     try:
@@ -47,16 +48,16 @@ def responseJson(statusCode, employees=None, primary_role=None, message=None):
 def _employees(user_id: str):
     try:
         employee_table = "Employee-2iph2dahajadpnro5xkxcbveoq-staging"
-        employee_handler = DynamoDBHandler(employee_table)
+        employee_handler = DynamoDBHandler.for_table(employee_table)
         employees = employee_handler.search_items(
             {"userID": user_id, "isResigned": False}
         )
 
         store_table = "StoreInfo-2iph2dahajadpnro5xkxcbveoq-staging"
-        store_handler = DynamoDBHandler(store_table)
+        store_handler = DynamoDBHandler.for_table(store_table)
 
         address_table = "Address-2iph2dahajadpnro5xkxcbveoq-staging"
-        address_handle = DynamoDBHandler(address_table)
+        address_handle = DynamoDBHandler.for_table(address_table)
 
         result = []
         primary_role = None
@@ -94,10 +95,21 @@ def _employees(user_id: str):
 def _colleagues(store_id, employee_handler):
     try:
         user_table = "User-2iph2dahajadpnro5xkxcbveoq-staging"
-        user_handler = DynamoDBHandler(user_table)
+        user_handler = DynamoDBHandler.for_table(user_table)
 
         employees = []
         colleagues = employee_handler.search_items({"storeID": store_id})
+
+        users = {}
+        try:
+            users = user_handler.get_items(
+                [colleague.get("userID") for colleague in colleagues],
+                attributes=["firstName", "lastName", "avatar"],
+            )
+        except DynamoDBOperationError as e:
+            # Handle the error appropriately, e.g., log it
+            print(f"Error fetching users of store {store_id}: {str(e)}")
+
         for colleague in colleagues:
             user_id = colleague.get("userID")
             employee_id = colleague.get("id")
@@ -109,23 +121,18 @@ def _colleagues(store_id, employee_handler):
                 "avatar": None,
             }
             if user_id:
-                try:
-                    user = user_handler.get_item({"id": user_id})
-                    if user:
-                        # Combine first and last name
-                        firstname = user.get("firstName", "")
-                        lastname = user.get("lastName", "")
-                        name = (
-                            " ".join(filter(None, [firstname, lastname]))
-                            or "Unknown name"
-                        )
-                        employee["name"] = name
-                        employee["avatar"] = user.get("avatar")
-                    employees.append(employee)
-                except Exception as e:
-                    # Handle the error appropriately, e.g., log it
-                    print(f"Error fetching user {user_id}: {str(e)}")
-                    employees.append(employee)
+                user = users.get(user_id)
+                if user:
+                    # Combine first and last name
+                    firstname = user.get("firstName", "")
+                    lastname = user.get("lastName", "")
+                    name = (
+                        " ".join(filter(None, [firstname, lastname]))
+                        or "Unknown name"
+                    )
+                    employee["name"] = name
+                    employee["avatar"] = user.get("avatar")
+                employees.append(employee)
         return employees
     except DynamoDBOperationError as e:
         print(f"Error _colleagues: {str(e)}")
@@ -1,8 +1,11 @@
 import json
+import os
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from db import DynamoDBHandler, DynamoDBOperationError
+from notification_outbox import NotificationOutbox
 from notification_sender.send_notification import OneSignalNotificationSender
+from recipient_index import RecipientIndex
 import logging
 
 logger = logging.getLogger()
@@ -15,13 +18,22 @@ USER_TABLE = f"User{TABLE_NAME_SUFFIX}"
 EMPLOYEE_TABLE = f"Employee{TABLE_NAME_SUFFIX}"
 PRELOAD_STATUS = ["COMPLETE", "CANCEL", "DELAY", "NOTSHOW", "SCHEDULED", "RESCHEDULE"]
 
+# How long a queued status notification waits for others to coalesce with,
+# e.g. a manager completing a whole day's appointments one after another.
+NOTIFICATION_COALESCE_WINDOW_MILLIS = int(
+    os.environ.get("NOTIFICATION_COALESCE_WINDOW_MILLIS", 3000)
+)
+
+recipient_index = RecipientIndex(TABLE_NAME_SUFFIX)
+outbox = NotificationOutbox(TABLE_NAME_SUFFIX)
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     try:
         if event["httpMethod"] == "GET":
             return handle_get_request(event)
         elif event["httpMethod"] == "POST":
-            return handle_post_request(event)
+            return handle_post_request(event, context)
         else:
             return response_json(405, message="method_not_allowed")
     except ValueError as e:
@@ -49,7 +61,7 @@ def handle_get_request(event: Dict[str, Any]) -> Dict[str, Any]:
     )
 
 
-def handle_post_request(event: Dict[str, Any]) -> Dict[str, Any]:
+def handle_post_request(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     try:
         body = json.loads(event.get("body", "{}"))
     except json.JSONDecodeError:
@@ -68,13 +80,16 @@ def handle_post_request(event: Dict[str, Any]) -> Dict[str, Any]:
 
     try:
         _update_status(uid, start_at, new_status)
-        owner_emails = _get_owner_emails()
+        if not _enqueue_push_notification(
+            uid, start_at, new_status, test_external_id, context
+        ):
+            owner_emails = _get_owner_emails()
 
-        if test_external_id and test_external_id not in owner_emails:
-            owner_emails.append(test_external_id)
+            if test_external_id and test_external_id not in owner_emails:
+                owner_emails.append(test_external_id)
 
-        if owner_emails:
-            _send_push_notification(owner_emails, start_at, new_status)
+            if owner_emails:
+                _send_push_notification(owner_emails, start_at, new_status, context)
         return response_json(
             200, {"uid": uid, "startAt": start_at, "eventStatus": new_status}
         )
@@ -95,11 +110,16 @@ def response_json(
 
 
 def _get_event_status(eventUID: str, startAt: str) -> Optional[str]:
-    handler = DynamoDBHandler(ICAL_EVENT_STATUS_TABLE)
+    handler = DynamoDBHandler.for_table(ICAL_EVENT_STATUS_TABLE)
     try:
-        items = handler.search_items({"uid": eventUID, "startAt": startAt})
-        if items:
-            return items[0]["status"]
+        item = next(
+            handler.iter_items(
+                {"uid": eventUID, "startAt": startAt}, attributes=["status"]
+            ),
+            None,
+        )
+        if item:
+            return item["status"]
         logger.info(f"No status found for event UID: {eventUID}, startAt: {startAt}")
         return None
     except DynamoDBOperationError as e:
@@ -110,14 +130,12 @@ def _get_event_status(eventUID: str, startAt: str) -> Optional[str]:
 def _update_status(
     eventUID: str, startAt: str, status: str
 ) -> Optional[Dict[str, Any]]:
-    handler = DynamoDBHandler(ICAL_EVENT_STATUS_TABLE)
+    handler = DynamoDBHandler.for_table(ICAL_EVENT_STATUS_TABLE)
 
     try:
-        key = {"uid": eventUID, "startAt": startAt}
-        id = handler.get_item_id(key)
-
-        item = {"uid": eventUID, "startAt": startAt, "status": status}
-        result = handler.save_item(item, id)
+        result = handler.upsert(
+            {"uid": eventUID, "startAt": startAt}, {"status": status}
+        )
         logger.info(
             f"Status updated for event UID: {eventUID}, startAt: {startAt}, new status: {status}"
         )
@@ -127,17 +145,60 @@ def _update_status(
         raise
 
 
+def _status_message(event_start_at: str, status: str) -> str:
+    event_start_at = format_date_string(event_start_at)
+    return f"Event started at: {event_start_at} has updated to: {status}"
+
+
+def _enqueue_push_notification(
+    uid: str,
+    start_at: str,
+    status: str,
+    external_id: Optional[str] = None,
+    context: Any = None,
+) -> bool:
+    """
+    Queue the status notification to the owners and managers in the
+    outbox, sent by the notificationOutbox Lambda. Returns False when it
+    couldn't be queued, so the caller sends it directly instead.
+    """
+    # a retried invocation of the same request queues the notification once
+    request_id = getattr(context, "aws_request_id", None) or datetime.now().isoformat()
+    notification = {
+        "toOwners": True,
+        "externalIds": [external_id] if external_id else [],
+        "message": _status_message(start_at, status),
+        # updates to one status queued within the window go out as one push
+        "eventKey": f"{uid}#{start_at}",
+        "coalesceKey": f"status#{status}",
+        "groupMessage": f"{{count}} events updated to: {status}",
+        "groupFrMessage": f"{{count}} événements mis à jour : {status}",
+    }
+    try:
+        outbox.enqueue(
+            notification,
+            dedupe_key=f"status#{uid}#{start_at}#{status}#{request_id}",
+            delay_millis=NOTIFICATION_COALESCE_WINDOW_MILLIS,
+        )
+        logger.info(
+            f"Push notification queued for event UID: {uid}, startAt: {start_at}, new status: {status}"
+        )
+        return True
+    except DynamoDBOperationError as e:
+        logger.error(f"Error queueing push notification: {e}")
+        return False
+
+
 def _send_push_notification(
-    owner_emails: List[str], event_start_at: str, status: str
+    owner_emails: List[str], event_start_at: str, status: str, context: Any = None
 ) -> bool:
-    event_start_at = format_date_string(event_start_at)
-    message = f"Event started at: {event_start_at} has updated to: {status}"
+    message = _status_message(event_start_at, status)
     title = "Event status updated."
 
     try:
-        sender = OneSignalNotificationSender()
+        sender = OneSignalNotificationSender.shared()
         response = sender.send_notification_by_external_ids(
-            owner_emails, message, message
+            owner_emails, message, message, context=context
         )
         logger.info(
             f"Push notification sent for event starting at {event_start_at}, new status: {status}, with response: {response}"
@@ -154,33 +215,10 @@ def format_date_string(date_string: str) -> str:
 
 
 def _get_owner_emails() -> List[str]:
+    # one read of the materialized recipients, kept up to date by the
+    # notificationRecipients stream consumer
     try:
-        employee_handler = DynamoDBHandler(EMPLOYEE_TABLE)
-        user_handler = DynamoDBHandler(USER_TABLE)
-        device_info_handler = DynamoDBHandler(DEVICE_INFO_TABLE)
-
-        owners = employee_handler.search_items({"role": "OWNER"}) or []
-        managers = employee_handler.search_items({"role": "MANAGER"}) or []
-        owners_and_managers = owners + managers
-
-        users = []
-        user_ids = [
-            employee["userID"]
-            for employee in owners_and_managers
-            if employee.get("userID")
-        ]
-        for user_id in user_ids:
-            user = user_handler.get_item({"id": user_id})
-            users.append(user)
-
-        emails = []
-        for user in users:
-            if user.get("email"):
-                devices = device_info_handler.search_items({"userID": user["id"]})
-                if any(device.get("isOn", False) for device in devices):
-                    emails.append(user["email"])
-
-        return emails
+        return recipient_index.recipients()
     except DynamoDBOperationError as e:
         logger.error(f"Error searching items: {e}")
         return []
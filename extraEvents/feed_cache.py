@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional
+from schedule_records import Occurrence
+
+# Feeds kept per warm container
+FEED_CACHE_MAX_ENTRIES = 32
+
+# Recurring events are expanded from "now", so a parsed schedule is only
+# reused for this many seconds even while the feed itself is unchanged.
+FEED_CACHE_MAX_AGE_SECONDS = 900
+
+
+class FeedEntry:
+    """Validators of one feed URL and the schedule parsed from its body."""
+
+    __slots__ = ("etag", "last_modified", "sha256", "schedule", "parsed_at")
+
+    def __init__(
+        self,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        sha256: Optional[str],
+        schedule: Dict[str, Any],
+        parsed_at: Optional[float] = None,
+    ):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.sha256 = sha256
+        self.schedule = schedule
+        self.parsed_at = parsed_at if parsed_at is not None else time.monotonic()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class FeedCache:
+    """
+    LRU of parsed feeds by URL, kept across warm invocations. `get` only
+    returns entries whose schedule is younger than `max_age_seconds`, the
+    ones a 304 can be answered from. A body is parsed as it streams in, so
+    `hash_hits` only counts the 200s whose body turned out unchanged.
+
+    ```
+    # Example usage:
+    cached = feed_cache.get(url)
+    headers = cached.conditional_headers() if cached else {}
+    ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = FEED_CACHE_MAX_ENTRIES,
+        max_age_seconds: float = FEED_CACHE_MAX_AGE_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.not_modified = 0
+        self.hash_hits = 0
+        self.parses = 0
+        self._entries: "OrderedDict[str, FeedEntry]" = OrderedDict()
+        # the refresh job downloads several feeds at once
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[FeedEntry]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.parsed_at > self.max_age_seconds:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, entry: FeedEntry):
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "not_modified": self.not_modified,
+            "hash_hits": self.hash_hits,
+            "parses": self.parses,
+            "entries": len(self._entries),
+        }
+
+
+def hashing_chunks(chunks: Iterable[bytes], digest) -> Iterator[bytes]:
+    """Pass `chunks` through unchanged while feeding them to `digest`."""
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def copy_schedule(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy deep enough that callers can annotate events without touching the
+    cache; `Occurrence` records become the event dicts of the API here.
+    """
+    calendar = schedule.get("calendar")
+    timezone = calendar.get("timeZone") if calendar else None
+    return {
+        **schedule,
+        "calendar": dict(calendar) if calendar else None,
+        "events": [
+            event.as_event(timezone) if isinstance(event, Occurrence) else dict(event)
+            for event in schedule["events"]
+        ],
+    }
@@ -0,0 +1,193 @@
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import Retry, Timeout
+
+# Upper bounds of the connect and read timeouts; both shrink to fit the
+# Lambda's remaining time minus a margin to answer the request.
+CONNECT_TIMEOUT_SECONDS = 3.0
+READ_TIMEOUT_SECONDS = 10.0
+DEADLINE_MARGIN_SECONDS = 1.0
+
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.2
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_local = threading.local()
+
+
+class FetchTimings:
+    """Seconds spent per stage of one download, summed over retries."""
+
+    __slots__ = ("dns", "connect", "ttfb", "body", "bytes")
+
+    def __init__(self):
+        self.dns = 0.0
+        self.connect = 0.0
+        self.ttfb = 0.0
+        self.body = 0.0
+        self.bytes = 0
+
+    def __repr__(self):
+        return (
+            f"FetchTimings(dns={self.dns * 1000:.1f}ms, connect={self.connect * 1000:.1f}ms, "
+            f"ttfb={self.ttfb * 1000:.1f}ms, body={self.body * 1000:.1f}ms, bytes={self.bytes})"
+        )
+
+
+class _TimedConnectionMixin:
+    """
+    Records DNS and connect (TCP + TLS) time of new connections on the
+    `FetchTimings` of the current thread. The host is resolved here so the
+    lookup can be timed on its own; urllib3 then connects to the address.
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            self._dns_host = socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            pass  # let urllib3 resolve again and raise its own error
+        self._dns_seconds = time.perf_counter() - started
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        self._dns_seconds = 0.0
+        started = time.perf_counter()
+        super().connect()
+        timings = getattr(_local, "timings", None)
+        if timings is not None:
+            timings.dns += self._dns_seconds
+            timings.connect += time.perf_counter() - started - self._dns_seconds
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedPoolManager(PoolManager):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+# Shared by every invocation of a warm container, so repeated downloads of
+# the same feed reuse the kept-alive TLS connection.
+http = _TimedPoolManager(
+    num_pools=10,
+    maxsize=4,
+    headers={"Accept-Encoding": "gzip, deflate"},
+)
+
+
+def _remaining_seconds(context: Any) -> Optional[float]:
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    return context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+
+
+def request_policy(context: Any = None):
+    """Timeout and Retry of one download, fitted to the Lambda's remaining time."""
+    remaining = _remaining_seconds(context)
+    if remaining is None:
+        timeout = Timeout(connect=CONNECT_TIMEOUT_SECONDS, read=READ_TIMEOUT_SECONDS)
+        total = RETRY_TOTAL
+    else:
+        remaining = max(remaining, 0.5)
+        timeout = Timeout(
+            total=remaining,
+            connect=min(CONNECT_TIMEOUT_SECONDS, remaining),
+            read=min(READ_TIMEOUT_SECONDS, remaining),
+        )
+        # only retry when another attempt could still finish in time
+        if remaining > 2 * READ_TIMEOUT_SECONDS:
+            total = RETRY_TOTAL
+        elif remaining > CONNECT_TIMEOUT_SECONDS:
+            total = 1
+        else:
+            total = 0
+
+    retries = Retry(
+        total=total,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods={"GET"},
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    return timeout, retries
+
+
+def fetch(url: str, headers: Optional[Dict[str, str]] = None, context: Any = None):
+    """
+    Start a GET of `url` on the shared pool and return `(response, timings)`
+    once the headers arrived; the body is left unread for `stream_body`.
+
+    ```
+    # Example usage:
+    resp, timings = fetch(url, {"If-None-Match": etag}, context)
+    try:
+        for event in ICSStreamParser().events(stream_body(resp, timings, CHUNK_SIZE)):
+            print(event.uid)
+    finally:
+        resp.release_conn()
+    print(timings)
+    ```
+    """
+    timings = FetchTimings()
+    timeout, retries = request_policy(context)
+    _local.timings = timings
+    started = time.perf_counter()
+    try:
+        resp = http.request(
+            "GET",
+            url,
+            headers={**http.headers, **(headers or {})},
+            preload_content=False,
+            timeout=timeout,
+            retries=retries,
+        )
+    finally:
+        _local.timings = None
+    timings.ttfb = time.perf_counter() - started - timings.dns - timings.connect
+    return resp, timings
+
+
+def stream_body(resp, timings: FetchTimings, chunk_size: int) -> Iterator[bytes]:
+    """
+    Yield the decompressed body in chunks as it arrives, adding the time
+    spent waiting on the network (not the caller's processing) to
+    `timings.body`.
+    """
+    chunks = resp.stream(chunk_size, decode_content=True)
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        timings.body += time.perf_counter() - started
+        if chunk is None:
+            return
+        timings.bytes += len(chunk)
+        yield chunk
@@ -0,0 +1,237 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from db import DayBucketIndex, DynamoDBHandler
+from ics_parser import ICSEvent
+
+
+class SyncPlan:
+    """Rows to write and delete to bring a stored calendar in line with its feed."""
+
+    def __init__(self):
+        self.inserts: List[ICSEvent] = []
+        # (stored row, new event) pairs
+        self.updates: List[tuple] = []
+        self.deletes: List[Dict[str, Any]] = []
+        self.unchanged = 0
+
+    def __repr__(self):
+        return (
+            f"SyncPlan(inserts={len(self.inserts)}, updates={len(self.updates)}, "
+            f"deletes={len(self.deletes)}, unchanged={self.unchanged})"
+        )
+
+
+def content_hash(event: ICSEvent) -> str:
+    """Hash of everything about a VEVENT that ends up in the stored rows."""
+    content = "\x1f".join(
+        value or ""
+        for value in (
+            event.start_at,
+            event.end_at,
+            event.summary,
+            event.rrule,
+            ",".join(event.exdates or ()),
+        )
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _sequence(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _is_cancelled(event: ICSEvent) -> bool:
+    return bool(event.status and "CANCELLED" in event.status)
+
+
+def plan_sync(events: Iterable[ICSEvent], stored: Iterable[Dict[str, Any]]) -> SyncPlan:
+    """
+    Diff the feed's VEVENTs against the stored rows of the calendar by UID.
+
+    A row changes when the event's content hash differs and its SEQUENCE is
+    not older than the stored one. DTSTAMP is kept on the row but doesn't
+    count as a change: Planity stamps every event with the export time.
+    Cancelled events and UIDs gone from the feed are deleted.
+    """
+    latest: Dict[str, ICSEvent] = {}
+    for event in events:
+        if not event.uid:
+            continue
+        current = latest.get(event.uid)
+        if current is None or _sequence(event.sequence) >= _sequence(current.sequence):
+            latest[event.uid] = event
+
+    plan = SyncPlan()
+    stored_by_uid = {}
+    for row in stored:
+        if row.get("uid") in stored_by_uid:
+            # older writers could leave several rows per UID, keep one
+            plan.deletes.append(row)
+        elif row.get("uid"):
+            stored_by_uid[row["uid"]] = row
+    for uid, event in latest.items():
+        row = stored_by_uid.pop(uid, None)
+        if _is_cancelled(event):
+            if row is not None:
+                plan.deletes.append(row)
+            continue
+        if row is None:
+            plan.inserts.append(event)
+        elif row.get("contentHash") == content_hash(event) or _sequence(
+            event.sequence
+        ) < _sequence(row.get("sequence")):
+            plan.unchanged += 1
+        else:
+            plan.updates.append((row, event))
+    plan.deletes.extend(stored_by_uid.values())
+    return plan
+
+
+def _aws_datetime(value: Optional[str]) -> Optional[str]:
+    for format in ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M%SZ", "%Y%m%d"):
+        try:
+            return DynamoDBHandler.generate_AWSDateTime(datetime.strptime(value, format))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def event_item(event: ICSEvent, calendar_id: str) -> Dict[str, Any]:
+    return {
+        "uid": event.uid,
+        "startAt": event.start_at,
+        "endAt": event.end_at,
+        "summary": event.summary,
+        "iCalendarID": calendar_id,
+        "startDateTime": _aws_datetime(event.start_at),
+        "endDateTime": _aws_datetime(event.end_at),
+        "sequence": _sequence(event.sequence),
+        "dtstamp": event.dtstamp,
+        "contentHash": content_hash(event),
+        "hasRule": bool(event.rrule),
+    }
+
+
+def rule_item(event: ICSEvent) -> Dict[str, Any]:
+    """ICalFreqency row of a recurring event, as `_getScheduleFromTables` reads it back."""
+    parts = dict(
+        part.split("=", 1) for part in event.rrule.split(";") if "=" in part
+    )
+    parts = {key.upper(): value for key, value in parts.items()}
+    return {
+        "type": parts.get("FREQ"),
+        "interval": _sequence(parts["INTERVAL"]) if "INTERVAL" in parts else None,
+        "byDays": parts["BYDAY"].split(",") if "BYDAY" in parts else None,
+        "exceptDates": list(event.exdates) if event.exdates else None,
+        "uid": event.uid,
+        "until": parts.get("UNTIL"),
+        "count": _sequence(parts["COUNT"]) if "COUNT" in parts else None,
+    }
+
+
+def apply_sync(
+    plan: SyncPlan,
+    calendar_id: str,
+    event_handler: DynamoDBHandler,
+    rule_handler: DynamoDBHandler,
+    index: Optional[DayBucketIndex] = None,
+):
+    """
+    Write the plan with batched puts and deletes: one ICalendarEvent write per
+    inserted, updated or deleted UID, plus its ICalFreqency row when the event
+    recurs (or stopped recurring) and its day bucket rows when `index` is set.
+
+    The day bucket rows are written first. A later sync only rewrites events
+    whose stored row differs from the feed, so an event row written before
+    its bucket rows failed would stay out of the index for good; bucket rows
+    written before a failed event write are rewritten by that later sync.
+    """
+    inserts = []
+    for event in plan.inserts:
+        item = event_item(event, calendar_id)
+        item["id"] = event_handler.natural_id({"iCalendarID": calendar_id, "uid": event.uid})
+        inserts.append((event, item))
+    updates = []
+    for row, event in plan.updates:
+        item = event_item(event, calendar_id)
+        item["id"] = row["id"]
+        updates.append((row, event, item))
+
+    stats = ()
+    if index:
+        with index.handler.batch_writer() as index_writer:
+            for _, item in inserts:
+                index.put(item, index_writer)
+            for row, _, item in updates:
+                # the event may have moved to other days
+                index.delete(row, index_writer)
+                index.put(item, index_writer)
+            for row in plan.deletes:
+                index.delete(row, index_writer)
+        stats = (index_writer.stats,)
+
+    with event_handler.batch_writer() as writer, rule_handler.batch_writer() as rule_writer:
+        for event, item in inserts:
+            writer.put_item(item)
+            if event.rrule:
+                rule_writer.put_item(rule_item(event), rule_handler.resolve_id({"uid": event.uid}))
+
+        for row, event, item in updates:
+            writer.put_item(item)
+            if event.rrule:
+                rule_writer.put_item(rule_item(event), rule_handler.resolve_id({"uid": event.uid}))
+            elif row.get("hasRule", True):
+                rule_writer.delete_item({"id": rule_handler.resolve_id({"uid": event.uid})})
+
+        for row in plan.deletes:
+            writer.delete_item({"id": row["id"]})
+            if row.get("hasRule", True):
+                rule_writer.delete_item({"id": rule_handler.resolve_id({"uid": row["uid"]})})
+    return (writer.stats, rule_writer.stats) + stats
+
+
+def sync_calendar(
+    calendar_id: str,
+    events: Iterable[ICSEvent],
+    event_handler: DynamoDBHandler,
+    rule_handler: DynamoDBHandler,
+    index: Optional[DayBucketIndex] = None,
+) -> SyncPlan:
+    """
+    Bring the stored events of `calendar_id` in line with `events`, reading
+    the stored fingerprints with one byICalendar query and writing only the
+    delta.
+
+    ```
+    # Example usage:
+    plan = sync_calendar(
+        calendar_id,
+        records,
+        DynamoDBHandler.for_table(icalendar_event_table),
+        DynamoDBHandler.for_table(ical_freqency_table),
+        DayBucketIndex.for_table(icalendar_event_table),
+    )
+    print(plan)
+    ```
+    """
+    stored = event_handler.iter_items(
+        {"iCalendarID": calendar_id},
+        attributes=[
+            "id",
+            "uid",
+            "sequence",
+            "contentHash",
+            "hasRule",
+            "startDateTime",
+            "endDateTime",
+        ],
+    )
+    plan = plan_sync(events, stored)
+    if plan.inserts or plan.updates or plan.deletes:
+        stats = apply_sync(plan, calendar_id, event_handler, rule_handler, index)
+        print("sync_calendar ::: ", plan, *stats)
+    return plan
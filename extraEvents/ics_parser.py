@@ -0,0 +1,199 @@
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from icalendar.parser import escape_char, unescape_char
+
+# Bytes read from the response per chunk
+CHUNK_SIZE = 64 * 1024
+
+# VCALENDAR properties kept on `ICSStreamParser.calendar`
+CALENDAR_PROPERTIES = {
+    "VERSION": "version",
+    "NAME": "name",
+    "TIMEZONE-ID": "timeZone",
+    "PRODID": "productID",
+}
+
+# VEVENT properties kept on each `ICSEvent`
+EVENT_PROPERTIES = {
+    "UID",
+    "DTSTART",
+    "DTEND",
+    "SUMMARY",
+    "STATUS",
+    "RRULE",
+    "EXDATE",
+    "SEQUENCE",
+    "DTSTAMP",
+}
+TEXT_PROPERTIES = {"UID", "SUMMARY", "STATUS", "VERSION", "NAME", "TIMEZONE-ID", "PRODID"}
+
+
+class ICSEvent(NamedTuple):
+    """
+    One VEVENT, with values rendered the way `icalendar` renders them back:
+    text is unescaped then re-escaped, dates keep their iCalendar form and
+    `exdates` holds every EXDATE value (of all EXDATE lines) or None.
+    """
+
+    uid: Optional[str]
+    start_at: Optional[str]
+    end_at: Optional[str]
+    summary: Optional[str]
+    status: Optional[str]
+    rrule: Optional[str]
+    exdates: Optional[Tuple[str, ...]]
+    sequence: Optional[str] = None
+    dtstamp: Optional[str] = None
+
+
+def _iter_raw_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    buffer = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def iter_content_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Unfold RFC 5545 content lines from a stream of byte chunks: a line break
+    followed by a space or tab continues the previous line. Lines are decoded
+    only once complete, so multi-byte characters split across chunks survive.
+    """
+    current = None
+    for line in _iter_raw_lines(chunks):
+        line = line.rstrip(b"\r")
+        if not line:
+            continue
+        if line[:1] in (b" ", b"\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current.decode("utf-8", errors="replace")
+        current = line
+    if current is not None:
+        yield current.decode("utf-8", errors="replace")
+
+
+def split_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """
+    Split `NAME;PARAM=VALUE;...:value` into its upper-cased name, parameters
+    and value. Colons and semicolons inside quoted parameter values don't
+    end the name or a parameter.
+    """
+    in_quote = False
+    parts_end = len(line)
+    separators = []
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quote = not in_quote
+        elif not in_quote and char == ";":
+            separators.append(index)
+        elif not in_quote and char == ":":
+            parts_end = index
+            break
+
+    head = line[:parts_end]
+    value = line[parts_end + 1 :]
+    bounds = [-1] + separators + [len(head)]
+    name = head[: bounds[1]].upper()
+
+    params = {}
+    for start, end in zip(bounds[1:-1], bounds[2:]):
+        param_name, _, param_value = head[start + 1 : end].partition("=")
+        params[param_name.upper()] = param_value.strip('"')
+    return name, params, value
+
+
+def _render(name: str, value: Optional[str]) -> Optional[str]:
+    if value is not None and name in TEXT_PROPERTIES:
+        return escape_char(unescape_char(value))
+    return value
+
+
+class ICSStreamParser:
+    """
+    Single-pass VCALENDAR parser that never builds a component tree: it
+    yields one `ICSEvent` per VEVENT as soon as its END line is read and
+    only keeps the properties the schedule uses. Nested components such as
+    VALARM, and VTIMEZONE definitions, are skipped.
+
+    ```
+    # Example usage:
+    resp = http.request("GET", url, preload_content=False)
+    parser = ICSStreamParser()
+    for event in parser.events(resp.stream(CHUNK_SIZE)):
+        print(event.uid, event.start_at)
+    print(parser.calendar["timeZone"])
+    ```
+
+    `keep`, when given, is called with the raw DTSTART, DTEND and RRULE of
+    each VEVENT; events it rejects are dropped before their text values are
+    rendered. A stream without a VCALENDAR raises `ValueError("invalid_calendar")`
+    once it is exhausted.
+    """
+
+    def __init__(self):
+        self.calendar: Optional[Dict[str, Optional[str]]] = None
+
+    def events(
+        self,
+        chunks: Iterable[bytes],
+        keep: Optional[Callable[[Optional[str], Optional[str], Optional[str]], bool]] = None,
+    ) -> Iterator[ICSEvent]:
+        stack: List[str] = []
+        properties: Dict[str, str] = {}
+        exdates: List[str] = []
+
+        for line in iter_content_lines(chunks):
+            name, _, value = split_content_line(line)
+
+            if name == "BEGIN":
+                component = value.strip().upper()
+                stack.append(component)
+                if component == "VCALENDAR":
+                    self.calendar = {key: None for key in CALENDAR_PROPERTIES.values()}
+                elif component == "VEVENT":
+                    properties, exdates = {}, []
+                continue
+
+            if name == "END":
+                component = stack.pop() if stack else None
+                if component == "VEVENT":
+                    start_at = properties.get("DTSTART")
+                    end_at = properties.get("DTEND")
+                    rrule = properties.get("RRULE")
+                    if keep is not None and not keep(start_at, end_at, rrule):
+                        continue
+                    yield ICSEvent(
+                        uid=_render("UID", properties.get("UID")),
+                        start_at=start_at,
+                        end_at=end_at,
+                        summary=_render("SUMMARY", properties.get("SUMMARY")),
+                        status=_render("STATUS", properties.get("STATUS")),
+                        rrule=rrule,
+                        exdates=tuple(exdates) if exdates else None,
+                        sequence=properties.get("SEQUENCE"),
+                        dtstamp=properties.get("DTSTAMP"),
+                    )
+                continue
+
+            if not stack:
+                continue
+            current = stack[-1]
+            if current == "VEVENT" and name in EVENT_PROPERTIES:
+                if name == "EXDATE":
+                    exdates.extend(value.split(","))
+                elif name not in properties:
+                    properties[name] = value
+            elif current == "VCALENDAR" and name in CALENDAR_PROPERTIES:
+                self.calendar[CALENDAR_PROPERTIES[name]] = _render(name, value)
+
+        if self.calendar is None:
+            # an HTML error page, an empty body...: not a feed
+            raise ValueError("invalid_calendar")
@@ -1,5 +1,8 @@
 import io
+import os
 import json
+import time
+import hashlib
 import urllib3
 import uuid
 import copy
@@ -8,8 +11,26 @@ from datetime import datetime
 from datetime import timedelta
 from db import DynamoDBHandler
 from db import DynamoDBOperationError
-import icalendar
-from icalendar.prop import vText, vDDDLists, vDDDTypes
+from db import DayBucketIndex
+from db import thread_handlers
+from ics_parser import CHUNK_SIZE, ICSStreamParser
+from feed_cache import FeedCache, FeedEntry, copy_schedule, hashing_chunks
+from feed_fetcher import fetch, stream_body
+from rrule_engine import expand
+from feed_sync import sync_calendar
+from schedule_records import occurrence, occurrences, parse_timestamp
+from schedule_snapshot import (
+    SNAPSHOT_ATTRIBUTE,
+    SNAPSHOT_FRESH_SECONDS,
+    SNAPSHOT_MAX_BYTES,
+    SNAPSHOT_MAX_STALE_SECONDS,
+    VERSION_ATTRIBUTE,
+    decode_snapshot,
+    encode_snapshot,
+    snapshot_age,
+)
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.exceptions import HTTPError
 
 from dateutil.rrule import rrulestr
 from datetime import datetime, timedelta
@@ -24,9 +45,38 @@ table_name_suffix = "-2iph2dahajadpnro5xkxcbveoq-staging"
 extra_event_table = "ExtraEvent" + table_name_suffix
 icalendar_table = "ICalendar" + table_name_suffix
 icalendar_event_table = "ICalendarEvent" + table_name_suffix
+icalendar_event_day_table = "ICalendarEventDay" + table_name_suffix
 ical_freqency_table = "ICalFreqency" + table_name_suffix
 ical_event_status_table = "ICalendarEventStatus" + table_name_suffix
 
+# parsed feeds and their validators, kept while the container is warm
+feed_cache = FeedCache()
+
+# feeds downloaded at once by refresh_handler
+SCHEDULE_REFRESH_CONCURRENCY = int(os.environ.get("SCHEDULE_REFRESH_CONCURRENCY", 4))
+
+# segments ExtraEvent is scanned in by refresh_handler
+SCHEDULE_REFRESH_SCAN_SEGMENTS = int(os.environ.get("SCHEDULE_REFRESH_SCAN_SEGMENTS", 4))
+
+# refreshes are not started with less time than this left in the invocation
+SCHEDULE_REFRESH_MIN_SECONDS = 5
+
+# employees whose stale snapshot was sent for refresh, by monotonic time
+SCHEDULE_REFRESH_RETRY_SECONDS = 60
+refresh_requested = {}
+lambda_client = None
+
+# what a refresh needs of each ExtraEvent, leaving out the stored snapshots
+REFRESH_ATTRIBUTES = [
+    "id",
+    "employeeID",
+    "downloadableURL",
+    "iCalendarID",
+    "feedETag",
+    "feedLastModified",
+    "feedSha256",
+]
+
 
 def lambda_handler(event, context):
     if "queryStringParameters" in event and event["queryStringParameters"] is not None:
@@ -44,13 +94,33 @@ def lambda_handler(event, context):
             try:
                 url = extraEvent["downloadableURL"]
 
+                # optional [start, end] window, e.g. "this week"
+                window = _requestWindow(parameters)
+
+                is_forced_update = (
+                    parameters.get("is_forced_update", "").lower() == "true"
+                )
+
                 if url:
-                    schedule = _download_calendar(url)
-                    schedule["load_from_db"] = False
+                    schedule = None
+                    if window is None and not is_forced_update:
+                        schedule = _scheduleFromSnapshot(extraEvent)
+                    if schedule is not None:
+                        schedule["load_from_db"] = True
+                    else:
+                        entry = _downloadFeed(url, extraEvent, context, window)
+                        schedule = copy_schedule(entry.schedule)
+                        schedule["load_from_db"] = False
+                        if window is None:
+                            _saveSnapshot(extraEvent, schedule, entry)
 
                     events = schedule["events"]
+                    statuses = _getEventStatuses(events)
                     for item in events:
-                        status = _getEventStatus(item["uid"], item["startAt"])
+                        if statuses is not None:
+                            status = statuses.get((item["uid"], item["startAt"]))
+                        else:
+                            status = _getEventStatus(item["uid"], item["startAt"])
                         item["eventStatus"] = (
                             status if status is not None else "SCHEDULED"
                         )
@@ -65,6 +135,42 @@ def lambda_handler(event, context):
         return responseJson(400, message="No_request_parameters")
 
 
+def refresh_handler(event, context):
+    """
+    Scheduled entry point: rebuild the schedule snapshot of every ICS
+    ExtraEvent (or of `event["employee_id"]` only, when invoked to revalidate
+    a stale snapshot), SCHEDULE_REFRESH_CONCURRENCY feeds at a time.
+    """
+    employee_id = (event or {}).get("employee_id")
+    if employee_id:
+        extraEvent = _fetchExtraEvent(employee_id)
+        extraEvents = [extraEvent] if extraEvent else []
+    else:
+        handler = DynamoDBHandler.for_table(extra_event_table)
+        try:
+            extraEvents = [
+                item
+                for item in handler.parallel_scan(
+                    {"extraDataType": "ICS"},
+                    segments=SCHEDULE_REFRESH_SCAN_SEGMENTS,
+                    attributes=REFRESH_ATTRIBUTES,
+                )
+                if item.get("downloadableURL")
+            ]
+        except DynamoDBOperationError as e:
+            print("refresh_handler DynamoDB Operation Error:", e)
+            return {"refreshed": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=SCHEDULE_REFRESH_CONCURRENCY) as executor:
+        results = list(
+            executor.map(lambda item: _refreshSchedule(item, context), extraEvents)
+        )
+
+    summary = {"refreshed": results.count(True), "failed": results.count(False)}
+    print("refresh_handler ::: ", summary)
+    return summary
+
+
 # def lambda_handler(event, context):
 #     if "queryStringParameters" in event and event["queryStringParameters"] is not None:
 #         # Extract parameters from the request
@@ -160,6 +266,41 @@ def format_dates(date_from, date_to):
     return date_from, date_to
 
 
+def _requestWindow(parameters):
+    date_from = parameters.get("start")
+    date_to = parameters.get("end")
+    if not date_from and not date_to:
+        return None
+
+    try:
+        date_from, date_to = format_dates(date_from, date_to)
+        start = datetime.strptime(date_from, "%Y%m%dT%H%M%S")
+        end = datetime.strptime(date_to, "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise ValueError("request_parameters_invalid_date")
+    if end < start:
+        raise ValueError("request_parameters_invalid_date")
+    return start, end
+
+
+def _windowFilter(window):
+    # feed timestamps are YYYYMMDDTHHMMSS (optionally with Z or date-only),
+    # which compare in time order as strings
+    start = window[0].strftime("%Y%m%dT%H%M%S")
+    end = window[1].strftime("%Y%m%dT%H%M%S")
+
+    def keep(startAt, endAt, rule):
+        if not startAt:
+            return True
+        if startAt[:15] > end:
+            return False
+        if rule:
+            return True
+        return (endAt or startAt)[:15] >= start
+
+    return keep
+
+
 def responseJson(statusCode, schedule=None, message=None):
     return {
         "statusCode": statusCode,
@@ -168,7 +309,7 @@ def responseJson(statusCode, schedule=None, message=None):
 
 
 def _updateExtraEvent(id: str, savedICalID: str):
-    handler = DynamoDBHandler(extra_event_table)
+    handler = DynamoDBHandler.for_table(extra_event_table)
     item_key = {"id": id}
     update_expressions = {
         "iCalendarID": savedICalID,
@@ -184,16 +325,8 @@ def _updateExtraEvent(id: str, savedICalID: str):
         print("updateExtraEvent - updateExtraEventDynamoDB Operation Error:", e)
 
 
-def _checkExistingID(handler: DynamoDBHandler, key: str, value):
-    existing = handler.search_items({key: value})
-    existing = existing[0] if existing else None
-    if existing and "id" in existing.keys():
-        return existing["id"]
-    return None
-
-
 def _get_item(table: str, id: str) -> dict:
-    handler = DynamoDBHandler(table)
+    handler = DynamoDBHandler.for_table(table)
     try:
         return handler.get_item({"id": id})
     except:
@@ -201,14 +334,13 @@ def _get_item(table: str, id: str) -> dict:
 
 
 def _get_iCalenderEvents(iCalendarID: str):
-    handler = DynamoDBHandler(icalendar_event_table)
+    handler = DynamoDBHandler.for_table(icalendar_event_table)
     return handler.search_items({"iCalendarID": iCalendarID})
 
 
 def _get_iCal_rule(uid: str):
-    handler = DynamoDBHandler(ical_freqency_table)
-    rule = handler.search_items({"uid": uid})
-    return rule[0] if rule and len(rule) > 0 else None
+    handler = DynamoDBHandler.for_table(ical_freqency_table)
+    return next(handler.iter_items({"uid": uid}), None)
 
 
 def _getScheduleFromTables(calendarId: str, start: str = None, end: str = None):
@@ -274,17 +406,50 @@ def _getScheduleFromTables(calendarId: str, start: str = None, end: str = None):
 
 
 def _getEventStatus(uid: str, startDateStr: str):
-    handler = DynamoDBHandler(ical_event_status_table)
+    handler = DynamoDBHandler.for_table(ical_event_status_table)
     try:
-        items = handler.search_items({"uid": uid, "startAt": startDateStr})
-        if items:
-            return items[0]["status"]
+        item = next(
+            handler.iter_items(
+                {"uid": uid, "startAt": startDateStr}, attributes=["status"]
+            ),
+            None,
+        )
+        if item:
+            return item["status"]
         return None
     except DynamoDBOperationError as e:
         print("Error searching items == " + e)
         return None
 
 
+def _getEventStatuses(events):
+    """
+    Statuses of every (uid, startAt) in `events`, read by key with one
+    BatchGetItem per 100 occurrences instead of one lookup per event. A
+    status row's id is the natural id of its (uid, startAt), so it is found
+    whichever calendars hold the event and whether or not they were synced
+    when it was posted. Returns None when the rows can't be read, so
+    callers can fall back to `_getEventStatus`.
+    """
+    if not events:
+        return {}
+
+    handler = DynamoDBHandler.for_table(ical_event_status_table)
+    keys = {
+        handler.natural_id({"uid": event["uid"], "startAt": event["startAt"]}): (
+            event["uid"],
+            event["startAt"],
+        )
+        for event in events
+    }
+    try:
+        items = handler.get_items(list(keys), attributes=["status"])
+    except DynamoDBOperationError as e:
+        print("Error joining event statuses ::: ", e)
+        return None
+    return {keys[id]: item.get("status") for id, item in items.items()}
+
+
 def _isMoreThan24Hrs(lastUpdatedAt) -> bool:
     now = datetime.now()
     # 2024-05-08T23:13:00.000Z
@@ -309,89 +474,17 @@ def _durationSecondsFromNow(timeStr, format: str) -> bool:
         return None
 
 
-def _saveRule(rule, uid):
-    handler = DynamoDBHandler(ical_freqency_table)
-
-    byDay = rule["byday"] if "byday" in rule.keys() else None
-    exceptDates = rule["except_dates"] if "except_dates" in rule.keys() else None
-    until = rule["until"] if "until" in rule.keys() else None
-    count = rule["count"] if "count" in rule.keys() else None
-
-    if byDay and isinstance(byDay, str):
-        byDay = [byDay]
-
-    item = {
-        "type": rule["freq"],
-        "interval": rule["interval"],
-        "byDays": byDay,
-        "exceptDates": exceptDates,
-        "uid": uid,
-        "until": until,
-        "count": count,
-    }
-
-    try:
-        id = _checkExistingID(handler, "uid", uid)
-        return handler.save_item(item, id)
-    except DynamoDBOperationError as e:
-        print("DynamoDB Save Error on saveRule:", e)
-        return None
-
-
-def _saveICalenderEvents(events, iCalendarID):
-    handler = DynamoDBHandler(icalendar_event_table)
-
-    saved_ids = []
-    for event in events:
-        uid = event["uid"]
-        startAt = event["startAt"]
-        endAt = event["endAt"]
-        summary = event["summary"]
-
-        # convert startAt & endAt to AWS datetime
-        s = datetime.strptime(startAt, "%Y%m%dT%H%M%S")
-        e = datetime.strptime(endAt, "%Y%m%dT%H%M%S")
-        startDateTime = handler.generate_AWSDateTime(s)
-        endDateTime = handler.generate_AWSDateTime(e)
-
-        item = {
-            "uid": uid,
-            "startAt": startAt,
-            "endAt": endAt,
-            "summary": summary,
-            "iCalendarID": iCalendarID,
-            "startDateTime": startDateTime,
-            "endDateTime": endDateTime,
-        }
-
-        try:
-            id = _checkExistingID(handler, "uid", uid)
-            saved_id = handler.save_item(item, id)
-
-            rule = event.get("rule")
-            if rule:
-                rule = event["rule"]
-                _saveRule(rule, uid)
-
-            saved_ids.append(saved_id)
-        except DynamoDBOperationError as e:
-            print("DynamoDB Save Error on _saveICalenderEvents:", e)
-    return saved_ids
-
-
 def _saveICalendar(ical, extraEventID):
-    handler = DynamoDBHandler(icalendar_table)
+    handler = DynamoDBHandler.for_table(icalendar_table)
     try:
-        id = _checkExistingID(handler, "extraEventID", extraEventID)
-        ical["extraEventID"] = extraEventID
-        return handler.save_item(ical, id)
+        return handler.upsert({"extraEventID": extraEventID}, ical)
     except DynamoDBOperationError as e:
         print("saveICalendar DynamoDB Save Error:", e)
         return None
 
 
 def _fetchExtraEvent(employee_id: str):
-    handler = DynamoDBHandler(extra_event_table)
+    handler = DynamoDBHandler.for_table(extra_event_table)
 
     try:
         items = handler.search_items({"employeeID": employee_id})
@@ -410,17 +503,240 @@ def _fetchExtraEvent(employee_id: str):
         return None
 
 
-def _download_calendar(url: str):
-    # Download the calendar from the URL
+def _download_calendar(url: str, extraEvent=None, context=None, window=None):
+    return copy_schedule(_downloadFeed(url, extraEvent, context, window).schedule)
+
+
+def _downloadFeed(url: str, extraEvent=None, context=None, window=None) -> FeedEntry:
+    # Download the calendar from the URL, conditionally when a parsed copy
+    # is cached: a 304 reuses it without parsing
+    cache_key = url
+    if window:
+        cache_key = f"{url}#{window[0]:%Y%m%dT%H%M%S}-{window[1]:%Y%m%dT%H%M%S}"
+    cached = feed_cache.get(cache_key)
+    if cached is None and window is None and extraEvent:
+        # a cold container revalidates the stored snapshot instead
+        cached = _snapshotFeedEntry(extraEvent)
+    headers = cached.conditional_headers() if cached else {}
+
+    resp, timings = _fetchCalendar(url, headers, context)
+    records = None
+    try:
+        if cached and resp.status == 304:
+            feed_cache.not_modified += 1
+            entry = cached
+            # a snapshot revalidated by a cold container is kept warm too
+            feed_cache.put(cache_key, entry)
+        else:
+            # the body streams into the parser while it is hashed, so it is
+            # never held in memory; whether it changed is known once read
+            digest = hashlib.sha256()
+            chunks = hashing_chunks(stream_body(resp, timings, CHUNK_SIZE), digest)
+            feed_cache.parses += 1
+            records = [] if window is None else None
+            schedule = _handle_ics(chunks, window, records)
+            if cached and digest.hexdigest() == cached.sha256:
+                feed_cache.hash_hits += 1
+
+            entry = FeedEntry(
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+                digest.hexdigest(),
+                schedule,
+            )
+            if resp.status == 200:
+                feed_cache.put(cache_key, entry)
+    finally:
+        resp.release_conn()
+
+    print("_download_calendar ::: ", resp.status, timings, feed_cache.stats())
+    if (
+        extraEvent
+        and records is not None
+        and entry.sha256 != extraEvent.get("feedSha256")
+    ):
+        # the feed changed since the stored events were last synced
+        if _syncCalendar(extraEvent, entry.schedule["calendar"], records):
+            _saveFeedSha256(extraEvent, entry.sha256)
+
+    return entry
+
+
+def _snapshotFeedEntry(extraEvent):
+    # The ETag and Last-Modified stored with the snapshot are those of the
+    # body it was built from, so a 304 to them can be answered with it while
+    # it is no older than a cached parse may be.
+    etag = extraEvent.get("feedETag")
+    last_modified = extraEvent.get("feedLastModified")
+    snapshot = decode_snapshot(extraEvent.get(SNAPSHOT_ATTRIBUTE))
+    if snapshot is None or not (etag or last_modified):
+        return None
+    schedule, version = snapshot
+    age = snapshot_age(version)
+    if age > feed_cache.max_age_seconds:
+        return None
+    return FeedEntry(etag, last_modified, None, schedule, time.monotonic() - age)
+
+
+def _fetchCalendar(url: str, headers, context=None):
+    # only a 200, or a 304 to a conditional request, carries a usable answer;
+    # an error page must be neither parsed nor cached
+    try:
+        resp, timings = fetch(url, headers, context)
+    except HTTPError as e:
+        print("_download_calendar error ::: ", e)
+        raise ValueError("calendar_download_failed")
+    if resp.status == 200 or (resp.status == 304 and headers):
+        return resp, timings
+    print("_download_calendar status ::: ", resp.status, url)
+    resp.drain_conn()
+    raise ValueError("calendar_download_failed")
+
+
+def _refreshSchedule(extraEvent, context=None) -> bool:
+    remaining = (
+        context.get_remaining_time_in_millis() / 1000
+        if context is not None and hasattr(context, "get_remaining_time_in_millis")
+        else None
+    )
+    if remaining is not None and remaining < SCHEDULE_REFRESH_MIN_SECONDS:
+        # the next scheduled run picks it up
+        print("_refreshSchedule skipped, out of time ::: ", extraEvent["id"])
+        return False
+
+    # workers write through DynamoDB resources of their own
+    with thread_handlers():
+        try:
+            entry = _downloadFeed(extraEvent["downloadableURL"], extraEvent, context)
+            return _saveSnapshot(extraEvent, copy_schedule(entry.schedule), entry)
+        except ValueError as e:
+            print("_refreshSchedule error ::: ", extraEvent["id"], e)
+            return False
+        except Exception as e:
+            # one broken feed is counted as failed, the others still refresh
+            print("_refreshSchedule unexpected error ::: ", extraEvent["id"], repr(e))
+            return False
+
+
+def _saveSnapshot(extraEvent, schedule, entry: FeedEntry = None) -> bool:
+    # ExtraEvent is already read by employeeID on every GET, so the snapshot
+    # lives on it and serving it costs no extra read. The validators of the
+    # feed are written with it, so they always describe the stored snapshot.
+    version = int(time.time() * 1000)
+    payload = encode_snapshot(schedule, version)
+    oversized = len(payload) > SNAPSHOT_MAX_BYTES
+    if oversized:
+        # the item would be rejected; the stored snapshot and its validators
+        # are cleared instead, so GETs download the feed rather than serve an
+        # ever older snapshot
+        print("_saveSnapshot snapshot too large ::: ", extraEvent["id"], len(payload))
+        if SNAPSHOT_ATTRIBUTE in extraEvent and extraEvent[SNAPSHOT_ATTRIBUTE] is None:
+            # already cleared
+            return False
+        attributes = {SNAPSHOT_ATTRIBUTE: None, "feedETag": None, "feedLastModified": None}
+    else:
+        attributes = {SNAPSHOT_ATTRIBUTE: payload}
+        if entry is not None:
+            attributes["feedETag"] = entry.etag
+            attributes["feedLastModified"] = entry.last_modified
+    handler = DynamoDBHandler.for_table(extra_event_table)
+    try:
+        written = handler.update_if_newer(
+            {"id": extraEvent["id"]},
+            attributes,
+            VERSION_ATTRIBUTE,
+            version,
+        )
+        if written:
+            extraEvent.update(attributes)
+            extraEvent[VERSION_ATTRIBUTE] = version
+        return not oversized
+    except DynamoDBOperationError as e:
+        print("_saveSnapshot DynamoDB Operation Error:", e)
+        return False
 
-    http = urllib3.PoolManager()
-    resp = http.request("GET", url)
-    schedule = _handle_ics(resp)
 
-    # Return the calendar data
+def _scheduleFromSnapshot(extraEvent):
+    # stale-while-revalidate: serve the stored snapshot unless it is too old,
+    # asking for a background refresh once it is no longer fresh
+    snapshot = decode_snapshot(extraEvent.get(SNAPSHOT_ATTRIBUTE))
+    if snapshot is None:
+        return None
+    schedule, version = snapshot
+
+    age = snapshot_age(version)
+    if age > SNAPSHOT_MAX_STALE_SECONDS:
+        return None
+    if age > SNAPSHOT_FRESH_SECONDS:
+        _requestRefresh(extraEvent)
     return schedule
 
 
+def _lambdaClient():
+    global lambda_client
+    if lambda_client is None:
+        lambda_client = boto3.client("lambda")
+    return lambda_client
+
+
+def _requestRefresh(extraEvent):
+    function_name = os.environ.get("SCHEDULE_REFRESH_FUNCTION")
+    if not function_name:
+        return
+
+    # one revalidation per employee and interval from a warm container
+    employee_id = extraEvent["employeeID"]
+    now = time.monotonic()
+    if now - refresh_requested.get(employee_id, float("-inf")) < SCHEDULE_REFRESH_RETRY_SECONDS:
+        return
+    refresh_requested[employee_id] = now
+
+    try:
+        _lambdaClient().invoke(
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps({"employee_id": employee_id}),
+        )
+    except ClientError as e:
+        print("_requestRefresh error ::: ", e)
+
+
+def _syncCalendar(extraEvent, calendar, records) -> bool:
+    # write only the events that changed since the last sync of this feed
+    calendarID = extraEvent.get("iCalendarID")
+    try:
+        if not calendarID:
+            calendarID = _saveICalendar(dict(calendar or {}), extraEvent["id"])
+            if not calendarID:
+                return False
+            _updateExtraEvent(extraEvent["id"], calendarID)
+            extraEvent["iCalendarID"] = calendarID
+
+        sync_calendar(
+            calendarID,
+            records,
+            DynamoDBHandler.for_table(icalendar_event_table),
+            DynamoDBHandler.for_table(ical_freqency_table),
+            DayBucketIndex.for_table(icalendar_event_table),
+        )
+        return True
+    except DynamoDBOperationError as e:
+        print("_syncCalendar DynamoDB Operation Error:", e)
+        return False
+
+
+def _saveFeedSha256(extraEvent, sha256: str):
+    # Only called once the stored events were synced with the whole body of
+    # this hash; a 304, a cached body or a windowed download keeps the stored
+    # value. feedETag and feedLastModified are saved along with the snapshot.
+    handler = DynamoDBHandler.for_table(extra_event_table)
+    try:
+        handler.update_item({"id": extraEvent["id"]}, {"feedSha256": sha256})
+        extraEvent["feedSha256"] = sha256
+    except DynamoDBOperationError as e:
+        print("_saveFeedSha256 DynamoDB Operation Error:", e)
+
+
 # def _handle_ics(resp):
 #     schedule = {"type": "ICS", "calendar": None, "events": []}
 
@@ -492,7 +808,7 @@ def _download_calendar(url: str):
 
 
 def list_occurrences_next_one_months(
-    rrule_string, start_date, latest_date=None, exdate_str=None
+    rrule_string, start_date, latest_date=None, exdate_str=None, timezone=None
 ):
     """
     List all occurrences of a recurring event within the next two months,
@@ -501,87 +817,61 @@ def list_occurrences_next_one_months(
     :param rrule_string: The RRULE string that defines the recurrence.
     :param start_date: The start date of the event.
     :param exdate_str: The EXDATE string containing dates to exclude (optional).
+    :param timezone: The calendar TZID, used to read UTC UNTIL and EXDATE values (optional).
     :return: A list of datetime objects representing each occurrence within the next two months.
     """
-    # Parse the recurrence rule and start date
-    rule = rrulestr(rrule_string, dtstart=start_date)
-
-    # Parse EXDATEs if provided
-    exdates = []
-    if exdate_str:
-        exdates = [date_parse(date_str) for date_str in exdate_str.split(",")]
-
     # Determine the current date and the date two months from now
     now = datetime.now()
     end_date = latest_date if latest_date else now + timedelta(days=30)
 
-    # Determine the end date based on UNTIL or two months from now
-    until_date = rule._until if rule._until else end_date
-
-    # Generate occurrences within the range and filter out EXDATEs
-    occurrences = [
-        dt
-        for dt in rule.between(now, min(end_date, until_date), inc=True)
-        if dt not in exdates
-    ]
-
-    return occurrences
+    # The engine caps the range at UNTIL, skips the rule's history and
+    # filters out EXDATEs
+    return expand(rrule_string, start_date, now, end_date, exdate_str, timezone)
 
 
-def _icalValueToString(value):
-    if value is None:
-        return None
-    if isinstance(value, vText):
-        return value.to_ical().decode("utf-8")
-    if isinstance(value, vDDDTypes):
-        return value.to_ical().decode("utf-8")
-    elif isinstance(value, vDDDLists):
-        return [d for d in value.to_ical().decode("utf-8").split(",")]
-    else:
-        return value.to_ical().decode("utf-8")
-
-
-def _handle_ics(resp):
+def _handle_ics(chunks, window=None, records=None):
     schedule = {"type": "ICS", "calendar": None, "events": []}
 
-    calendar = icalendar.Calendar.from_ical(resp.data)
-
-    # parse VCALENDAR
-    vcals = calendar.walk("VCALENDAR")
-    if vcals:
-        cal = vcals[-1]
-        schedule_calendar = {
-            "version": _icalValueToString(cal.get("VERSION")),
-            "name": _icalValueToString(cal.get("NAME")),
-            "timeZone": _icalValueToString(cal.get("TIMEZONE-ID")),
-            "productID": _icalValueToString(cal.get("PRODID")),
-        }
-
-        schedule["calendar"] = schedule_calendar
-
-    # parse VEVENT
+    # parse VEVENT while the feed streams in, keeping only compact records
+    # (and, with a window, only events that can fall inside it)
+    parser = ICSStreamParser()
+    plain_events = []
     rule_events = []
     latest_date = datetime.now()
-    timezone = schedule["calendar"].get("timeZone")
-    for cal_event in calendar.walk("VEVENT"):
-        schedule_event = handle_calendar_event(cal_event, timezone)
+    keep = _windowFilter(window) if window else None
+    for cal_event in parser.events(chunks, keep):
+        if records is not None:
+            records.append(cal_event)
+        schedule_event = handle_calendar_event(cal_event)
 
         if schedule_event is None:
             continue
         elif schedule_event == "RULE":
             rule_events.append(cal_event)
         else:
-            endAt = schedule_event["endAt"]
-            latest_date = latest_event_date(endAt, latest_date)
-            schedule["events"].append(schedule_event)
+            latest_date = latest_event_date(cal_event.end_at, latest_date)
+            plain_events.append(cal_event)
 
-    schedule_rule_events = []
+    # parse VCALENDAR
+    schedule["calendar"] = parser.calendar
+    timezone = schedule["calendar"].get("timeZone")
+
+    # compact Occurrence records, turned into dicts by copy_schedule when
+    # the schedule is returned
+    events = [
+        occurrence(
+            cal_event,
+            parse_timestamp(cal_event.start_at),
+            parse_timestamp(cal_event.end_at),
+        )
+        for cal_event in plain_events
+    ]
     for event in rule_events:
-        events = handle_rule_event(event, latest_date, timezone)
-        if events:
-            schedule_rule_events = schedule_rule_events + events
+        rule_occurrences = handle_rule_event(event, latest_date, timezone, window)
+        if rule_occurrences:
+            events.extend(rule_occurrences)
 
-    schedule["events"] = schedule["events"] + schedule_rule_events
+    schedule["events"] = events
     return schedule
 
 
@@ -598,54 +888,41 @@ def latest_event_date(endAt, latest_date):
         return latest_date
 
 
-def handle_calendar_event(event, timezone):
-    try:
-        # STATUS:CANCELLED
-        isCancelled = event.get("STATUS") and "CANCELLED" in event.get("STATUS")
-
-        if not isCancelled:
-            # save event if has rule for later parse
-            rule = event.get("RRULE")
-            if rule is None:
-                return {
-                    "uid": _icalValueToString(event.get("UID")),
-                    "startAt": _icalValueToString(event.get("DTSTART")),
-                    "endAt": _icalValueToString(event.get("DTEND")),
-                    "summary": _icalValueToString(event.get("SUMMARY")),
-                    "timeZone": timezone,
-                }
-            else:
-                return "RULE"
-    except Exception as e:
-        print("error in handle_calendar_event ::: ", e)
-        return None
+def handle_calendar_event(event):
+    # STATUS:CANCELLED
+    isCancelled = event.status and "CANCELLED" in event.status
 
+    if not isCancelled:
+        # save event if has rule for later parse
+        if event.rrule is None:
+            return event
+        else:
+            return "RULE"
+    return None
 
-def handle_rule_event(event, latest_date, timezone):
+
+def handle_rule_event(event, latest_date, timezone, window=None):
     try:
-        rule = _icalValueToString(event.get("RRULE"))
-        startAt = _icalValueToString(event.get("DTSTART"))
-        endAt = _icalValueToString(event.get("DTEND"))
-        exdates = _icalValueToString(event.get("EXDATE"))
-        exdates = ",".join(exdates)
+        rule = event.rrule
+        startAt = event.start_at
+        endAt = event.end_at
+        exdates = ",".join(event.exdates) if event.exdates else None
 
         start = datetime.strptime(startAt, "%Y%m%dT%H%M%S")
         end = datetime.strptime(endAt, "%Y%m%dT%H%M%S")
         gap = end - start
 
-        ruleDates = list_occurrences_next_one_months(rule, start, latest_date, exdates)
-
-        result = []
-        for ruleDate in ruleDates:
-            schedule_event = {
-                "uid": _icalValueToString(event.get("UID")),
-                "startAt": ruleDate.strftime("%Y%m%dT%H%M%S"),
-                "endAt": (ruleDate + gap).strftime("%Y%m%dT%H%M%S"),
-                "summary": _icalValueToString(event.get("SUMMARY")),
-                "timeZone": timezone,
-            }
-            result.append(schedule_event)
-        return result
+        if window:
+            # include occurrences that started before the window but overlap it
+            ruleDates = expand(
+                rule, start, window[0] - gap, window[1], exdates, timezone
+            )
+        else:
+            ruleDates = list_occurrences_next_one_months(
+                rule, start, latest_date, exdates, timezone
+            )
+
+        return occurrences(event, ruleDates, gap)
     except Exception as e:
         print("error in handle_rule_event ::: ", e)
         return None
@@ -659,37 +936,15 @@ def _firstValueInList(list: list):
 
 def _search_items_betweens(start_date: str, end_date: str, calendarID: str):
     """
+    Events of the calendar overlapping the range, read from the day bucket
+    index with one query per day instead of scanning ICalendarEvent.
 
     Args:
         start_date (str): date str formatted like `20240523T100000`
         end_date (str): date str formatted like `20240523T100000`
     """
-
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(icalendar_event_table)
-
-    input_format = "%Y%m%dT%H%M%S"
-    db_format = "%Y-%m-%dT%H:%M:%S.000Z"
-
-    # Define the date range
-    start_datetime = datetime.strptime(start_date, input_format)
-    end_datetime = datetime.strptime(end_date, input_format)
-
-    start_date_str = start_datetime.strftime(db_format)
-    end_date_str = end_datetime.strftime(db_format)
-
-    try:
-        response = table.scan(
-            FilterExpression=Attr("startDateTime").lte(end_date_str)
-            & Attr("endDateTime").gte(start_date_str)
-            & Attr("iCalendarID").eq(calendarID)
-        )
-        items = response.get("Items", [])
-        return items
-    except ClientError as e:
-        raise DynamoDBOperationError(f"Error searching items: {e}")
-    except Exception as e:
-        raise DynamoDBOperationError(f"An unexpected error occurred: {e}")
+    handler = DynamoDBHandler.for_table(icalendar_event_table)
+    return handler.search_item_betweens(start_date, end_date, "iCalendarID", calendarID)
 
 
 def convert_int(s):
@@ -0,0 +1,152 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+from dateutil import tz
+from dateutil.parser import parse as date_parse
+from dateutil.rrule import DAILY, HOURLY, MINUTELY, SECONDLY, WEEKLY, rrule, rrulestr
+
+# Rules compiled per warm container, keyed by (RRULE, DTSTART, TZID)
+COMPILED_RULES_CACHE_SIZE = 4096
+
+# Fixed-length periods a rule without COUNT can be fast-forwarded by;
+# months and years vary in length, so MONTHLY/YEARLY rules are walked.
+_PERIODS = {
+    WEEKLY: timedelta(weeks=1),
+    DAILY: timedelta(days=1),
+    HOURLY: timedelta(hours=1),
+    MINUTELY: timedelta(minutes=1),
+    SECONDLY: timedelta(seconds=1),
+}
+
+_UTC_UNTIL = re.compile(r"UNTIL=(\d{8}T\d{6})Z", re.IGNORECASE)
+
+
+def _to_local(value: datetime, tzid: Optional[str]) -> datetime:
+    """Naive wall-clock time in `tzid` of an aware datetime (UTC when unknown)."""
+    zone = tz.gettz(tzid) if tzid else None
+    return value.astimezone(zone or tz.UTC).replace(tzinfo=None)
+
+
+def _parse_timestamp(value: str, tzid: Optional[str]) -> datetime:
+    value = value.strip()
+    try:
+        # YYYYMMDDTHHMMSS[Z], sliced directly: several times faster than strptime
+        if len(value) < 15 or value[8] != "T" or value[15:] not in ("", "Z"):
+            raise ValueError(value)
+        parsed = datetime(
+            int(value[0:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[9:11]),
+            int(value[11:13]),
+            int(value[13:15]),
+            tzinfo=tz.UTC if value[15:] == "Z" else None,
+        )
+    except ValueError:
+        parsed = date_parse(value)
+    if parsed.tzinfo is not None:
+        parsed = _to_local(parsed, tzid)
+    return parsed
+
+
+@lru_cache(maxsize=COMPILED_RULES_CACHE_SIZE)
+def exdate_set(exdates: Optional[str], tzid: Optional[str] = None) -> FrozenSet[datetime]:
+    """
+    EXDATE values (comma separated) as a set of naive local datetimes, so
+    each occurrence is excluded with one hash lookup. UTC values are
+    converted to `tzid` to compare with the floating DTSTART times.
+    """
+    if not exdates:
+        return frozenset()
+    return frozenset(
+        _parse_timestamp(value, tzid) for value in exdates.split(",") if value.strip()
+    )
+
+
+class CompiledRule:
+    """A parsed RRULE with what `expand` needs to skip its history."""
+
+    __slots__ = ("rule", "period", "until")
+
+    def __init__(self, rule, period: Optional[timedelta], until: Optional[datetime]):
+        self.rule = rule
+        self.period = period
+        self.until = until
+
+
+@lru_cache(maxsize=COMPILED_RULES_CACHE_SIZE)
+def compile_rule(
+    rrule_string: str, dtstart: datetime, tzid: Optional[str] = None
+) -> CompiledRule:
+    """
+    Parse `rrule_string` once per (rule, DTSTART, TZID). A UTC UNTIL is
+    rewritten to `tzid` wall-clock time, since dateutil rejects an aware
+    UNTIL on a floating DTSTART.
+    """
+    if dtstart.tzinfo is None:
+        rrule_string = _UTC_UNTIL.sub(
+            lambda match: "UNTIL="
+            + _parse_timestamp(match.group(1) + "Z", tzid).strftime("%Y%m%dT%H%M%S"),
+            rrule_string,
+        )
+    rule = rrulestr(rrule_string, dtstart=dtstart)
+
+    if not isinstance(rule, rrule):
+        # several RRULEs in one string come back as an rruleset
+        return CompiledRule(rule, None, None)
+
+    period = None
+    # BYSETPOS picks from each period's set, which dateutil builds for the
+    # first period from DTSTART on: restarting at a later DTSTART can pick
+    # an occurrence the original rule never reaches, so those are walked.
+    if rule._freq in _PERIODS and rule._count is None and not rule._bysetpos:
+        period = _PERIODS[rule._freq] * rule._interval
+    return CompiledRule(rule, period, rule._until)
+
+
+def expand(
+    rrule_string: str,
+    dtstart: datetime,
+    window_start: datetime,
+    window_end: datetime,
+    exdates: Optional[str] = None,
+    tzid: Optional[str] = None,
+) -> List[datetime]:
+    """
+    Occurrences of the rule between `window_start` and `window_end`
+    (inclusive), capped by UNTIL and without EXDATEs.
+
+    Rules with a fixed period and no COUNT or BYSETPOS start from the
+    last period boundary before the window instead of DTSTART: a rule
+    restarted a whole number of periods later yields the same occurrences
+    from there.
+
+    ```
+    # Example usage:
+    expand(
+        "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,SU",
+        datetime(2023, 12, 4),
+        datetime.now(),
+        datetime.now() + timedelta(days=30),
+        "20240624T000000,20240729T000000",
+        "Europe/Paris",
+    )
+    ```
+    """
+    compiled = compile_rule(rrule_string, dtstart, tzid)
+    if compiled.until:
+        window_end = min(window_end, compiled.until)
+    if window_end < window_start:
+        return []
+
+    rule = compiled.rule
+    if compiled.period and window_start - dtstart > compiled.period:
+        skipped = (window_start - dtstart) // compiled.period
+        rule = rule.replace(dtstart=dtstart + compiled.period * skipped)
+
+    excluded = exdate_set(exdates, tzid)
+    return [
+        dt for dt in rule.between(window_start, window_end, inc=True) if dt not in excluded
+    ]
+
@@ -0,0 +1,89 @@
+import sys
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+# Feed timestamp: wall-clock seconds since the epoch when it was a plain
+# YYYYMMDDTHHMMSS, else the original string (dates, UTC values) kept as is.
+Timestamp = Union[int, str, None]
+
+
+class Occurrence(NamedTuple):
+    """
+    One event or occurrence of a recurring event in a parsed schedule.
+    Occurrences of the same VEVENT share its (interned) uid and summary
+    strings; the time zone is the calendar's and isn't repeated. `as_event`
+    gives the JSON shape the API returns.
+    """
+
+    uid: Optional[str]
+    summary: Optional[str]
+    start: Timestamp
+    end: Timestamp
+
+    def as_event(self, timezone: Optional[str]) -> Dict[str, Any]:
+        return {
+            "uid": self.uid,
+            "startAt": format_timestamp(self.start),
+            "endAt": format_timestamp(self.end),
+            "summary": self.summary,
+            "timeZone": timezone,
+        }
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def epoch_seconds(value: datetime) -> int:
+    """Seconds since the epoch of a naive wall-clock datetime."""
+    return (value - _EPOCH) // _SECOND
+
+
+def parse_timestamp(value: Optional[str]) -> Timestamp:
+    if value is None or len(value) != 15 or value[8] != "T":
+        return value
+    try:
+        return epoch_seconds(
+            datetime(
+                int(value[0:4]),
+                int(value[4:6]),
+                int(value[6:8]),
+                int(value[9:11]),
+                int(value[11:13]),
+                int(value[13:15]),
+            )
+        )
+    except ValueError:
+        return value
+
+
+@lru_cache(maxsize=16384)
+def _format_seconds(value: int) -> str:
+    return (_EPOCH + timedelta(seconds=value)).strftime("%Y%m%dT%H%M%S")
+
+
+def format_timestamp(value: Timestamp) -> Optional[str]:
+    if isinstance(value, int):
+        # occurrences of a schedule share few distinct start/end times
+        return _format_seconds(value)
+    return value
+
+
+def occurrence(event, start: Timestamp, end: Timestamp) -> Occurrence:
+    """Record of `event` (an ICSEvent) at `start`/`end`."""
+    return Occurrence(_intern(event.uid), _intern(event.summary), start, end)
+
+
+def occurrences(event, starts: Iterable[datetime], duration: timedelta) -> List[Occurrence]:
+    """Records of `event` (an ICSEvent) starting at each of `starts`."""
+    uid = _intern(event.uid)
+    summary = _intern(event.summary)
+    seconds = duration // _SECOND
+    return [
+        Occurrence(uid, summary, start, start + seconds)
+        for start in map(epoch_seconds, starts)
+    ]
@@ -0,0 +1,103 @@
+import json
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+# Layout of the stored payload; snapshots of another format are ignored
+# (and rebuilt) instead of being misread after a deploy.
+SNAPSHOT_FORMAT = 1
+
+# A snapshot younger than this is served as is; an older one is still
+# served, but a refresh is requested in the background.
+SNAPSHOT_FRESH_SECONDS = int(os.environ.get("SCHEDULE_SNAPSHOT_FRESH_SECONDS", 900))
+
+# Past this age a snapshot is not served at all and the request falls back
+# to downloading the feed itself.
+SNAPSHOT_MAX_STALE_SECONDS = int(
+    os.environ.get("SCHEDULE_SNAPSHOT_MAX_STALE_SECONDS", 6 * 3600)
+)
+
+# DynamoDB rejects items over 400 KB and the snapshot shares the ExtraEvent
+# item with its other attributes, so a larger payload is not stored.
+SNAPSHOT_MAX_BYTES = int(os.environ.get("SCHEDULE_SNAPSHOT_MAX_BYTES", 350 * 1024))
+
+# ExtraEvent attributes holding the snapshot of the employee's schedule
+SNAPSHOT_ATTRIBUTE = "scheduleSnapshot"
+VERSION_ATTRIBUTE = "scheduleVersion"
+
+_EVENT_FIELDS = ("uid", "startAt", "endAt", "summary", "timeZone")
+_SHARED_FIELDS = ("uid", "summary", "timeZone")
+
+
+def encode_snapshot(schedule: Dict[str, Any], version: int) -> bytes:
+    """
+    Compact form of a schedule: occurrences of a recurring event repeat its
+    uid, summary and time zone, so those strings are stored once in a table
+    and events refer to them by index. The JSON is then zlib-compressed.
+
+    ```
+    # Example usage:
+    version = int(time.time() * 1000)
+    payload = encode_snapshot(schedule, version)
+    ```
+    """
+    strings = []
+    positions = {}
+
+    def ref(value):
+        if value not in positions:
+            positions[value] = len(strings)
+            strings.append(value)
+        return positions[value]
+
+    events = [
+        [
+            ref(event.get(field)) if field in _SHARED_FIELDS else event.get(field)
+            for field in _EVENT_FIELDS
+        ]
+        for event in schedule.get("events", [])
+    ]
+    body = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "type": schedule.get("type"),
+        "calendar": schedule.get("calendar"),
+        "strings": strings,
+        "events": events,
+    }
+    return zlib.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_snapshot(payload) -> Optional[Tuple[Dict[str, Any], int]]:
+    """
+    `(schedule, version)` of a payload written by `encode_snapshot`, or None
+    when it is missing, corrupt or of another format.
+    """
+    if payload is None:
+        return None
+    # boto3 returns binary attributes wrapped in a Binary
+    payload = getattr(payload, "value", payload)
+    try:
+        body = json.loads(zlib.decompress(bytes(payload)))
+    except (TypeError, ValueError, zlib.error) as e:
+        print("decode_snapshot error ::: ", e)
+        return None
+    if not isinstance(body, dict) or body.get("format") != SNAPSHOT_FORMAT:
+        return None
+
+    strings = body["strings"]
+    events = []
+    for values in body["events"]:
+        event = {}
+        for field, value in zip(_EVENT_FIELDS, values):
+            event[field] = strings[value] if field in _SHARED_FIELDS else value
+        events.append(event)
+    schedule = {"type": body["type"], "calendar": body["calendar"], "events": events}
+    return schedule, body["version"]
+
+
+def snapshot_age(version: int, now: Optional[float] = None) -> float:
+    """Seconds since the snapshot of `version` (milliseconds since epoch) was built."""
+    now = time.time() if now is None else now
+    return now - version / 1000
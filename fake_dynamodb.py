@@ -0,0 +1,195 @@
+"""
+In-memory stand-ins for a boto3 DynamoDB resource and its Tables, shared by
+the benchmarks and the tests so they run without AWS credentials.
+
+Only the request shapes `db.DynamoDBHandler` and the modules built on it
+send are understood: equality conditions named `#attr = :attr`, the
+`#pk = :pk AND #sk BETWEEN :start AND :end` range of `iter_range`, SET
+assignments, `attribute_not_exists` puts and `#version` conditions. Every
+request is recorded in `requests` as `(operation, table_name)`.
+
+```
+# Example usage:
+resource = FakeResource()
+resource.Table("User-local").rows["1"] = {"id": "1", "email": "a@b.c"}
+handler = db.DynamoDBHandler("User-local", resource=resource)
+```
+"""
+import re
+import threading
+import time
+import zlib
+from botocore.exceptions import ClientError
+
+# `name = :value` or `name = if_not_exists(name, :value)` of a SET expression
+ASSIGNMENT = re.compile(r"(#?\w+) = (?:if_not_exists\(#?\w+, (:\w+)\)|(:\w+))")
+
+
+def client_error(code: str, operation: str, message: str = "") -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+class FakeTable:
+    """
+    Rows of one table keyed by `id`. `page_size` caps the items of a
+    query/scan page and `latency` is slept on every request, to stand in
+    for DynamoDB round trips. Setting `error_code` makes every request
+    fail with that ClientError code, e.g. "ResourceNotFoundException".
+    """
+
+    def __init__(self, name="fake", items=(), page_size=None, latency=0.0, requests=None):
+        self.name = name
+        self.rows = {item["id"]: dict(item) for item in items}
+        self.page_size = page_size
+        self.latency = latency
+        self.error_code = None
+        self.requests = requests if requests is not None else []
+        self.lock = threading.Lock()
+        self._segments = {}
+
+    def _request(self, operation: str):
+        with self.lock:
+            self.requests.append((operation, self.name))
+            if operation not in ("Query", "Scan", "GetItem", "BatchGetItem"):
+                self._segments.clear()
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_code:
+            raise client_error(self.error_code, operation, f"{self.error_code} on {self.name}")
+
+    @staticmethod
+    def _project(row, kwargs):
+        projection = kwargs.get("ProjectionExpression")
+        if not projection:
+            return dict(row)
+        names = kwargs.get("ExpressionAttributeNames", {})
+        attributes = [names.get(name.strip(), name.strip()) for name in projection.split(",")]
+        return {attr: row[attr] for attr in attributes if attr in row}
+
+    @staticmethod
+    def _matches(row, kwargs):
+        names = kwargs.get("ExpressionAttributeNames", {})
+        values = kwargs.get("ExpressionAttributeValues", {})
+        if ":pk" in values:
+            # iter_range: #pk = :pk AND #sk BETWEEN :start AND :end
+            sort_value = row.get(names["#sk"]) or ""
+            return (
+                row.get(names["#pk"]) == values[":pk"]
+                and values[":start"] <= sort_value <= values[":end"]
+            )
+        return all(
+            row.get(names.get(f"#{name[1:]}", name[1:])) == value for name, value in values.items()
+        )
+
+    def _candidates(self, kwargs):
+        if "TotalSegments" not in kwargs:
+            return list(self.rows.values())
+        total_segments = kwargs["TotalSegments"]
+        if total_segments not in self._segments:
+            buckets = [[] for _ in range(total_segments)]
+            for row in self.rows.values():
+                buckets[zlib.crc32(row["id"].encode()) % total_segments].append(row)
+            self._segments[total_segments] = buckets
+        return self._segments[total_segments][kwargs["Segment"]]
+
+    def _read(self, operation, kwargs):
+        self._request(operation)
+        with self.lock:
+            candidates = self._candidates(kwargs)
+            if "KeyConditionExpression" in kwargs and ":pk" in kwargs.get("ExpressionAttributeValues", {}):
+                sort_key = kwargs["ExpressionAttributeNames"]["#sk"]
+                candidates = sorted(candidates, key=lambda row: row.get(sort_key) or "")
+            limits = [limit for limit in (kwargs.get("Limit"), self.page_size) if limit]
+            start = kwargs.get("ExclusiveStartKey", {}).get("position", 0)
+            end = start + min(limits) if limits else len(candidates)
+            page = candidates[start:end]
+            items = [self._project(row, kwargs) for row in page if self._matches(row, kwargs)]
+        response = {"Items": items, "Count": len(items), "ScannedCount": len(page)}
+        if end < len(candidates):
+            response["LastEvaluatedKey"] = {"position": end}
+        return response
+
+    def query(self, **kwargs):
+        return self._read("Query", kwargs)
+
+    def scan(self, **kwargs):
+        return self._read("Scan", kwargs)
+
+    def get_item(self, Key, **kwargs):
+        self._request("GetItem")
+        with self.lock:
+            row = self.rows.get(Key["id"])
+        return {"Item": self._project(row, kwargs)} if row else {}
+
+    def put_item(self, Item, **kwargs):
+        self._request("PutItem")
+        with self.lock:
+            if kwargs.get("ConditionExpression") and Item["id"] in self.rows:
+                raise client_error("ConditionalCheckFailedException", "PutItem")
+            self.rows[Item["id"]] = dict(Item)
+        return {}
+
+    def update_item(self, Key, UpdateExpression, **kwargs):
+        self._request("UpdateItem")
+        names = kwargs.get("ExpressionAttributeNames", {})
+        values = kwargs.get("ExpressionAttributeValues", {})
+        with self.lock:
+            row = dict(self.rows.get(Key["id"]) or Key)
+            if kwargs.get("ConditionExpression") and "#version" in names:
+                stored = row.get(names["#version"])
+                if stored is not None and stored >= values[":version"]:
+                    raise client_error("ConditionalCheckFailedException", "UpdateItem")
+            for name, default, value in ASSIGNMENT.findall(UpdateExpression):
+                name = names.get(name, name)
+                if default and name in row:
+                    continue
+                row[name] = values[default or value]
+            self.rows[Key["id"]] = row
+        return {"Attributes": {}}
+
+    def delete_item(self, Key, **kwargs):
+        self._request("DeleteItem")
+        with self.lock:
+            self.rows.pop(Key["id"], None)
+        return {}
+
+
+class FakeResource:
+    """Tables by name, created empty on first use, plus the batch operations of the resource."""
+
+    def __init__(self, tables=None, **table_options):
+        self.requests = []
+        self.table_options = table_options
+        self.tables = {}
+        for name, table in (tables or {}).items():
+            table.name = name
+            table.requests = self.requests
+            self.tables[name] = table
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name, requests=self.requests, **self.table_options)
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            table._request("BatchGetItem")
+            with table.lock:
+                rows = [table.rows.get(key["id"]) for key in request["Keys"]]
+            responses[name] = [table._project(row, request) for row in rows if row]
+        return {"Responses": responses}
+
+    def batch_write_item(self, RequestItems):
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            table._request("BatchWriteItem")
+            with table.lock:
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        table.rows[item["id"]] = dict(item)
+                    else:
+                        table.rows.pop(request["DeleteRequest"]["Key"]["id"], None)
+        return {}
@@ -0,0 +1,145 @@
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+from db import DynamoDBOperationError
+from notification_outbox import NotificationOutbox
+from notification_sender.send_notification import OneSignalNotificationSender
+from onesignal_sdk.error import OneSignalHTTPError
+from recipient_index import RecipientIndex
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TABLE_NAME_SUFFIX = "-2iph2dahajadpnro5xkxcbveoq-staging"
+
+# time left to the Lambda when the drain stops claiming new batches
+DRAIN_STOP_MARGIN_SECONDS = 10
+
+# Rows due this soon after a batch is claimed are sent with it: the delay
+# extraEventStatus gives status notifications, so a drain sends every row
+# queued before it ran once the first of them is due.
+COALESCE_HORIZON_MILLIS = int(os.environ.get("NOTIFICATION_COALESCE_WINDOW_MILLIS", 3000))
+
+outbox = NotificationOutbox(TABLE_NAME_SUFFIX)
+recipient_index = RecipientIndex(TABLE_NAME_SUFFIX)
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Sends the push notifications queued in the NotificationOutbox table.
+    Triggered by the table's stream as rows are inserted, and on a schedule
+    to pick up the retries; the records themselves are not read, every
+    invocation drains whatever is due.
+
+    The drain's own claims and marks are MODIFY records of the same stream,
+    so the trigger's event source mapping filters on inserts:
+    `{"Filters": [{"Pattern": "{\"eventName\": [\"INSERT\"]}"}]}`.
+    A batch without any INSERT (a mapping without the filter) is ignored.
+
+    Notifications are coalesced without sleeping here: rows are queued with
+    `availableAt` a window ahead and are not claimed before the earliest is
+    due, then with every row due within `COALESCE_HORIZON_MILLIS`. The
+    mapping's `MaximumBatchingWindowInSeconds` must be at least that
+    window, so the row of a batch's first record is due when it runs.
+    """
+    records = event.get("Records") or []
+    if records and not any(record.get("eventName") == "INSERT" for record in records):
+        return {"sent": 0, "retried": 0, "failed": 0}
+
+    deadline = None
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        deadline = (
+            time.monotonic()
+            + context.get_remaining_time_in_millis() / 1000
+            - DRAIN_STOP_MARGIN_SECONDS
+        )
+
+    try:
+        counts = _drain(deadline, context)
+    except DynamoDBOperationError as e:
+        # raising makes the stream retry the batch
+        logger.error(f"Error draining the notification outbox: {str(e)}")
+        raise
+    logger.info(f"Drained notification outbox: {counts}")
+    return counts
+
+
+def _drain(deadline: Optional[float], context: Any = None) -> Dict[str, int]:
+    return outbox.drain(
+        lambda notifications: _send_batch(notifications, context),
+        is_permanent=_is_permanent,
+        deadline=deadline,
+        horizon_millis=COALESCE_HORIZON_MILLIS,
+    )
+
+
+def _send_batch(notifications: List[Dict[str, Any]], context: Any = None) -> List[Any]:
+    """
+    Send the queued notifications concurrently, one request per group of
+    notifications with the same recipients and `coalesceKey`. `toOwners`
+    notifications go to the subscribed owners and managers, resolved now
+    rather than when the notification was queued, plus any `externalIds`.
+    """
+    results = [None] * len(notifications)
+    groups = {}
+    owner_emails = None
+    for position, notification in enumerate(notifications):
+        external_ids = list(notification.get("externalIds") or [])
+        if notification.get("toOwners"):
+            if owner_emails is None:
+                owner_emails = recipient_index.recipients()
+            external_ids = owner_emails + [
+                external_id for external_id in external_ids if external_id not in owner_emails
+            ]
+        if not external_ids:
+            # nobody to notify counts as delivered
+            continue
+        coalesce_key = notification.get("coalesceKey") or f"#{position}"
+        group_key = (tuple(sorted(external_ids)), coalesce_key)
+        groups.setdefault(group_key, (external_ids, []))[1].append(position)
+
+    bodies = [
+        _group_notification([notifications[position] for position in positions], external_ids)
+        for external_ids, positions in groups.values()
+    ]
+    sender = OneSignalNotificationSender.shared()
+    sent = sender.send_many(bodies, context=context)
+    for (_, positions), result in zip(groups.values(), sent):
+        for position in positions:
+            results[position] = result
+    return results
+
+
+def _group_notification(
+    notifications: List[Dict[str, Any]], external_ids: List[str]
+) -> Dict[str, Any]:
+    """
+    One OneSignal notification for a group: the notification itself when
+    it is about a single event, else its `groupMessage` with the count of
+    distinct events (a notification queued twice for one event counts once).
+    """
+    event_keys = {
+        notification.get("eventKey") or id(notification) for notification in notifications
+    }
+    latest = notifications[-1]
+    if len(event_keys) == 1 or not latest.get("groupMessage"):
+        message = latest["message"]
+        fr_message = latest.get("frMessage")
+    else:
+        message = latest["groupMessage"].format(count=len(event_keys))
+        fr_message = (latest.get("groupFrMessage") or latest["groupMessage"]).format(
+            count=len(event_keys)
+        )
+    return OneSignalNotificationSender.external_ids_notification(
+        external_ids, message, fr_message
+    )
+
+
+def _is_permanent(error: Exception) -> bool:
+    # a rejected notification stays rejected; rate limits and 5xx are retried
+    return (
+        isinstance(error, OneSignalHTTPError)
+        and 400 <= error.status_code < 500
+        and error.status_code != 429
+    )
@@ -0,0 +1,33 @@
+import logging
+from typing import Any, Dict
+from db import DynamoDBOperationError
+from recipient_index import RecipientIndex
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TABLE_NAME_SUFFIX = "-2iph2dahajadpnro5xkxcbveoq-staging"
+
+recipient_index = RecipientIndex(TABLE_NAME_SUFFIX)
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    DynamoDB stream consumer of the Employee, User and DeviceInfo tables:
+    rebuilds the NotificationRecipient rows of the stores a batch of writes
+    touched. Invoked without records (e.g. on a schedule), rebuilds them all.
+    """
+    records = event.get("Records") or []
+    try:
+        if records:
+            store_ids = recipient_index.apply_stream_records(records)
+            logger.info(f"Rebuilt recipients of {len(store_ids)} stores from {len(records)} records")
+            return {"stores": len(store_ids)}
+
+        emails = recipient_index.rebuild_all()
+        logger.info(f"Rebuilt recipients of every store: {len(emails)} emails")
+        return {"emails": len(emails)}
+    except DynamoDBOperationError as e:
+        # raising makes the stream retry the batch
+        logger.error(f"Error rebuilding recipients: {str(e)}")
+        raise
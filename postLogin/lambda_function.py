@@ -20,7 +20,7 @@ def lambda_handler(event, context):
         ]  # Cognito user ID (sub)
         email = event["request"]["userAttributes"]["email"]  # Cognito user email
 
-        handler = DynamoDBHandler("ReferCode-2iph2dahajadpnro5xkxcbveoq-staging")
+        handler = DynamoDBHandler.for_table("ReferCode-2iph2dahajadpnro5xkxcbveoq-staging")
         try:
             # search refer code by email, get the first item if it exists
             refer_codes = handler.search_items({"email": email.lower()})
@@ -64,53 +64,36 @@ def _create_user_details(
     auth_user_id: str, user_email: str, firstName: str = None, refer_code: str = None
 ):
     table = "User-2iph2dahajadpnro5xkxcbveoq-staging"
-    handler = DynamoDBHandler(table)
-
-    existing_id = _checkExistingID(handler, {"authUserID": auth_user_id})
-    if existing_id:
-        return existing_id
+    handler = DynamoDBHandler.for_table(table)
 
     user = {
-        "authUserID": auth_user_id,
         "email": user_email,
         "firstName": firstName,
         "referCode": refer_code,
     }
 
     try:
-        return handler.save_item(user)
+        return handler.upsert({"authUserID": auth_user_id}, user, overwrite=False)
     except DynamoDBOperationError as e:
         print("DynamoDB Save Error on create_user_details: ")
         print(e)
         return None
 
 
-def _checkExistingID(handler: DynamoDBHandler, search_dict):
-    existing = handler.search_items(search_dict)
-    existing = existing[0] if existing else None
-    if existing and "id" in existing.keys():
-        return existing["id"]
-    return None
-
-
 def _create_employee(store_id: str, user_id: str):
     table = "Employee-2iph2dahajadpnro5xkxcbveoq-staging"
-    handler = DynamoDBHandler(table)
-
-    existing_id = _checkExistingID(handler, {"storeID": store_id, "userID": user_id})
-    if existing_id:
-        return existing_id
+    handler = DynamoDBHandler.for_table(table)
 
     employee = {
-        "userID": user_id,
-        "storeID": store_id,
         "role": "EMPLOYEE",
         "isResigned": False,
         "isPrimaryStore": True,
     }
 
     try:
-        return handler.save_item(employee)
+        return handler.upsert(
+            {"storeID": store_id, "userID": user_id}, employee, overwrite=False
+        )
     except DynamoDBOperationError as e:
         print("DynamoDB Save Error on create_employee: ")
         print(e)
@@ -119,24 +102,20 @@ def _create_employee(store_id: str, user_id: str):
 
 def _create_extra_event(employee_id: str, ical_link: str):
     table = "ExtraEvent-2iph2dahajadpnro5xkxcbveoq-staging"
-    handler = DynamoDBHandler(table)
+    handler = DynamoDBHandler.for_table(table)
     date = datetime.now()
 
-    existing_id = _checkExistingID(
-        handler, {"employeeID": employee_id, "downloadableURL": ical_link}
-    )
-    if existing_id:
-        return existing_id
-
     item = {
-        "employeeID": employee_id,
         "extraBookingService": "PLANITY",
-        "downloadableURL": ical_link,
         "extraDataType": "ICS",
         "lastUpdatedAt": date.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
     }
     try:
-        return handler.save_item(item)
+        return handler.upsert(
+            {"employeeID": employee_id, "downloadableURL": ical_link},
+            item,
+            overwrite=False,
+        )
     except DynamoDBOperationError as e:
         print("DynamoDB Save Error on create_extra_event: ")
         print(e)
@@ -0,0 +1,37 @@
+"""
+Puts the Lambda layers, the extraEvents sources and the shared fakes on the
+import path, the way the Lambda runtime mounts them, so the tests import
+them by module name:
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-3")
+for path in (
+    ROOT,
+    "extraEvents",
+    "Layers/sns_push/python",
+    "Layers/one_signal/python",
+    "Layers/icalendar/python",
+    "Layers/db/python",
+):
+    sys.path.insert(0, os.path.join(ROOT, path))
+
+import db  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_db():
+    """Forget the shared handlers, unavailable indexes and cached reads of earlier tests."""
+    db._shared_handlers.clear()
+    db._unavailable_indexes.clear()
+    db.read_cache.clear()
+    yield
+    db._shared_handlers.clear()
+    db._unavailable_indexes.clear()
+    db.read_cache.clear()
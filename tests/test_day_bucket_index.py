@@ -0,0 +1,71 @@
+import db
+from fake_dynamodb import FakeResource
+
+EVENT_TABLE = "ICalendarEvent-test"
+DAY_TABLE = "ICalendarEventDay-test"
+
+
+def calendar(*events):
+    """ICalendarEvent handler whose rows are also written to the day bucket index."""
+    resource = FakeResource()
+    handler = db.DynamoDBHandler(EVENT_TABLE, resource=resource)
+    db._shared_handlers[DAY_TABLE] = db.DynamoDBHandler(DAY_TABLE, resource=resource)
+    index = db.DayBucketIndex.for_table(EVENT_TABLE)
+    with handler.batch_writer() as writer, index.handler.batch_writer() as index_writer:
+        for event in events:
+            writer.put_item(event, event["id"])
+            index.put(event, index_writer)
+    del resource.requests[:]
+    return handler, resource
+
+
+def event(id, start, end, calendar_id="calendar-1"):
+    return {"id": id, "iCalendarID": calendar_id, "startDateTime": start, "endDateTime": end}
+
+
+def ids(items):
+    return [item["id"] for item in items]
+
+
+def test_window_reads_find_events_overlapping_it():
+    handler, resource = calendar(
+        event("morning", "2024-05-23T09:00:00.000Z", "2024-05-23T10:00:00.000Z"),
+        event("overnight", "2024-05-22T22:00:00.000Z", "2024-05-23T02:00:00.000Z"),
+        event("holiday", "2024-04-01T00:00:00.000Z", "2024-06-30T00:00:00.000Z"),
+        event("other-day", "2024-05-25T09:00:00.000Z", "2024-05-25T10:00:00.000Z"),
+        event("other-calendar", "2024-05-23T09:00:00.000Z", "2024-05-23T10:00:00.000Z", "calendar-2"),
+    )
+
+    items = handler.search_item_betweens("20240523T000000", "20240523T235959", "iCalendarID", "calendar-1")
+
+    assert ids(items) == ["holiday", "overnight", "morning"]
+    assert items[2]["endDateTime"] == "2024-05-23T10:00:00.000Z"
+    assert {table for _, table in resource.requests} == {DAY_TABLE}
+
+
+def test_an_empty_window_does_not_read_the_calendar():
+    handler, resource = calendar(
+        event("morning", "2024-05-23T09:00:00.000Z", "2024-05-23T10:00:00.000Z"),
+    )
+
+    items = handler.search_item_betweens("20240601T000000", "20240607T235959", "iCalendarID", "calendar-1")
+
+    assert items == []
+    # one query per day of the window plus the spanning bucket, none on the events
+    assert resource.requests == [("Query", DAY_TABLE)] * 8
+
+
+def test_a_missing_index_table_falls_back_to_the_calendar():
+    handler, resource = calendar(
+        event("morning", "2024-05-23T09:00:00.000Z", "2024-05-23T10:00:00.000Z"),
+        event("other-day", "2024-05-25T09:00:00.000Z", "2024-05-25T10:00:00.000Z"),
+    )
+    resource.tables[DAY_TABLE].error_code = "ResourceNotFoundException"
+
+    items = handler.search_item_betweens("20240523T000000", "20240523T235959", "iCalendarID", "calendar-1")
+
+    assert ids(items) == ["morning"]
+    assert (DAY_TABLE, "byDayBucket") in db._unavailable_indexes
+    del resource.requests[:]
+    handler.search_item_betweens("20240601T000000", "20240601T235959", "iCalendarID", "calendar-1")
+    assert {table for _, table in resource.requests} == {EVENT_TABLE}
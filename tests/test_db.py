@@ -0,0 +1,152 @@
+import pytest
+import db
+from fake_dynamodb import FakeResource, FakeTable
+
+EMPLOYEE_TABLE = "Employee-test"
+STATUS_TABLE = "ICalendarEventStatus-test"
+
+
+def employee_handler(count=200, page_size=7):
+    items = [
+        {"id": f"employee-{index}", "storeID": f"store-{index % 5}", "isResigned": index % 4 == 0}
+        for index in range(count)
+    ]
+    resource = FakeResource({EMPLOYEE_TABLE: FakeTable(items=items, page_size=page_size)})
+    return db.DynamoDBHandler(EMPLOYEE_TABLE, resource=resource), resource
+
+
+def test_parallel_scan_returns_every_matching_item_once():
+    handler, resource = employee_handler()
+
+    items = list(handler.parallel_scan({"isResigned": True}, segments=4))
+
+    assert sorted(item["id"] for item in items) == sorted(
+        f"employee-{index}" for index in range(0, 200, 4)
+    )
+    assert handler.last_scan_stats.scanned_count == 200
+    assert {operation for operation, _ in resource.requests} == {"Scan"}
+
+
+def test_parallel_scan_matches_iter_items():
+    handler, _ = employee_handler()
+
+    scanned = sorted(item["id"] for item in handler.parallel_scan({"isResigned": False}, segments=3))
+    iterated = sorted(item["id"] for item in handler.iter_items({"isResigned": False}))
+
+    assert scanned == iterated
+
+
+def test_parallel_scan_stops_when_the_caller_stops():
+    handler, resource = employee_handler(count=1000, page_size=10)
+
+    first = next(handler.parallel_scan(segments=2))
+
+    assert first["id"].startswith("employee-")
+    # at most a couple of buffered pages per segment, not the 100 of the table
+    assert len(resource.requests) < 20
+
+
+def test_parallel_scan_surfaces_segment_errors():
+    handler, resource = employee_handler()
+    resource.tables[EMPLOYEE_TABLE].error_code = "ProvisionedThroughputExceededException"
+
+    try:
+        list(handler.parallel_scan(segments=2))
+    except db.DynamoDBOperationError as e:
+        assert "ProvisionedThroughputExceededException" in str(e)
+    else:
+        raise AssertionError("parallel_scan swallowed the segment error")
+
+
+def test_upsert_writes_one_row_per_natural_key():
+    resource = FakeResource()
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+    natural_key = {"uid": "event-1", "startAt": "20240523T100000"}
+
+    first = handler.upsert(natural_key, {"status": "COMPLETE"}, legacy_lookup=False)
+    second = handler.upsert(natural_key, {"status": "CANCEL"}, legacy_lookup=False)
+
+    rows = resource.tables[STATUS_TABLE].rows
+    assert first == second == handler.natural_id(natural_key)
+    assert list(rows) == [first]
+    assert rows[first]["status"] == "CANCEL"
+    assert rows[first]["uid"] == "event-1"
+    assert {operation for operation, _ in resource.requests} == {"UpdateItem"}
+
+
+def test_upsert_without_overwrite_keeps_the_existing_row():
+    resource = FakeResource()
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+    natural_key = {"uid": "event-1", "startAt": "20240523T100000"}
+
+    handler.upsert(natural_key, {"status": "COMPLETE"}, overwrite=False, legacy_lookup=False)
+    handler.upsert(natural_key, {"status": "CANCEL"}, overwrite=False, legacy_lookup=False)
+
+    (row,) = resource.tables[STATUS_TABLE].rows.values()
+    assert row["status"] == "COMPLETE"
+
+
+def test_resolve_id_finds_a_legacy_row_through_its_index():
+    legacy = {"id": "legacy-uuid4", "uid": "event-1", "startAt": "20240523T100000"}
+    resource = FakeResource({STATUS_TABLE: FakeTable(items=[legacy])})
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+
+    resolved = handler.resolve_id({"uid": "event-1", "startAt": "20240523T100000"}, legacy_lookup=True)
+
+    assert resolved == "legacy-uuid4"
+    assert resource.requests == [("Query", STATUS_TABLE)]
+
+
+def test_resolve_id_without_legacy_lookup_reads_nothing():
+    resource = FakeResource()
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+    natural_key = {"uid": "event-1", "startAt": "20240523T100000"}
+
+    assert handler.resolve_id(natural_key, legacy_lookup=False) == handler.natural_id(natural_key)
+    assert resource.requests == []
+
+
+def test_upsert_is_a_single_write_by_default():
+    resource = FakeResource()
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+
+    assert db.UPSERT_LEGACY_LOOKUP is False
+    handler.upsert({"uid": "event-1", "startAt": "20240523T100000"}, {"status": "COMPLETE"})
+
+    assert resource.requests == [("UpdateItem", STATUS_TABLE)]
+
+
+def test_legacy_lookup_without_an_index_raises_instead_of_scanning():
+    resource = FakeResource()
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+
+    with pytest.raises(db.DynamoDBOperationError, match="No index"):
+        handler.resolve_id({"status": "COMPLETE"}, legacy_lookup=True)
+    assert resource.requests == []
+
+
+def test_legacy_lookup_on_a_missing_index_raises_instead_of_scanning():
+    resource = FakeResource()
+    resource.Table(STATUS_TABLE).error_code = "ValidationException"
+    handler = db.DynamoDBHandler(STATUS_TABLE, resource=resource)
+
+    with pytest.raises(db.DynamoDBOperationError):
+        handler.upsert(
+            {"uid": "event-1", "startAt": "20240523T100000"}, {"status": "COMPLETE"}, legacy_lookup=True
+        )
+    assert resource.requests == [("Query", STATUS_TABLE)]
+
+
+def test_a_write_invalidates_every_cached_projection_of_the_key():
+    resource = FakeResource({"User-test": FakeTable(items=[{"id": "1", "firstName": "Ann", "email": "a@x"}])})
+    handler = db.DynamoDBHandler("User-test", resource=resource)
+    assert handler.get_item({"id": "1"}, attributes=["firstName"]) == {"firstName": "Ann"}
+    assert handler.get_items(["1"], attributes=["email"]) == {"1": {"id": "1", "email": "a@x"}}
+    assert handler.get_item({"id": "1"}, attributes=["firstName"]) == {"firstName": "Ann"}
+    reads = len(resource.requests)
+
+    handler.update_item({"id": "1"}, {"firstName": "Bea"})
+
+    assert handler.get_item({"id": "1"}, attributes=["firstName"]) == {"firstName": "Bea"}
+    assert handler.get_items(["1"], attributes=["email"]) == {"1": {"id": "1", "email": "a@x"}}
+    assert len(resource.requests) == reads + 3
@@ -0,0 +1,133 @@
+import hashlib
+import pytest
+import db
+import lambda_function
+from fake_dynamodb import FakeResource
+from feed_cache import FeedCache, FeedEntry
+from feed_fetcher import FetchTimings
+from schedule_snapshot import SNAPSHOT_ATTRIBUTE, VERSION_ATTRIBUTE
+
+URL = "https://feeds.example/salon.ics"
+EVENT = (
+    "BEGIN:VEVENT\r\n"
+    "UID:event-{0}\r\n"
+    "DTSTART:20240523T{0:02d}0000\r\n"
+    "DTEND:20240523T{0:02d}3000\r\n"
+    "SUMMARY:Coupe\r\n"
+    "END:VEVENT\r\n"
+)
+FEED = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    + "".join(EVENT.format(hour) for hour in range(8, 18))
+    + "END:VCALENDAR\r\n"
+).encode("utf-8")
+
+
+class StreamedResponse:
+    """A 200 whose body is handed out in small chunks, counting those read."""
+
+    status = 200
+    headers = {}
+
+    def __init__(self, body, chunk_size=64):
+        self.chunks = [body[offset : offset + chunk_size] for offset in range(0, len(body), chunk_size)]
+        self.read = 0
+
+    def stream(self, chunk_size, decode_content=True):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+
+@pytest.fixture
+def response(monkeypatch):
+    response = StreamedResponse(FEED)
+    monkeypatch.setattr(lambda_function, "fetch", lambda url, headers, context: (response, FetchTimings()))
+    monkeypatch.setattr(lambda_function, "feed_cache", FeedCache())
+    return response
+
+
+def test_a_cached_feed_is_parsed_while_its_body_streams_in(response, monkeypatch):
+    cached = FeedEntry(None, None, hashlib.sha256(FEED).hexdigest(), {"calendar": {}, "events": []})
+    lambda_function.feed_cache.put(URL, cached)
+    handle_calendar_event = lambda_function.handle_calendar_event
+    read_at_first_event = []
+
+    def record_progress(cal_event):
+        read_at_first_event.append(response.read)
+        return handle_calendar_event(cal_event)
+
+    monkeypatch.setattr(lambda_function, "handle_calendar_event", record_progress)
+
+    entry = lambda_function._downloadFeed(URL)
+
+    # the first event reached the parser long before the body was read
+    assert read_at_first_event[0] < len(response.chunks) // 2
+    assert response.read == len(response.chunks)
+    assert entry.sha256 == cached.sha256
+    assert len(entry.schedule["events"]) == 10
+    assert lambda_function.feed_cache.stats()["hash_hits"] == 1
+
+
+def test_a_changed_body_replaces_the_cached_entry(response):
+    lambda_function.feed_cache.put(URL, FeedEntry(None, None, "old", {"calendar": {}, "events": []}))
+
+    entry = lambda_function._downloadFeed(URL)
+
+    assert entry.sha256 == hashlib.sha256(FEED).hexdigest()
+    assert lambda_function.feed_cache.get(URL) is entry
+    assert lambda_function.feed_cache.stats()["hash_hits"] == 0
+
+
+@pytest.fixture
+def extra_events():
+    resource = FakeResource()
+    name = lambda_function.extra_event_table
+    db._shared_handlers[name] = db.DynamoDBHandler(name, resource=resource)
+    return resource.Table(name)
+
+
+def test_an_oversized_snapshot_clears_the_stored_one(extra_events, monkeypatch):
+    extra_event = {"id": "extra-1", "employeeID": "employee-1", "extraDataType": "ICS"}
+    extra_events.rows["extra-1"] = dict(extra_event)
+    schedule = {
+        "type": "ICS",
+        "calendar": {},
+        "events": [{"uid": "event-1", "startAt": "20240523T100000"}],
+    }
+    entry = FeedEntry('"v1"', None, "sha", schedule)
+    assert lambda_function._saveSnapshot(extra_event, schedule, entry)
+    assert extra_events.rows["extra-1"]["feedETag"] == '"v1"'
+    monkeypatch.setattr(lambda_function, "SNAPSHOT_MAX_BYTES", 16)
+    # the next feed is saved later than this one
+    extra_events.rows["extra-1"][VERSION_ATTRIBUTE] -= 1000
+
+    assert not lambda_function._saveSnapshot(extra_event, schedule, entry)
+
+    row = extra_events.rows["extra-1"]
+    assert row[SNAPSHOT_ATTRIBUTE] is None and row["feedETag"] is None
+    assert lambda_function._scheduleFromSnapshot(extra_event) is None
+    assert lambda_function._snapshotFeedEntry(extra_event) is None
+
+
+def test_the_refresh_job_scans_extra_events_in_parallel(extra_events, monkeypatch):
+    for number in range(6):
+        extra_events.rows[f"extra-{number}"] = {
+            "id": f"extra-{number}",
+            "extraDataType": "ICS" if number % 3 else "CSV",
+            "downloadableURL": f"https://feeds.example/{number}.ics",
+        }
+    refreshed = []
+    monkeypatch.setattr(
+        lambda_function, "_refreshSchedule", lambda item, context: refreshed.append(item["id"]) or True
+    )
+
+    summary = lambda_function.refresh_handler({}, None)
+
+    assert summary == {"refreshed": 4, "failed": 0}
+    assert sorted(refreshed) == ["extra-1", "extra-2", "extra-4", "extra-5"]
+    handler = db._shared_handlers[lambda_function.extra_event_table]
+    assert handler.last_scan_stats.operation == "ParallelScan"
@@ -0,0 +1,81 @@
+import importlib.util
+import json
+import os
+import pytest
+import db
+from fake_dynamodb import FakeResource
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUFFIX = "-2iph2dahajadpnro5xkxcbveoq-staging"
+USER_TABLE = "User" + SUFFIX
+
+
+@pytest.fixture
+def employee_list():
+    """employeeList handler on fake tables: one user employed by two stores with the same colleagues."""
+    resource = FakeResource()
+    resource.Table("Employee" + SUFFIX).rows = {
+        f"{store}-{user}": {
+            "id": f"{store}-{user}",
+            "userID": user,
+            "storeID": store,
+            "role": "EMPLOYEE",
+            "isResigned": False,
+        }
+        for store in ("store-1", "store-2")
+        for user in ("user-1", "user-2", "user-3")
+    }
+    resource.Table("StoreInfo" + SUFFIX).rows = {
+        store: {"id": store, "name": store} for store in ("store-1", "store-2")
+    }
+    resource.Table(USER_TABLE).rows = {
+        user: {"id": user, "firstName": user, "lastName": "Doe", "email": f"{user}@x"}
+        for user in ("user-1", "user-2", "user-3")
+    }
+    for name in resource.tables:
+        db._shared_handlers[name] = db.DynamoDBHandler(name, resource=resource)
+
+    spec = importlib.util.spec_from_file_location(
+        "employee_list", os.path.join(ROOT, "employeeList", "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, resource
+
+
+def list_employees(module):
+    response = module.lambda_handler({"queryStringParameters": {"user_id": "user-1"}}, None)
+    assert response["statusCode"] == 200
+    return json.loads(response["body"])["store_employees"]
+
+
+def test_colleagues_shared_by_two_stores_are_read_once(employee_list):
+    module, resource = employee_list
+
+    stores = list_employees(module)
+
+    assert [store["store_id"] for store in stores] == ["store-1", "store-2"]
+    for store in stores:
+        assert {employee["name"] for employee in store["employees"]} == {
+            "user-1 Doe",
+            "user-2 Doe",
+            "user-3 Doe",
+        }
+    # the second store's colleagues come from the identity map
+    assert resource.requests.count(("BatchGetItem", USER_TABLE)) == 1
+
+
+def test_a_warm_invocation_reads_users_from_the_read_cache(employee_list):
+    module, resource = employee_list
+    list_employees(module)
+    del resource.requests[:]
+
+    stores = list_employees(module)
+
+    assert {employee["name"] for employee in stores[0]["employees"]} == {
+        "user-1 Doe",
+        "user-2 Doe",
+        "user-3 Doe",
+    }
+    # User and StoreInfo are cached across invocations, Employee is not
+    assert {table for _, table in resource.requests} == {"Employee" + SUFFIX}
@@ -0,0 +1,81 @@
+import importlib.util
+import json
+import os
+import pytest
+import db
+import lambda_function
+from fake_dynamodb import FakeResource
+from notification_outbox import InMemoryOutbox
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def resource():
+    resource = FakeResource()
+    for name in (lambda_function.ical_event_status_table, lambda_function.icalendar_event_table):
+        db._shared_handlers[name] = db.DynamoDBHandler(name, resource=resource)
+    return resource
+
+
+@pytest.fixture
+def event_status(resource):
+    """extraEventStatus on the same fake tables, queueing into an in-memory outbox."""
+    spec = importlib.util.spec_from_file_location(
+        "event_status", os.path.join(ROOT, "extraEventStatus", "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.outbox = InMemoryOutbox()
+    return module
+
+
+def post_status(module, uid, start_at, status):
+    response = module.lambda_handler(
+        {"httpMethod": "POST", "body": json.dumps({"uid": uid, "startAt": start_at, "status": status})},
+        None,
+    )
+    assert response["statusCode"] == 200
+
+
+def occurrences(*keys):
+    return [{"uid": uid, "startAt": start_at} for uid, start_at in keys]
+
+
+def test_a_status_posted_before_its_calendar_synced_is_joined(resource, event_status):
+    post_status(event_status, "event-1", "20240523T100000", "COMPLETE")
+
+    # the POST writes the status row and reads nothing
+    assert resource.requests == [("UpdateItem", lambda_function.ical_event_status_table)]
+
+    statuses = lambda_function._getEventStatuses(
+        occurrences(("event-1", "20240523T100000"), ("event-1", "20240530T100000"))
+    )
+
+    assert statuses == {("event-1", "20240523T100000"): "COMPLETE"}
+
+
+def test_a_uid_shared_by_two_calendars_is_joined_in_both(resource, event_status):
+    for calendar_id in ("calendar-b", "calendar-a"):
+        resource.Table(lambda_function.icalendar_event_table).rows[calendar_id] = {
+            "id": calendar_id,
+            "iCalendarID": calendar_id,
+            "uid": "shared-event",
+        }
+    post_status(event_status, "shared-event", "20240523T100000", "CANCEL")
+    del resource.requests[:]
+
+    statuses = lambda_function._getEventStatuses(
+        occurrences(("shared-event", "20240523T100000"), ("other-event", "20240523T110000"))
+    )
+
+    # rows are read by key, not through one of the calendars
+    assert statuses == {("shared-event", "20240523T100000"): "CANCEL"}
+    assert resource.requests == [("BatchGetItem", lambda_function.ical_event_status_table)]
+
+
+def test_statuses_are_read_a_hundred_occurrences_per_request(resource):
+    events = occurrences(*((f"event-{index}", "20240523T100000") for index in range(250)))
+
+    assert lambda_function._getEventStatuses(events) == {}
+    assert resource.requests == [("BatchGetItem", lambda_function.ical_event_status_table)] * 3
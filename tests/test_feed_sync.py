@@ -0,0 +1,112 @@
+import pytest
+import db
+from fake_dynamodb import FakeResource
+from feed_sync import content_hash, plan_sync, sync_calendar
+from ics_parser import ICSEvent
+
+EVENT_TABLE = "ICalendarEvent-test"
+RULE_TABLE = "ICalFreqency-test"
+DAY_TABLE = "ICalendarEventDay-test"
+
+
+def event(uid, start_at="20240523T100000", summary="Coupe", sequence=None, status=None, dtstamp=None):
+    return ICSEvent(
+        uid=uid,
+        start_at=start_at,
+        end_at=start_at,
+        summary=summary,
+        status=status,
+        rrule=None,
+        exdates=None,
+        sequence=sequence,
+        dtstamp=dtstamp,
+    )
+
+
+def stored(event, id=None, sequence=0):
+    return {
+        "id": id or f"row-{event.uid}",
+        "uid": event.uid,
+        "sequence": sequence,
+        "contentHash": content_hash(event),
+        "hasRule": False,
+    }
+
+
+def test_new_changed_and_removed_events():
+    kept, moved, gone = event("kept"), event("moved"), event("gone")
+    rows = [stored(kept), stored(moved), stored(gone)]
+
+    plan = plan_sync([kept, event("moved", start_at="20240524T100000"), event("new")], rows)
+
+    assert [event.uid for event in plan.inserts] == ["new"]
+    assert [(row["uid"], event.start_at) for row, event in plan.updates] == [
+        ("moved", "20240524T100000")
+    ]
+    assert [row["uid"] for row in plan.deletes] == ["gone"]
+    assert plan.unchanged == 1
+
+
+def test_a_new_dtstamp_alone_is_not_a_change():
+    original = event("event-1", dtstamp="20240501T000000Z")
+
+    plan = plan_sync([event("event-1", dtstamp="20240601T000000Z")], [stored(original)])
+
+    assert plan.unchanged == 1
+    assert not (plan.inserts or plan.updates or plan.deletes)
+
+
+def test_an_older_sequence_does_not_overwrite_a_newer_row():
+    plan = plan_sync(
+        [event("event-1", summary="old", sequence="1")], [stored(event("event-1"), sequence=2)]
+    )
+
+    assert plan.unchanged == 1
+    assert not plan.updates
+
+
+def test_the_highest_sequence_of_a_uid_wins():
+    plan = plan_sync(
+        [event("event-1", summary="second", sequence="2"), event("event-1", summary="first", sequence="1")],
+        [],
+    )
+
+    assert [event.summary for event in plan.inserts] == ["second"]
+
+
+def test_cancelled_events_are_deleted():
+    cancelled = event("event-1", status="CANCELLED")
+
+    plan = plan_sync([cancelled, event("event-2", status="CANCELLED")], [stored(event("event-1"))])
+
+    assert [row["uid"] for row in plan.deletes] == ["event-1"]
+    assert not plan.inserts
+
+
+def test_duplicate_rows_of_a_uid_are_deleted():
+    duplicate = event("event-1")
+
+    plan = plan_sync([duplicate], [stored(duplicate, "row-a"), stored(duplicate, "row-b")])
+
+    assert [row["id"] for row in plan.deletes] == ["row-b"]
+    assert plan.unchanged == 1
+
+
+def test_events_whose_index_rows_failed_are_indexed_by_the_next_sync():
+    resource = FakeResource()
+    handlers = [db.DynamoDBHandler(name, resource=resource) for name in (EVENT_TABLE, RULE_TABLE)]
+    db._shared_handlers[DAY_TABLE] = db.DynamoDBHandler(DAY_TABLE, resource=resource)
+    index = db.DayBucketIndex.for_table(EVENT_TABLE)
+    events = [event(f"event-{number}") for number in range(30)]
+    resource.Table(DAY_TABLE).error_code = "ProvisionedThroughputExceededException"
+
+    with pytest.raises(db.DynamoDBOperationError):
+        sync_calendar("calendar-1", events, *handlers, index)
+    # no event row was written ahead of its day bucket rows
+    assert resource.Table(EVENT_TABLE).rows == {}
+
+    resource.Table(DAY_TABLE).error_code = None
+    plan = sync_calendar("calendar-1", events, *handlers, index)
+
+    assert len(plan.inserts) == 30
+    assert len(resource.Table(EVENT_TABLE).rows) == len(resource.Table(DAY_TABLE).rows) == 30
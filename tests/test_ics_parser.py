@@ -0,0 +1,86 @@
+import pytest
+from ics_parser import ICSStreamParser, iter_content_lines, split_content_line
+
+FEED = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "NAME:Salon\r\n"
+    "TIMEZONE-ID:Europe/Paris\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:event-1\r\n"
+    "DTSTART:20240523T100000\r\n"
+    "DTEND:20240523T110000\r\n"
+    "SUMMARY:Coupe\\, brushing et soin \r\n"
+    " capillaire\r\n"
+    "RRULE:FREQ=WEEKLY;BYDAY=TH\r\n"
+    "EXDATE:20240530T100000\r\n"
+    "EXDATE:20240606T100000,20240613T100000\r\n"
+    "BEGIN:VALARM\r\n"
+    "SUMMARY:not the event summary\r\n"
+    "END:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:event-2\r\n"
+    "DTSTART:20240524T090000\r\n"
+    "SUMMARY:Épilation\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+).encode("utf-8")
+
+
+def chunked(body, size):
+    return [body[start : start + size] for start in range(0, len(body), size)]
+
+
+def test_unfolds_continuation_lines():
+    lines = list(iter_content_lines([b"SUMMARY:Coupe\r\n", b" et\r\n\tsoin\r\nUID:1\r\n"]))
+
+    assert lines == ["SUMMARY:Coupeetsoin", "UID:1"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_multibyte_characters_survive_any_chunking(size):
+    events = list(ICSStreamParser().events(chunked(FEED, size)))
+
+    assert [event.summary for event in events] == [
+        "Coupe\\, brushing et soin capillaire",
+        "Épilation",
+    ]
+
+
+def test_quoted_parameters_keep_their_colons_and_semicolons():
+    name, params, value = split_content_line(
+        'DTSTART;TZID="America/New_York:Eastern; US":20240523T100000'
+    )
+
+    assert name == "DTSTART"
+    assert params == {"TZID": "America/New_York:Eastern; US"}
+    assert value == "20240523T100000"
+
+
+def test_events_and_calendar_properties():
+    parser = ICSStreamParser()
+    first, second = parser.events([FEED])
+
+    assert parser.calendar == {
+        "version": "2.0",
+        "name": "Salon",
+        "timeZone": "Europe/Paris",
+        "productID": None,
+    }
+    assert first.uid == "event-1"
+    assert (first.start_at, first.end_at) == ("20240523T100000", "20240523T110000")
+    assert first.rrule == "FREQ=WEEKLY;BYDAY=TH"
+    assert first.exdates == ("20240530T100000", "20240606T100000", "20240613T100000")
+    assert second.end_at is None and second.exdates is None
+
+
+def test_keep_drops_events_before_they_are_rendered():
+    events = ICSStreamParser().events([FEED], keep=lambda start, end, rrule: rrule is not None)
+
+    assert [event.uid for event in events] == ["event-1"]
+
+
+def test_a_body_without_a_calendar_is_invalid():
+    with pytest.raises(ValueError, match="invalid_calendar"):
+        list(ICSStreamParser().events([b"<html><body>Service unavailable</body></html>"]))
@@ -0,0 +1,125 @@
+import importlib.util
+import os
+import pytest
+import notification_outbox
+from notification_outbox import FAILED, LEASE_MILLIS, MAX_ATTEMPTS, PENDING, SENT, InMemoryOutbox
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Milliseconds seen by the outbox, moved by the test."""
+    now = {"millis": 1_000_000}
+    monkeypatch.setattr(notification_outbox, "now_millis", lambda: now["millis"])
+    monkeypatch.setattr(notification_outbox, "retry_delay_millis", lambda attempts: 1000)
+    return now
+
+
+@pytest.fixture
+def drain_module(monkeypatch):
+    spec = importlib.util.spec_from_file_location(
+        "outbox_drain", os.path.join(ROOT, "notificationOutbox", "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.outbox = InMemoryOutbox()
+    return module
+
+
+def test_enqueueing_a_dedupe_key_twice_stores_one_row(clock):
+    outbox = InMemoryOutbox()
+
+    outbox.enqueue({"message": "first"}, "event-1#COMPLETE")
+    outbox.enqueue({"message": "second"}, "event-1#COMPLETE")
+
+    assert [row["notification"]["message"] for row in outbox.rows.values()] == ["first"]
+
+
+def test_a_claimed_row_is_leased_until_it_expires(clock):
+    outbox = InMemoryOutbox()
+    outbox.enqueue({"message": "hello"}, "event-1")
+
+    (claimed,) = outbox.claim_due()
+    assert claimed["attempts"] == 1
+    assert outbox.claim_due() == []
+
+    clock["millis"] += LEASE_MILLIS + 1
+    (reclaimed,) = outbox.claim_due()
+    assert reclaimed["attempts"] == 2
+
+
+def test_delayed_rows_are_held_back_then_claimed_together(clock):
+    outbox = InMemoryOutbox()
+    outbox.enqueue({"message": "first"}, "event-1", delay_millis=3000)
+    clock["millis"] += 1000
+    outbox.enqueue({"message": "second"}, "event-2", delay_millis=3000)
+
+    assert outbox.claim_due(horizon_millis=3000) == []
+
+    clock["millis"] += 2000
+    claimed = outbox.claim_due(horizon_millis=3000)
+    assert [row["notification"]["message"] for row in claimed] == ["first", "second"]
+
+
+def test_failures_are_retried_then_given_up(clock):
+    outbox = InMemoryOutbox()
+    outbox.enqueue({"message": "hello"}, "event-1")
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        (row,) = outbox.claim_due()
+        assert row["attempts"] == attempt
+        outbox.mark_failed(row, RuntimeError("503"))
+        clock["millis"] += 1000
+
+    (stored,) = outbox.rows.values()
+    assert stored["state"] == FAILED
+    assert stored["lastError"] == "503"
+    assert outbox.claim_due() == []
+
+
+def test_a_permanent_failure_is_not_retried(clock):
+    outbox = InMemoryOutbox()
+    outbox.enqueue({"message": "hello"}, "event-1")
+
+    counts = outbox.drain(
+        lambda notifications: [ValueError("400")] * len(notifications),
+        is_permanent=lambda error: isinstance(error, ValueError),
+    )
+
+    assert counts == {"sent": 0, "retried": 0, "failed": 1}
+    assert outbox.rows["event-1"]["state"] == FAILED
+
+
+def test_drain_sends_every_due_row(clock):
+    outbox = InMemoryOutbox()
+    for index in range(5):
+        outbox.enqueue({"message": str(index)}, f"event-{index}")
+    sent = []
+
+    counts = outbox.drain(lambda notifications: sent.extend(notifications) or notifications, batch_size=2)
+
+    assert counts == {"sent": 5, "retried": 0, "failed": 0}
+    assert sorted(notification["message"] for notification in sent) == ["0", "1", "2", "3", "4"]
+    assert {row["state"] for row in outbox.rows.values()} == {SENT}
+
+
+def test_stream_batches_without_inserts_are_ignored(drain_module, clock, monkeypatch):
+    drain_module.outbox.enqueue({"message": "hello"}, "event-1")
+    sent = []
+    monkeypatch.setattr(
+        drain_module, "_send_batch", lambda notifications, context=None: sent.extend(notifications) or notifications
+    )
+
+    counts = drain_module.lambda_handler({"Records": [{"eventName": "MODIFY"}]}, None)
+
+    assert counts == {"sent": 0, "retried": 0, "failed": 0}
+    assert sent == []
+    assert drain_module.outbox.rows["event-1"]["state"] == PENDING
+
+    counts = drain_module.lambda_handler(
+        {"Records": [{"eventName": "MODIFY"}, {"eventName": "INSERT"}]}, None
+    )
+
+    assert counts == {"sent": 1, "retried": 0, "failed": 0}
+    assert [notification["message"] for notification in sent] == ["hello"]
@@ -0,0 +1,89 @@
+import pytest
+import db
+import recipient_index
+from fake_dynamodb import FakeResource
+from recipient_index import ALL_STORES, UNASSIGNED_STORE, RecipientIndex
+
+SUFFIX = "-test"
+
+
+@pytest.fixture
+def resource():
+    resource = FakeResource()
+    for model in ("NotificationRecipient", "Employee", "User", "DeviceInfo"):
+        name = model + SUFFIX
+        db._shared_handlers[name] = db.DynamoDBHandler(name, resource=resource)
+    return resource
+
+
+def add_employee(resource, user_id, role, store_id=None):
+    employee = {"id": f"{user_id}-{store_id}", "userID": user_id, "role": role}
+    if store_id:
+        employee["storeID"] = store_id
+    resource.Table("Employee" + SUFFIX).rows[employee["id"]] = employee
+    resource.Table("User" + SUFFIX).rows[user_id] = {"id": user_id, "email": f"{user_id}@x"}
+    resource.Table("DeviceInfo" + SUFFIX).rows[user_id] = {
+        "id": user_id,
+        "email": f"{user_id}@x",
+        "isOn": True,
+    }
+
+
+def rows(resource):
+    return resource.Table("NotificationRecipient" + SUFFIX).rows
+
+
+def test_rebuild_all_keeps_owners_and_managers_without_a_store(resource):
+    add_employee(resource, "owner", "OWNER", "store-1")
+    add_employee(resource, "manager", "MANAGER")
+    add_employee(resource, "employee", "EMPLOYEE")
+
+    emails = RecipientIndex(SUFFIX).rebuild_all()
+
+    assert emails == ["manager@x", "owner@x"]
+    assert rows(resource)[f"store#{UNASSIGNED_STORE}"]["emails"] == ["manager@x"]
+
+
+def test_a_store_less_manager_change_rebuilds_the_unassigned_row(resource):
+    index = RecipientIndex(SUFFIX)
+    index.rebuild_all()
+    add_employee(resource, "manager", "MANAGER")
+
+    stores = index.affected_stores("Employee", [None, {"userID": "manager", "role": "MANAGER"}])
+    for store_id in stores:
+        index.rebuild_store(store_id)
+
+    assert stores == {UNASSIGNED_STORE}
+    assert index.recipients() == ["manager@x"]
+
+
+def test_an_older_store_list_never_replaces_a_newer_one(resource):
+    add_employee(resource, "owner", "OWNER", "store-1")
+    slow, fast = RecipientIndex(SUFFIX), RecipientIndex(SUFFIX)
+    read = slow._subscribed_emails
+    calls = []
+
+    def read_then_race(user_ids):
+        emails = read(user_ids)
+        if not calls:
+            # another batch adds a manager and rebuilds the store in between
+            add_employee(resource, "manager", "MANAGER", "store-1")
+            fast.rebuild_store("store-1")
+        calls.append(emails)
+        return emails
+
+    slow._subscribed_emails = read_then_race
+    slow.rebuild_store("store-1")
+
+    assert calls == [["owner@x"], ["manager@x", "owner@x"]]
+    assert rows(resource)["store#store-1"]["emails"] == ["manager@x", "owner@x"]
+    assert rows(resource)[ALL_STORES]["emails"] == ["manager@x", "owner@x"]
+
+
+def test_a_contended_row_gives_up_after_the_attempts(resource, monkeypatch):
+    index = RecipientIndex(SUFFIX)
+    monkeypatch.setattr(index.index, "update_if_newer", lambda *args: False)
+
+    with pytest.raises(db.DynamoDBOperationError, match="contended"):
+        index.rebuild_store("store-1")
+    assert len([op for op, _ in resource.requests if op == "GetItem"]) == recipient_index.UPDATE_ATTEMPTS
@@ -0,0 +1,79 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from dateutil.rrule import rrulestr
+from rrule_engine import expand
+
+RULES = [
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=3",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SA",
+    "FREQ=WEEKLY;INTERVAL=3",
+    "FREQ=MONTHLY;BYMONTHDAY=15",
+    "FREQ=MONTHLY;BYDAY=-1FR",
+    "FREQ=WEEKLY;COUNT=10;BYDAY=TH",
+    "FREQ=DAILY;UNTIL=20250101T000000",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SU;BYSETPOS=1",
+    "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1",
+    "FREQ=DAILY;BYHOUR=9,14;BYSETPOS=2",
+]
+
+
+def dateutil_between(rule, dtstart, window_start, window_end):
+    return list(rrulestr(rule, dtstart=dtstart).between(window_start, window_end, inc=True))
+
+
+@pytest.mark.parametrize("rule", RULES)
+def test_expand_matches_dateutil(rule):
+    generator = random.Random(rule)
+    for _ in range(50):
+        dtstart = datetime(2022, 1, 1, 9, 30) + timedelta(
+            days=generator.randrange(0, 700), hours=generator.randrange(0, 10)
+        )
+        window_start = dtstart + timedelta(days=generator.randrange(-10, 900))
+        window_end = window_start + timedelta(days=generator.randrange(0, 60))
+
+        assert expand(rule, dtstart, window_start, window_end) == dateutil_between(
+            rule, dtstart, window_start, window_end
+        ), (rule, dtstart, window_start)
+
+
+def test_bysetpos_rules_are_not_fast_forwarded():
+    rule = "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SU;BYSETPOS=1"
+    dtstart = datetime(2022, 8, 3, 9)
+    window_start, window_end = datetime(2022, 8, 31, 9), datetime(2022, 9, 30, 9)
+
+    occurrences = expand(rule, dtstart, window_start, window_end)
+
+    assert occurrences == [datetime(2022, 9, 13, 9), datetime(2022, 9, 27, 9)]
+    assert occurrences == dateutil_between(rule, dtstart, window_start, window_end)
+
+
+def test_exdates_are_left_out_in_local_time():
+    occurrences = expand(
+        "FREQ=DAILY",
+        datetime(2024, 5, 1, 10),
+        datetime(2024, 6, 1),
+        datetime(2024, 6, 3, 23),
+        "20240602T100000,20240603T080000Z",
+        "Europe/Paris",
+    )
+
+    assert occurrences == [datetime(2024, 6, 1, 10)]
+
+
+def test_a_utc_until_is_compared_in_wall_clock_time():
+    occurrences = expand(
+        "FREQ=DAILY;UNTIL=20240603T080000Z",
+        datetime(2024, 5, 1, 10),
+        datetime(2024, 6, 1),
+        datetime(2024, 6, 10),
+        tzid="Europe/Paris",
+    )
+
+    assert occurrences == [datetime(2024, 6, day, 10) for day in (1, 2, 3)]
+
+
+def test_a_window_before_dtstart_is_empty():
+    assert expand("FREQ=DAILY", datetime(2024, 5, 1), datetime(2024, 4, 1), datetime(2024, 4, 30)) == []
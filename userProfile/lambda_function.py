@@ -2,6 +2,7 @@ import io
 import json
 from db import DynamoDBHandler
 from db import DynamoDBOperationError
+from db import request_scope
 
 user_table = "User-2iph2dahajadpnro5xkxcbveoq-staging"
 address_table = "Address-2iph2dahajadpnro5xkxcbveoq-staging"
@@ -10,6 +11,7 @@ store_table = "StoreInfo-2iph2dahajadpnro5xkxcbveoq-staging"
 opentime_table = "OpenTime-2iph2dahajadpnro5xkxcbveoq-staging"
 
 
+@request_scope
 def lambda_handler(event, context):
     if event["httpMethod"] == "GET":
         return _getProfile(event)
@@ -66,7 +68,7 @@ def _postProfile(event):
 
 
 def _update_profile(user_id, firstName, lastName, phone, primary_store_id):
-    dynamodb_client = DynamoDBHandler(user_table)
+    dynamodb_client = DynamoDBHandler.for_table(user_table)
     attributes = {}
     if firstName != None and len(firstName) > 0:
         attributes["firstName"] = firstName
@@ -79,7 +81,7 @@ def _update_profile(user_id, firstName, lastName, phone, primary_store_id):
 
 
 def _update_primary_store(user_id, primary_store_id):
-    dynamodb_client = DynamoDBHandler(employee_table)
+    dynamodb_client = DynamoDBHandler.for_table(employee_table)
     employees = dynamodb_client.search_items({"userID": user_id})
 
     stores = _getStores(user_id)
@@ -133,21 +135,37 @@ def _profile(user_id: str):
 
 def _getStores(user_id: str):
     store = None
-    dynamodb_client = DynamoDBHandler(employee_table)
+    dynamodb_client = DynamoDBHandler.for_table(employee_table)
     employees = dynamodb_client.search_items({"userID": user_id})
+    employees = [
+        employee for employee in employees if not employee.get("isResigned", False)
+    ]
+
+    # load every store, then every address and opentime, in one batch each
+    store_items = _getItems([e.get("storeID") for e in employees], store_table)
+    address_items = _getItems(
+        [s.get("addressID") for s in store_items.values()], address_table
+    )
+    opentime_items = _getItems(
+        [s.get("opentimeID") for s in store_items.values()], opentime_table
+    )
 
     stores = []
     for employee in employees:
-        isResigned = employee.get("isResigned", False)
         isPrimary = employee.get("isPrimaryStore", False)
 
-        if isResigned:
-            continue
-
         store_id = employee.get("storeID", None)
         employee_role = employee.get("role", None)
         employee_id = employee.get("id", None)
-        store = _generateStore(store_id, employee_role, isPrimary, employee_id)
+        store = _generateStore(
+            store_id,
+            employee_role,
+            isPrimary,
+            employee_id,
+            store_items,
+            address_items,
+            opentime_items,
+        )
         stores.append(store)
     return stores
 
@@ -155,24 +173,38 @@ def _getStores(user_id: str):
 def _getItem(id: str, table: str):
     if id is None:
         return None
-    dynamodb_client = DynamoDBHandler(table)
+    dynamodb_client = DynamoDBHandler.for_table(table)
     item = dynamodb_client.get_item({"id": id})
     return item
 
 
+def _getItems(ids: list, table: str) -> dict:
+    ids = [id for id in ids if id is not None]
+    if not ids:
+        return {}
+    dynamodb_client = DynamoDBHandler.for_table(table)
+    return dynamodb_client.get_items(ids)
+
+
 def _generateStore(
-    store_id: str, employee_role: str, isPrimary: bool, employee_id: str
+    store_id: str,
+    employee_role: str,
+    isPrimary: bool,
+    employee_id: str,
+    store_items: dict,
+    address_items: dict,
+    opentime_items: dict,
 ):
     if store_id is None:
         return None
 
-    store = _getItem(store_id, store_table)
+    store = store_items.get(store_id)
     if store:
         name = store.get("name", None)
         website = store.get("website", None)
         phone = store.get("phone", None)
-        address = _getItem(store.get("addressID", None), address_table)
-        opentime = _getItem(store.get("opentimeID", None), opentime_table)
+        address = address_items.get(store.get("addressID", None))
+        opentime = opentime_items.get(store.get("opentimeID", None))
         role = employee_role
 
         store_info = {